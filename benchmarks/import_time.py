@@ -0,0 +1,68 @@
+"""Mede o custo de importar ``emotion_analysis.audio_processing``.
+
+Compara, em interpretadores novos, o import "preguiçoso" atual com o custo das
+dependências pesadas (TensorFlow, librosa, h5py, scikit-learn) que antes eram
+carregadas no import do módulo.
+
+Uso:
+    python benchmarks/import_time.py --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = '''
+import json, os, resource, sys, time
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+start = time.perf_counter()
+from emotion_analysis import audio_processing
+lazy = time.perf_counter() - start
+rss_lazy = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = None
+if {eager!r}:
+    start = time.perf_counter()
+    audio_processing._import_heavy_dependencies()
+    heavy = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'lazy': lazy, 'heavy': heavy, 'rss_lazy_kb': rss_lazy, 'rss_kb': rss}}))
+'''
+
+
+def run_probe(eager):
+    code = PROBE.format(base_dir=str(BASE_DIR), eager=eager)
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    lazy = [run_probe(eager=False) for _ in range(args.runs)]
+    eager = [run_probe(eager=True) for _ in range(args.runs)]
+
+    lazy_import = statistics.median(r['lazy'] for r in lazy)
+    eager_import = statistics.median(r['lazy'] + r['heavy'] for r in eager)
+    report = {
+        'runs': args.runs,
+        'lazy_import_ms': round(1000 * lazy_import, 1),
+        'eager_import_ms': round(1000 * eager_import, 1),
+        'speedup': round(eager_import / lazy_import, 1) if lazy_import else None,
+        'lazy_max_rss_mb': round(statistics.median(r['rss_lazy_kb'] for r in lazy) / 1024, 1),
+        'eager_max_rss_mb': round(statistics.median(r['rss_kb'] for r in eager) / 1024, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
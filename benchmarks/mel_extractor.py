@@ -0,0 +1,98 @@
+"""Compara o ``MelSpectrogramExtractor`` com o caminho librosa original.
+
+Para cada duração gera um sinal sintético, verifica a paridade numérica (em dB)
+com ``librosa.feature.melspectrogram`` + ``librosa.power_to_db(ref=np.max)``
+sobre a mesma janela de entrada do modelo e mede o tempo médio de cada
+implementação. Sai com código 1 se algum erro passar de ``--tolerance-db``
+(a mesma paridade é coberta por ``emotion_analysis/tests/test_features.py``).
+
+Uso:
+    python benchmarks/mel_extractor.py --durations 1 4 30 --runs 20
+    python benchmarks/mel_extractor.py --tolerance-db 0.001
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from emotion_analysis.features import MelSpectrogramExtractor  # noqa: E402
+
+SAMPLE_RATE = 22050
+PARAMS = {'n_mels': 40, 'hop_length': 512, 'n_fft': 2048}
+TARGET_FRAMES = 174
+
+
+def synthetic_voice(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    tone = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / SAMPLE_RATE) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    return (0.2 * tone * envelope + 0.01 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def librosa_features(waveform):
+    import librosa
+
+    melspec = librosa.feature.melspectrogram(y=waveform, sr=SAMPLE_RATE, **PARAMS)
+    melspec_db = librosa.power_to_db(melspec, ref=np.max)
+    output = np.zeros((PARAMS['n_mels'], TARGET_FRAMES), dtype=np.float32)
+    frames = min(TARGET_FRAMES, melspec_db.shape[1])
+    output[:, :frames] = melspec_db[:, :frames]
+    return output
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return 1000 * statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=float, nargs='+', default=[1, 4, 30, 120])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--tolerance-db', type=float, default=1e-3, help='Erro máximo aceito em relação ao librosa.')
+    args = parser.parse_args()
+
+    extractor = MelSpectrogramExtractor(sample_rate=SAMPLE_RATE, target_frames=TARGET_FRAMES, **PARAMS)
+    results = []
+    for seconds in args.durations:
+        waveform = synthetic_voice(seconds)
+        # The extractor only looks at the model's input window; compare on it.
+        window = waveform[:extractor.samples_needed]
+        max_error_db = float(np.abs(extractor(waveform) - librosa_features(window)).max())
+        librosa_ms = timed(lambda: librosa_features(waveform), max(3, args.runs // 4))
+        numpy_ms = timed(lambda: extractor(waveform), args.runs)
+        results.append({
+            'duration_s': seconds,
+            'max_abs_error_db': max_error_db,
+            'librosa_full_ms': round(librosa_ms, 3),
+            'numpy_ms': round(numpy_ms, 3),
+            'speedup': round(librosa_ms / numpy_ms, 1) if numpy_ms else None,
+        })
+    print(json.dumps(results, indent=2))
+
+    failed = [result for result in results if result['max_abs_error_db'] > args.tolerance_db]
+    for result in failed:
+        print(
+            f"Paridade falhou em {result['duration_s']} s: erro de {result['max_abs_error_db']:.6f} dB "
+            f"> {args.tolerance_db} dB",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
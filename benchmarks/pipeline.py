@@ -0,0 +1,264 @@
+"""Benchmark do pipeline de análise sobre um corpus de áudio sintético.
+
+Gera um sinal de voz sintético para cada duração e o codifica em cada formato
+aceito no upload (mp3, wav, ogg, webm, m4a). Para cada arquivo mede:
+
+* decodificação (o trecho limitado usado pela análise e o arquivo inteiro);
+* extração do mel-espectrograma e predição do modelo;
+* latência (p50/p90/p99) e vazão de ``audio_processing.analyze_audio_file``
+  com uma thread e com várias threads concorrentes (com o micro-batcher ativo
+  em ``--batching``).
+
+O cache de features é desativado para que cada análise decodifique o áudio.
+O resultado é gravado em JSON com o commit atual. ``--baseline`` compara as
+medianas com um JSON de outra execução.
+
+Uso:
+    python benchmarks/pipeline.py --durations 1 10 60 600 --runs 5 --concurrency 1 8 --batching --output pipeline.json
+    python benchmarks/pipeline.py --formats wav webm --baseline pipeline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from emotion_analysis import audio_processing  # noqa: E402
+from mel_extractor import SAMPLE_RATE, synthetic_voice  # noqa: E402
+
+FORMATS = ['mp3', 'wav', 'ogg', 'webm', 'm4a']
+# Codecs usados pelos navegadores/celulares para cada contêiner.
+ENCODER_ARGS = {
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '128k'],
+    'ogg': ['-c:a', 'libvorbis', '-q:a', '4'],
+    'webm': ['-c:a', 'libopus', '-b:a', '64k', '-ar', '48000'],
+    'm4a': ['-c:a', 'aac', '-b:a', '128k'],
+}
+
+
+def percentiles(samples):
+    values = 1000 * np.asarray(samples)
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def build_corpus(directory, formats, durations):
+    """Write ``voice_<duração>s.<formato>`` for every format and duration."""
+
+    import soundfile as sf
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    corpus = []
+    for seconds in durations:
+        stem = directory / f'voice_{seconds:g}s'
+        wav_path = stem.with_suffix('.wav')
+        sf.write(wav_path, synthetic_voice(seconds, seed=int(seconds)), SAMPLE_RATE, subtype='PCM_16')
+        for fmt in formats:
+            path = stem.with_suffix(f'.{fmt}')
+            if fmt != 'wav':
+                subprocess.run(
+                    [get_ffmpeg_exe(), '-v', 'error', '-y', '-i', str(wav_path), *ENCODER_ARGS[fmt], str(path)],
+                    check=True,
+                )
+            corpus.append({'format': fmt, 'duration_s': seconds, 'path': path, 'bytes': path.stat().st_size})
+    return corpus
+
+
+def bench_stages(item, spec, runs):
+    """Decode, feature and predict timings for one file."""
+
+    path, seconds = item['path'], item['duration_s']
+    bounded = timed(lambda: audio_processing._load_waveform(path, spec.sample_rate, spec.samples_needed), runs)
+    full = timed(lambda: audio_processing._load_waveform(path, spec.sample_rate), max(1, runs // 2))
+    decoded = audio_processing._load_waveform(path, spec.sample_rate, spec.samples_needed)
+    features_time = timed(lambda: spec.extract(decoded.waveform), runs)
+    features = spec.extract(decoded.waveform)[np.newaxis]
+    predict = timed(lambda: audio_processing.predict_features(features), runs)
+    return {
+        'decode_bounded': {**percentiles(bounded), 'decoder': decoded.decoder},
+        'decode_full': {
+            **percentiles(full),
+            'realtime_factor': round(seconds / statistics.median(full), 1),
+        },
+        'features': percentiles(features_time),
+        'predict': percentiles(predict),
+    }
+
+
+def bench_predict_batch(spec, batch_size, runs):
+    """Windows per second when the model scores ``batch_size`` tensors per call."""
+
+    batch = np.zeros((batch_size,) + spec.input_shape, dtype=np.float32)
+    samples = timed(lambda: audio_processing.predict_batch(batch), runs)
+    return {
+        'batch_size': batch_size,
+        **percentiles(samples),
+        'windows_per_s': round(batch_size / statistics.median(samples), 1),
+    }
+
+
+def bench_analyze(item, runs, concurrency):
+    """Latency percentiles and throughput of ``analyze_audio_file``."""
+
+    path = item['path']
+
+    def analyze_once(_):
+        start = time.perf_counter()
+        audio_processing.analyze_audio_file(path)
+        return time.perf_counter() - start
+
+    requests = runs * concurrency
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(analyze_once, range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        **percentiles(latencies),
+        'files_per_s': round(requests / wall, 2),
+    }
+
+
+def git_commit():
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def compare(results, baseline):
+    """p50 ratio (current / baseline) of every analyze run found in both reports."""
+
+    def index(report):
+        return {
+            (row['format'], row['duration_s'], run['concurrency']): run['p50_ms']
+            for row in report['results']
+            for run in row['analyze']
+        }
+
+    previous = index(baseline)
+    rows = []
+    for (fmt, seconds, concurrency), p50 in index(results).items():
+        before = previous.get((fmt, seconds, concurrency))
+        if before:
+            rows.append({
+                'format': fmt,
+                'duration_s': seconds,
+                'concurrency': concurrency,
+                'p50_ms': p50,
+                'baseline_p50_ms': before,
+                'ratio': round(p50 / before, 3),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--durations', type=float, nargs='+', default=[1, 10, 60, 600])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--batch-size', type=int, default=32, help='Tamanho do lote em predict_batch.')
+    parser.add_argument('--batching', action='store_true', help='Ativa o micro-batcher (EMOTION_BATCHING_ENABLED).')
+    parser.add_argument('--timeline', action='store_true', help='Analisa o áudio inteiro (EMOTION_TIMELINE_ENABLED).')
+    parser.add_argument('--corpus-dir', type=Path, help='Onde gravar o corpus (padrão: diretório temporário).')
+    parser.add_argument('--output', type=Path, help='Arquivo JSON de saída (padrão: só imprime).')
+    parser.add_argument('--baseline', type=Path, help='JSON de uma execução anterior para comparar.')
+    args = parser.parse_args()
+
+    settings.EMOTION_FEATURE_CACHE_DIR = None
+    settings.EMOTION_BATCHING_ENABLED = args.batching
+    settings.EMOTION_TIMELINE_ENABLED = args.timeline
+    settings.EMOTION_SLOW_ANALYSIS_SECONDS = 0
+    audio_processing.get_feature_cache.cache_clear()
+
+    # Model load and TensorFlow start-up are not part of any measurement.
+    audio_processing.warm_up()
+    spec = audio_processing.feature_spec()
+
+    with tempfile.TemporaryDirectory(prefix='emotion-bench-') as tmp:
+        corpus_dir = args.corpus_dir or Path(tmp)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        corpus = build_corpus(corpus_dir, args.formats, args.durations)
+
+        results = []
+        for item in corpus:
+            audio_processing.analyze_audio_file(item['path'])  # warm codec paths
+            results.append({
+                'format': item['format'],
+                'duration_s': item['duration_s'],
+                'bytes': item['bytes'],
+                **bench_stages(item, spec, args.runs),
+                'analyze': [bench_analyze(item, args.runs, concurrency) for concurrency in args.concurrency],
+            })
+            print(f"{item['format']:>4} {item['duration_s']:>6g}s ok", file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'model_version': audio_processing.model_version(),
+        'feature_spec': spec.to_dict(),
+        'settings': {
+            'backend': getattr(settings, 'EMOTION_INFERENCE_BACKEND', 'keras'),
+            'variant': getattr(settings, 'EMOTION_MODEL_VARIANT', ''),
+            'batching': args.batching,
+            'timeline': args.timeline,
+            'bounded_decode': getattr(settings, 'EMOTION_BOUNDED_DECODE', True),
+            'ffmpeg_pool_size': getattr(settings, 'EMOTION_FFMPEG_POOL_SIZE', 0),
+            'model_server': bool(getattr(settings, 'EMOTION_MODEL_SERVER_SOCKET', '')),
+        },
+        'runs': args.runs,
+        'predict_batch': bench_predict_batch(spec, args.batch_size, args.runs),
+        'results': results,
+    }
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report['vs_baseline'] = {'baseline_commit': baseline.get('commit'), 'analyze': compare(report, baseline)}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
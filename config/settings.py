@@ -127,3 +127,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
+
+# Análise de emoções
+# Tarefas em processamento há mais tempo que isso (segundos) voltam para a fila.
+EMOTION_JOB_STALE_AFTER = 600
+# Artefato pré-compilado do modelo (manage.py convert_model_artifact). None desativa o cache.
+EMOTION_MODEL_CACHE_DIR = BASE_DIR / 'var' / 'model_cache'
+# Runtime de inferência: 'keras' (TensorFlow completo) ou 'tflite' (gere com convert_model_tflite).
+EMOTION_INFERENCE_BACKEND = os.environ.get('EMOTION_INFERENCE_BACKEND', 'keras')
+EMOTION_INFERENCE_BACKEND_OPTIONS = {}
+# Diferença máxima aceita nas probabilidades canônicas entre backends.
+EMOTION_BACKEND_PARITY_TOLERANCE = 1e-3
+# Variante quantizada servida ('', 'float16' ou 'int8'); gere com quantize_model.
+EMOTION_MODEL_VARIANT = os.environ.get('EMOTION_MODEL_VARIANT', '')
+EMOTION_QUANTIZATION_MAX_ACCURACY_DROP = 0.01
+EMOTION_QUANTIZATION_MAX_CLASS_DROP = 0.05
+# Intervalo (s) entre verificações da versão ativa (ModelVersion); a nova versão é
+# carregada em segundo plano e trocada sem reiniciar os processos. 0 desativa.
+EMOTION_MODEL_REFRESH_SECONDS = 30
+# Modo sombra: versão registrada (ModelVersion) avaliada em segundo plano sobre as
+# mesmas features do tráfego real; fração das análises amostradas, fila máxima e
+# frequência do resumo no log (concordância, deltas por emoção, latências).
+# Se o candidato não carregar, o erro é logado uma vez e o carregamento é
+# tentado de novo a cada EMOTION_SHADOW_RETRY_SECONDS.
+EMOTION_SHADOW_MODEL_VERSION = os.environ.get('EMOTION_SHADOW_MODEL_VERSION', '')
+EMOTION_SHADOW_SAMPLE_RATE = 1.0
+EMOTION_SHADOW_QUEUE_SIZE = 64
+EMOTION_SHADOW_LOG_EVERY = 100
+EMOTION_SHADOW_RETRY_SECONDS = 60
+# Agrupa inferências concorrentes (threads do worker) em uma única chamada ao modelo.
+EMOTION_BATCHING_ENABLED = False
+EMOTION_BATCH_MAX_SIZE = 16
+EMOTION_BATCH_MAX_LATENCY_MS = 10
+# Caminho do socket Unix do servidor de modelo (manage.py run_model_server).
+# Vazio = cada processo carrega o modelo TensorFlow localmente.
+EMOTION_MODEL_SERVER_SOCKET = os.environ.get('EMOTION_MODEL_SERVER_SOCKET', '')
+EMOTION_MODEL_SERVER_TIMEOUT = 30
+# Pré-carrega TensorFlow e o modelo em segundo plano ao iniciar o processo.
+# Ative apenas nos processos de inferência (workers / servidor de modelo).
+EMOTION_MODEL_WARMUP = os.environ.get('EMOTION_MODEL_WARMUP', '') == '1'
+# Processos FFmpeg pré-iniciados para webm/m4a (0 = um processo novo por arquivo)
+# e limite de decodificações FFmpeg simultâneas por processo.
+EMOTION_FFMPEG_POOL_SIZE = 2
+EMOTION_FFMPEG_MAX_CONCURRENCY = 4
+# Tempo máximo (s) de uma decodificação FFmpeg; depois disso o processo é encerrado.
+EMOTION_FFMPEG_TIMEOUT_SECONDS = 120
+# Cache de features por hash do áudio (None desativa) e tamanho máximo em bytes.
+EMOTION_FEATURE_CACHE_DIR = BASE_DIR / 'var' / 'feature_cache'
+EMOTION_FEATURE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Decodifica só o trecho inicial que o modelo analisa (~4 s) em vez do arquivo inteiro.
+EMOTION_BOUNDED_DECODE = True
+# Linha do tempo: analisa o áudio inteiro em janelas sobrepostas (~4 s) que
+# começam a cada EMOTION_TIMELINE_HOP_SECONDS, previstas em lotes.
+EMOTION_TIMELINE_ENABLED = False
+EMOTION_TIMELINE_HOP_SECONDS = 2.0
+EMOTION_TIMELINE_BATCH_SIZE = 32
+# Métricas Prometheus em /metrics/ (equipe ou token Bearer): cada processo grava um
+# retrato das suas métricas em EMOTION_METRICS_DIR a cada EMOTION_METRICS_FLUSH_SECONDS.
+EMOTION_METRICS_DIR = BASE_DIR / 'var' / 'metrics'
+EMOTION_METRICS_FLUSH_SECONDS = 10
+EMOTION_METRICS_TOKEN = os.environ.get('EMOTION_METRICS_TOKEN', '')
+# Análises mais lentas que isso (segundos) são registradas no logger
+# 'emotion_analysis.slow' com o tempo de cada etapa e o codec. 0 desativa.
+EMOTION_SLOW_ANALYSIS_SECONDS = 5.0
@@ -1,5 +1,5 @@
-from django.contrib import admin
-from .models import AudioRecording, EmotionAnalysis
+from django.contrib import admin, messages
+from .models import AnalysisJob, AudioRecording, EmotionAnalysis, ModelVersion
 
 @admin.register(AudioRecording)
 class AudioRecordingAdmin(admin.ModelAdmin):
@@ -23,7 +23,7 @@ class AudioRecordingAdmin(admin.ModelAdmin):
 @admin.register(EmotionAnalysis)
 class EmotionAnalysisAdmin(admin.ModelAdmin):
     list_display = ['id', 'recording', 'get_user', 'dominant_emotion', 'confidence', 'analyzed_at']
-    list_filter = ['analyzed_at', 'dominant_emotion']
+    list_filter = ['analyzed_at', 'dominant_emotion', 'model_version']
     search_fields = ['recording__title', 'recording__user__username', 'dominant_emotion']
     readonly_fields = ['analyzed_at']
     
@@ -36,9 +36,33 @@ class EmotionAnalysisAdmin(admin.ModelAdmin):
             'fields': ('recording',)
         }),
         ('Resultado da Análise', {
-            'fields': ('dominant_emotion', 'confidence', 'emotions_data')
+            'fields': ('dominant_emotion', 'confidence', 'emotions_data', 'timeline', 'model_version')
         }),
         ('Observações', {
             'fields': ('notes', 'analyzed_at')
         }),
     )
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'recording', 'status', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['recording__title', 'recording__user__username', 'worker']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+@admin.register(ModelVersion)
+class ModelVersionAdmin(admin.ModelAdmin):
+    list_display = ['version', 'is_active', 'sha256', 'created_at', 'activated_at']
+    list_filter = ['is_active']
+    search_fields = ['version', 'sha256', 'notes']
+    readonly_fields = ['sha256', 'labels', 'is_active', 'created_at', 'activated_at']
+    actions = ['activate_version']
+
+    @admin.action(description='Ativar a versão selecionada')
+    def activate_version(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Selecione exatamente uma versão.', level=messages.ERROR)
+            return
+        version = queryset.first()
+        version.activate()
+        self.message_user(request, f'Versão {version.version} ativada.')
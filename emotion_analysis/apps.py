@@ -1,7 +1,38 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class EmotionAnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'emotion_analysis'
     verbose_name = 'Análise de Emoções'
+
+    def ready(self):
+        from . import metrics
+
+        # As análises rodam nos workers; o endpoint /metrics/ soma os retratos de cada processo.
+        metrics.configure_snapshots(
+            getattr(settings, 'EMOTION_METRICS_DIR', None),
+            getattr(settings, 'EMOTION_METRICS_FLUSH_SECONDS', 10),
+        )
+
+        # TensorFlow/librosa só são importados na primeira análise. Processos de
+        # inferência podem antecipar esse custo com EMOTION_MODEL_WARMUP.
+        if getattr(settings, 'EMOTION_MODEL_WARMUP', False):
+            from . import audio_processing
+
+            threading.Thread(target=self._warm_up, args=(audio_processing,), name='emotion-warmup', daemon=True).start()
+
+    @staticmethod
+    def _warm_up(audio_processing):
+        try:
+            audio_processing.warm_up()
+        except Exception:
+            audio_processing.logger.exception('Falha ao pré-carregar o pipeline de análise.')
+        finally:
+            # A versão ativa do modelo é lida do banco nesta thread.
+            from django.db import connection
+
+            connection.close()
@@ -0,0 +1,329 @@
+"""Container sniffing and direct dispatch to the cheapest audio decoder.
+
+The container is identified from the file's magic bytes. The file then goes
+straight to a decoder that can read it: libsndfile (via ``soundfile``) for
+wav/flac/ogg/mp3, and FFmpeg for webm/m4a, which libsndfile cannot open.
+Browser-recorded webm uploads therefore no longer pay for failed
+librosa/audioread attempts first. PCM is streamed block by block into a
+preallocated mono float32 buffer.
+
+With ``max_samples`` set, decoding stops once that many output samples (at the
+target rate) are available, so only the prefix the model consumes is decoded
+and resampled, whatever the length of the upload.
+
+FFmpeg's stderr is drained by a thread while PCM is read from stdout (a
+damaged file can log more than the pipe buffer holds, which would otherwise
+block FFmpeg and the reader forever), and a process still running after
+``timeout`` seconds is killed.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_BLOCK_FRAMES = 1 << 16
+_PIPE_CHUNK_BYTES = 1 << 18
+_STDERR_TAIL_BYTES = 4096
+FFMPEG_TIMEOUT_SECONDS = 120.0
+
+
+class AudioDecodingError(Exception):
+	"""Raised when no decoder could turn the file into PCM."""
+
+
+@dataclass
+class DecodedAudio:
+	"""Mono float32 waveform plus how it was obtained."""
+
+	waveform: np.ndarray
+	sample_rate: int
+	container: str
+	decoder: str
+	native_sample_rate: int
+	truncated: bool = False
+
+	@property
+	def duration(self) -> float:
+		return self.waveform.size / self.sample_rate if self.sample_rate else 0.0
+
+
+def sniff_container(path: Path) -> str:
+	"""Identify the container from its magic bytes (not the file extension)."""
+
+	with open(path, 'rb') as handle:
+		head = handle.read(16)
+	if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+		return 'wav'
+	if head[:4] == b'OggS':
+		return 'ogg'
+	if head[:4] == b'fLaC':
+		return 'flac'
+	if head[:4] == b'\x1a\x45\xdf\xa3':  # EBML header: WebM / Matroska
+		return 'webm'
+	if head[4:8] == b'ftyp':  # ISO base media: m4a / mp4
+		return 'm4a'
+	if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0):
+		return 'mp3'
+	return 'unknown'
+
+
+class _GrowableBuffer:
+	"""Preallocated float32 buffer that doubles when the estimate was short."""
+
+	def __init__(self, capacity: int) -> None:
+		self._data = np.empty(max(capacity, 1), dtype=np.float32)
+		self.size = 0
+
+	def reserve(self, count: int) -> np.ndarray:
+		needed = self.size + count
+		if needed > self._data.size:
+			grown = np.empty(max(needed, 2 * self._data.size), dtype=np.float32)
+			grown[:self.size] = self._data[:self.size]
+			self._data = grown
+		return self._data[self.size:needed]
+
+	def commit(self, count: int) -> None:
+		self.size += count
+
+	def result(self) -> np.ndarray:
+		return self._data[:self.size]
+
+
+def _native_limit(max_samples: int | None, native_sr: int, sample_rate: int) -> int | None:
+	"""Input frames needed for ``max_samples`` output samples, plus resampler margin."""
+
+	if max_samples is None:
+		return None
+	return int(np.ceil(max_samples * native_sr / sample_rate)) + native_sr // 20
+
+
+def _decode_soundfile(path: Path, sample_rate: int, max_samples: int | None = None) -> Tuple[np.ndarray, int]:
+	"""Decode with libsndfile, down-mixing each block straight into the output."""
+
+	import soundfile
+
+	with soundfile.SoundFile(path.as_posix()) as reader:
+		native_sr = reader.samplerate
+		channels = reader.channels
+		limit = _native_limit(max_samples, native_sr, sample_rate)
+		capacity = reader.frames if reader.frames > 0 else native_sr * 30
+		output = _GrowableBuffer(capacity if limit is None else min(capacity, limit))
+		block = np.empty((_BLOCK_FRAMES, channels), dtype=np.float32)
+		while limit is None or output.size < limit:
+			wanted = _BLOCK_FRAMES if limit is None else min(_BLOCK_FRAMES, limit - output.size)
+			read = reader.read(out=block[:wanted], dtype='float32')
+			count = len(read)
+			if count == 0:
+				break
+			target = output.reserve(count)
+			if channels == 1:
+				target[:] = read[:, 0]
+			else:
+				np.mean(read, axis=1, out=target)
+			output.commit(count)
+	return output.result(), native_sr
+
+
+def ffmpeg_command(source: str, sample_rate: int, max_samples: int | None = None) -> list[str]:
+	"""FFmpeg invocation that decodes ``source`` to mono f32le PCM on stdout."""
+
+	import imageio_ffmpeg
+
+	command = [
+		imageio_ffmpeg.get_ffmpeg_exe(),
+		'-hide_banner',
+		'-loglevel', 'error',
+		'-i', source,
+		'-ac', '1',
+		'-ar', str(sample_rate),
+	]
+	if max_samples is not None:
+		# Output-side duration limit: FFmpeg stops demuxing once it is reached.
+		command += ['-t', f'{(max_samples + 1) / sample_rate:.6f}']
+	return command + ['-f', 'f32le', 'pipe:1']
+
+
+def read_f32le_stream(stream, capacity: int, max_samples: int | None = None) -> np.ndarray:
+	"""Read raw little-endian float32 PCM from ``stream`` chunk by chunk.
+
+	Stops after ``max_samples`` samples; the caller is then responsible for
+	terminating the producer.
+	"""
+
+	if max_samples is not None:
+		capacity = min(capacity, max_samples)
+	output = _GrowableBuffer(capacity)
+	pending = b''
+	while max_samples is None or output.size < max_samples:
+		chunk = stream.read(_PIPE_CHUNK_BYTES)
+		if not chunk:
+			break
+		chunk = pending + chunk
+		usable = len(chunk) - len(chunk) % 4
+		pending = chunk[usable:]
+		samples = np.frombuffer(chunk, dtype=np.float32, count=usable // 4)
+		if max_samples is not None:
+			samples = samples[:max_samples - output.size]
+		output.reserve(samples.size)[:] = samples
+		output.commit(samples.size)
+	return output.result()
+
+
+class StderrTail:
+	"""Drain a process's stderr in a background thread, keeping only the last ``limit`` bytes."""
+
+	def __init__(self, stream, limit: int = _STDERR_TAIL_BYTES) -> None:
+		self._stream = stream
+		self._limit = limit
+		self._tail = bytearray()
+		self._thread = threading.Thread(target=self._drain, name='ffmpeg-stderr', daemon=True)
+		self._thread.start()
+
+	def _drain(self) -> None:
+		try:
+			while True:
+				chunk = self._stream.read1(4096)
+				if not chunk:
+					return
+				self._tail += chunk
+				del self._tail[:-self._limit]
+		except (OSError, ValueError):
+			# Stream closed under us (process killed and cleaned up).
+			return
+
+	def text(self, timeout: float = 5.0) -> str:
+		"""What FFmpeg logged, once it closed stderr (or after ``timeout``)."""
+
+		self._thread.join(timeout)
+		return bytes(self._tail).decode('utf-8', errors='ignore').strip()
+
+
+class Deadline:
+	"""Kill ``process`` if it is still running ``timeout`` seconds from now."""
+
+	def __init__(self, process: subprocess.Popen, timeout: float | None) -> None:
+		self.expired = False
+		self._process = process
+		self._timer = None
+		if timeout:
+			self._timer = threading.Timer(timeout, self._kill)
+			self._timer.daemon = True
+			self._timer.start()
+
+	def _kill(self) -> None:
+		if self._process.poll() is None:
+			self.expired = True
+			self._process.kill()
+
+	def cancel(self) -> None:
+		if self._timer is not None:
+			self._timer.cancel()
+
+
+def estimate_samples(path: Path, sample_rate: int) -> int:
+	# ~1 byte of compressed input per output sample is a cheap first guess.
+	return max(path.stat().st_size, sample_rate)
+
+
+def _decode_ffmpeg(
+	path: Path,
+	sample_rate: int,
+	max_samples: int | None = None,
+	timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> Tuple[np.ndarray, int]:
+	"""Let FFmpeg decode, down-mix and resample, streaming f32le from its stdout."""
+
+	command = ffmpeg_command(path.as_posix(), sample_rate, max_samples)
+	with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+		stderr = StderrTail(process.stderr)
+		deadline = Deadline(process, timeout)
+		try:
+			waveform = read_f32le_stream(process.stdout, estimate_samples(path, sample_rate), max_samples)
+			returncode = process.wait()
+		finally:
+			deadline.cancel()
+		message = stderr.text()
+	if deadline.expired:
+		raise AudioDecodingError(f'FFmpeg excedeu {timeout:.0f} s ao converter o áudio ({path.name}).')
+	if returncode != 0:
+		raise AudioDecodingError(f'FFmpeg não conseguiu converter o áudio ({path.name}): {message}')
+	return waveform, sample_rate
+
+
+DECODERS: Dict[str, Callable[[Path, int, int | None], Tuple[np.ndarray, int]]] = {
+	'soundfile': _decode_soundfile,
+	'ffmpeg': _decode_ffmpeg,
+}
+
+# Cheapest decoder first; the second entry only covers libsndfile builds
+# without Vorbis/Opus/MPEG support.
+DECODER_CHAIN: Dict[str, Tuple[str, ...]] = {
+	'wav': ('soundfile', 'ffmpeg'),
+	'flac': ('soundfile', 'ffmpeg'),
+	'ogg': ('soundfile', 'ffmpeg'),
+	'mp3': ('soundfile', 'ffmpeg'),
+	'webm': ('ffmpeg',),
+	'm4a': ('ffmpeg',),
+	'unknown': ('ffmpeg',),
+}
+
+
+def _resample(waveform: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+	if orig_sr == target_sr or waveform.size == 0:
+		return waveform
+	import librosa
+
+	return librosa.resample(waveform, orig_sr=orig_sr, target_sr=target_sr)
+
+
+def decode_audio(
+	path: Path,
+	sample_rate: int,
+	*,
+	ffmpeg_pool=None,
+	max_samples: int | None = None,
+	ffmpeg_timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+) -> DecodedAudio:
+	"""Decode ``path`` to a mono float32 waveform at ``sample_rate``.
+
+	When an ``FFmpegDecoderPool`` is given, FFmpeg decodes go through its
+	pre-spawned processes (and its own timeout) instead of forking a new one
+	per file. With ``max_samples``, at most that many samples are decoded and
+	returned.
+	"""
+
+	path = Path(path)
+	container = sniff_container(path)
+	errors = []
+	for name in DECODER_CHAIN[container]:
+		try:
+			if name == 'ffmpeg' and ffmpeg_pool is not None:
+				waveform = ffmpeg_pool.decode(path, container, sample_rate, max_samples=max_samples)
+				native_sr = sample_rate
+				name = 'ffmpeg-pool'
+			elif name == 'ffmpeg':
+				waveform, native_sr = _decode_ffmpeg(path, sample_rate, max_samples, ffmpeg_timeout)
+			else:
+				waveform, native_sr = DECODERS[name](path, sample_rate, max_samples)
+		except Exception as exc:  # pragma: no cover - codec support dependent
+			logger.debug('Decodificador %s falhou para %s (%s): %s', name, path.name, container, exc)
+			errors.append(f'{name}: {str(exc).strip() or exc.__class__.__name__}')
+			continue
+		waveform = _resample(waveform, native_sr, sample_rate)
+		truncated = max_samples is not None and waveform.size >= max_samples
+		if truncated:
+			waveform = waveform[:max_samples]
+		logger.debug('Áudio %s (%s) decodificado com %s.', path.name, container, name)
+		return DecodedAudio(waveform, sample_rate, container, name, native_sr, truncated)
+	raise AudioDecodingError(
+		f'Não foi possível converter o áudio ({path.name}): {"; ".join(errors)}'
+	)
@@ -1,34 +1,50 @@
-"""Utilities to load the emotion model and run predictions on audio files."""
+"""Utilities to load the emotion model and run predictions on audio files.
+
+TensorFlow, librosa, h5py and scikit-learn are imported on first use only, so
+importing this module (views, management commands, tests) stays cheap. Call
+``warm_up`` to pay that cost up front in processes that will run inference.
+"""
 
 from __future__ import annotations
 
-import io
-import json
 import logging
-import subprocess
-import zipfile
+import time
+from dataclasses import replace
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
-import h5py
-import imageio_ffmpeg
-import joblib
-import librosa
 import numpy as np
-import tensorflow as tf
 from django.conf import settings
-from sklearn.exceptions import InconsistentVersionWarning
+
+from . import metrics
+from .audio_decoding import FFMPEG_TIMEOUT_SECONDS, AudioDecodingError, DecodedAudio, decode_audio, sniff_container
+from .batching import MicroBatcher
+from .feature_cache import FeatureCache, audio_sha256
+from .feature_spec import FeatureSpec, FeatureSpecError, load_for_model as load_feature_spec
+from .ffmpeg_pool import FFmpegDecoderPool
+from .inference_backends import InferenceBackend, get_backend_class
+from .quantization import is_variant_accepted
+from .model_artifacts import file_sha256
+from .model_registry import ActiveModel, ModelRegistry, ModelSpec
+from .model_server import ModelServerClient
+from .shadow import ShadowRunner
 
 # Keep warnings scoped to the label encoder load only.
 import warnings
 
 logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('emotion_analysis.slow')
 
 
 MODEL_RELATIVE_PATH = Path('static/modelo/modelo_emocoes.keras')
 ENCODER_RELATIVE_PATH = Path('static/modelo/label_encoder.joblib')
 
+# Sample rate of the legacy mel features; FFmpeg processes are pre-started at it.
+MEL_SAMPLE_RATE = 22050
+# Bump whenever feature extraction changes so cached tensors are not reused.
+FEATURE_EXTRACTOR_VERSION = 'numpy-features-v2'
+
 CANONICAL_EMOTIONS = [
 	'alegria',
 	'tristeza',
@@ -64,194 +80,426 @@ def _resolve_artifact(path: Path) -> Path:
 	return absolute
 
 
-def _normalise_layer_config(seq_config: Dict) -> Dict:
-	"""Tweak Keras 3 config so TensorFlow 2.15 (tf.keras) can rebuild it."""
+def _read_label_encoder(encoder_path: Path):
+	import joblib
+	from sklearn.exceptions import InconsistentVersionWarning
+
+	with warnings.catch_warnings():
+		warnings.simplefilter('ignore', category=InconsistentVersionWarning)
+		return joblib.load(encoder_path)
+
+
+def label_encoder_for(model_path: Path):
+	"""The ``label_encoder.joblib`` saved next to ``model_path`` (training writes them side by side)."""
+
+	encoder_path = Path(model_path).with_name(ENCODER_RELATIVE_PATH.name)
+	if not encoder_path.exists():
+		raise AudioProcessingError(f'LabelEncoder não encontrado ao lado do modelo: {encoder_path}')
+	return _read_label_encoder(encoder_path)
+
+
+@lru_cache(maxsize=1)
+def load_label_encoder():
+	"""Load and cache the label encoder shipped in ``static/modelo``."""
+
+	return _read_label_encoder(_resolve_artifact(ENCODER_RELATIVE_PATH))
+
+
+@lru_cache(maxsize=8)
+def _artifact_digest(path: Path, size: int, mtime_ns: int) -> str:
+	# Keyed by size/mtime so periodic registry checks do not rehash unchanged files.
+	return file_sha256(path)
+
+
+def _spec_from_record(record) -> ModelSpec:
+	return ModelSpec(
+		version=record.version,
+		model_path=Path(record.model_path),
+		encoder_path=Path(record.encoder_path),
+		sha256=record.sha256,
+		labels=tuple(record.labels),
+	)
 
-	# Sequential dtype is stored as a dictionary in the Keras 3 archive.
-	dtype = seq_config.get('dtype')
-	if isinstance(dtype, dict):
-		seq_config['dtype'] = dtype.get('config', {}).get('name', 'float32')
 
-	for layer in seq_config.get('layers', []):
-		cfg = layer.get('config', {})
-		# Legacy tf.keras expects batch_input_shape instead of batch_shape.
-		if 'batch_shape' in cfg:
-			cfg['batch_input_shape'] = cfg.pop('batch_shape')
-		dtype = cfg.get('dtype')
-		if isinstance(dtype, dict):
-			cfg['dtype'] = dtype.get('config', {}).get('name', 'float32')
-	return seq_config
+def _active_model_spec() -> ModelSpec:
+	"""The active ``ModelVersion``, or the artifacts in ``static/modelo`` when none is registered.
 
+	The version name carries the quantized variant (``EMOTION_MODEL_VARIANT``)
+	as a suffix, since that also changes the predictions.
+	"""
 
-def _rehydrate_model(weights_bytes: bytes, seq_config: Dict) -> tf.keras.Model:
-	"""Build a tf.keras model from a Sequential config and manual weights."""
+	from django.db import DatabaseError
 
-	model = tf.keras.Sequential.from_config(seq_config)
-	build_shape = seq_config.get('build_input_shape')
-	if build_shape:
-		model.build(tuple(build_shape))
+	from .models import ModelVersion
 
-	with h5py.File(io.BytesIO(weights_bytes), 'r') as weights_file:
-		layer_store = weights_file['layers']
-		for layer in model.layers:
-			if layer.name not in layer_store:
-				continue
-			store = layer_store[layer.name]
+	try:
+		record = ModelVersion.objects.filter(is_active=True).first()
+	except DatabaseError:
+		# Registry table not migrated yet.
+		record = None
 
-			def _read_vars(group: h5py.Group) -> list[np.ndarray]:
-				keys = sorted(group.keys(), key=lambda k: int(k))
-				return [group[key][()] for key in keys]
+	if record is not None:
+		spec = _spec_from_record(record)
+	else:
+		model_path = _resolve_artifact(MODEL_RELATIVE_PATH)
+		stat = model_path.stat()
+		digest = _artifact_digest(model_path, stat.st_size, stat.st_mtime_ns)
+		spec = ModelSpec(digest[:12], model_path, ENCODER_RELATIVE_PATH, digest)
+
+	variant = getattr(settings, 'EMOTION_MODEL_VARIANT', '')
+	if variant:
+		spec = replace(spec, version=f'{spec.version}-{variant}')
+	return spec
+
+
+def _load_active_model(spec: ModelSpec) -> ActiveModel:
+	"""Load a model version through the backend selected in settings and warm it up.
+
+	``EMOTION_INFERENCE_BACKEND`` names a registered backend (``keras`` or
+	``tflite``); its artifact sits next to the version's ``.keras`` file.
+	``EMOTION_MODEL_VARIANT`` (``float16``/``int8``) serves a quantized TFLite
+	variant instead. The feature spec saved next to the ``.keras`` file says
+	which input tensor the model was trained on.
+	"""
+
+	keras_path = _resolve_artifact(spec.model_path)
+	if spec.sha256 and file_sha256(keras_path) != spec.sha256:
+		raise AudioProcessingError(f'O arquivo do modelo {spec.version} difere do registrado: {keras_path}')
+
+	variant = getattr(settings, 'EMOTION_MODEL_VARIANT', '')
+	if variant:
+		# Quantized variants are TFLite-only and must have passed quantize_model's gate.
+		accepted, reason = is_variant_accepted(keras_path, variant)
+		if not accepted:
+			raise AudioProcessingError(f'Variante quantizada {variant} recusada: {reason}')
+		backend_class = get_backend_class('tflite')
+	else:
+		backend_class = get_backend_class(getattr(settings, 'EMOTION_INFERENCE_BACKEND', 'keras'))
+	model_path = _resolve_artifact(backend_class.artifact_path(keras_path, variant))
+	options = dict(getattr(settings, 'EMOTION_INFERENCE_BACKEND_OPTIONS', {}))
+	options.setdefault('cache_dir', getattr(settings, 'EMOTION_MODEL_CACHE_DIR', None))
+	backend = backend_class(model_path, **options)
+
+	if spec.labels is not None:
+		labels = np.asarray(spec.labels)
+	else:
+		labels = _read_label_encoder(_resolve_artifact(spec.encoder_path)).classes_
+
+	try:
+		features = load_feature_spec(keras_path)
+	except FeatureSpecError as exc:
+		raise AudioProcessingError(str(exc)) from exc
+
+	# The first predict builds the graph; pay for it before the model is served.
+	# It also fails early when the spec does not match the model's input.
+	try:
+		backend.predict(np.zeros((1,) + features.input_shape, dtype=np.float32))
+	except (ValueError, RuntimeError) as exc:
+		raise AudioProcessingError(
+			f'O modelo {spec.version} não aceita features {features.kind} {features.input_shape}: {exc}'
+		) from exc
+	logger.info(
+		'Modelo de emoções %s carregado com sucesso (backend %s, features %s %s).',
+		spec.version, backend.name, features.kind, features.input_shape,
+	)
+	return ActiveModel(spec.version, backend, labels, features)
 
-			weights = []
-			if 'vars' in store and len(store['vars']) > 0:
-				weights = _read_vars(store['vars'])
-			elif 'cell' in store:
-				weights = _read_vars(store['cell']['vars'])
 
-			if weights:
-				layer.set_weights(weights)
+def _close_db_connection() -> None:
+	from django.db import connection
 
-	return model
+	connection.close()
 
 
 @lru_cache(maxsize=1)
-def load_model() -> tf.keras.Model:
-	"""Load and cache the TensorFlow model from the Keras 3 archive."""
+def get_model_registry() -> ModelRegistry:
+	"""Process-wide holder of the active model version."""
+
+	return ModelRegistry(
+		_active_model_spec,
+		_load_active_model,
+		refresh_interval=getattr(settings, 'EMOTION_MODEL_REFRESH_SECONDS', 30.0),
+		# The refresh thread opens its own DB connection; close it when done.
+		on_refresh_done=_close_db_connection,
+	)
+
+
+def active_model() -> ActiveModel:
+	"""Snapshot of the model version currently served in this process."""
+
+	return get_model_registry().current()
+
+
+def model_snapshot() -> ActiveModel | None:
+	"""The in-process model to pin for one analysis, or ``None`` with a model server."""
 
-	model_path = _resolve_artifact(MODEL_RELATIVE_PATH)
-	with zipfile.ZipFile(model_path) as archive:
-		config = json.loads(archive.read('config.json'))
-		seq_config = _normalise_layer_config(config['config'])
-		weights_bytes = archive.read('model.weights.h5')
+	return None if get_model_client() is not None else active_model()
 
-	model = _rehydrate_model(weights_bytes, seq_config)
-	logger.info('Modelo de emoções carregado com sucesso.')
-	return model
+
+def load_model() -> InferenceBackend:
+	"""Backend of the active model version."""
+
+	return active_model().backend
+
+
+def model_version() -> str:
+	"""Version name of the model behind predictions."""
+
+	client = get_model_client()
+	if client is not None:
+		return client.model_version()
+	return active_model().version
+
+
+def model_info(model: ActiveModel | None = None) -> Dict[str, object]:
+	"""Version, output labels and feature spec of ``model`` (default: the active one), as served by the model server."""
+
+	active = model or active_model()
+	return {
+		'version': active.version,
+		'labels': [str(label) for label in active.labels],
+		'feature_spec': active.features.to_dict(),
+	}
+
+
+def feature_spec(model: ActiveModel | None = None) -> FeatureSpec:
+	"""Input features of ``model``, or of the model currently served."""
+
+	if model is not None:
+		return model.features
+	client = get_model_client()
+	if client is not None:
+		return FeatureSpec.from_dict(client.feature_spec())
+	return active_model().features
+
+
+def _import_heavy_dependencies() -> None:
+	"""Import the slow-loading libraries used by the inference pipeline."""
+
+	import h5py  # noqa: F401
+	import joblib  # noqa: F401
+	import librosa  # noqa: F401
+	import sklearn  # noqa: F401
+	import tensorflow  # noqa: F401
+
+
+def warm_up(load_artifacts: bool = True) -> None:
+	"""Eagerly import heavy dependencies and, optionally, load model artifacts.
+
+	Meant for inference processes (job workers, the model server) that would
+	otherwise pay this cost on their first analysis.
+	"""
+
+	pool = get_ffmpeg_pool()
+	if pool is not None:
+		pool.prewarm(MEL_SAMPLE_RATE)
+	if get_model_client() is not None:
+		# The model lives in the model server; only the DSP stack is needed here.
+		import librosa  # noqa: F401
+		return
+	_import_heavy_dependencies()
+	if load_artifacts:
+		active_model()
+	logger.info('Pipeline de análise de emoções pré-carregado.')
+
+
+def _predict_batch(batch: np.ndarray, model: ActiveModel | None = None) -> np.ndarray:
+	"""Single forward pass over a stacked batch of feature tensors, on ``model`` or the active version."""
+
+	return (model or active_model()).backend.predict(batch)
 
 
 @lru_cache(maxsize=1)
-def load_label_encoder():
-	"""Load and cache the label encoder used during model training."""
+def get_batcher() -> MicroBatcher:
+	"""Process-wide micro-batcher shared by every thread that runs inference."""
 
-	encoder_path = _resolve_artifact(ENCODER_RELATIVE_PATH)
-	with warnings.catch_warnings():
-		warnings.simplefilter('ignore', category=InconsistentVersionWarning)
-		encoder = joblib.load(encoder_path)
-	return encoder
+	return MicroBatcher(
+		_predict_batch,
+		max_batch_size=getattr(settings, 'EMOTION_BATCH_MAX_SIZE', 16),
+		max_latency_ms=getattr(settings, 'EMOTION_BATCH_MAX_LATENCY_MS', 10.0),
+	)
 
 
-def _error_details(exc: Exception) -> str:
-	message = str(exc).strip()
-	return message or exc.__class__.__name__
+@lru_cache(maxsize=1)
+def get_model_client() -> ModelServerClient | None:
+	"""Client for the shared model server, or ``None`` to run the model in-process."""
 
+	socket_path = getattr(settings, 'EMOTION_MODEL_SERVER_SOCKET', '')
+	if not socket_path:
+		return None
+	return ModelServerClient(socket_path, timeout=getattr(settings, 'EMOTION_MODEL_SERVER_TIMEOUT', 30.0))
 
-def _load_waveform(audio_path: Path, sample_rate: int) -> tuple[np.ndarray, int]:
-	"""Load audio and return a mono waveform at the desired sample rate."""
 
-	primary_exc: Exception | None = None
-	try:
-		waveform, sr = librosa.load(audio_path.as_posix(), sr=sample_rate)
-		return waveform, sr
-	except Exception as exc:  # pragma: no cover - backend dependent
-		primary_exc = exc
-		logger.debug('librosa não conseguiu ler %s: %s', audio_path, exc)
+def class_labels() -> np.ndarray:
+	"""Raw labels in the order of the model's output units."""
 
-	try:
-		import audioread
+	client = get_model_client()
+	if client is not None:
+		return np.asarray(client.labels())
+	return active_model().labels
 
-		with audioread.audio_open(audio_path.as_posix()) as reader:
-			native_sr = reader.samplerate
-			channels = reader.channels
-			pcm_chunks = [np.frombuffer(buf, dtype=np.int16) for buf in reader]
 
-		if not pcm_chunks:
-			return np.array([], dtype=np.float32), sample_rate
+def predict_features(features: np.ndarray, model: ActiveModel | None = None) -> np.ndarray:
+	"""Return class probabilities for a ``(1,) + input_shape`` feature tensor.
 
-		pcm = np.concatenate(pcm_chunks)
-		if channels > 1:
-			pcm = pcm.reshape(-1, channels).mean(axis=1)
+	``model`` pins an in-process model version (see ``model_snapshot``).
+	"""
 
-		waveform = pcm.astype(np.float32) / 32768.0
-		if native_sr != sample_rate and waveform.size:
-			waveform = librosa.resample(waveform, orig_sr=native_sr, target_sr=sample_rate)
-		return waveform, sample_rate
-	except Exception as exc:  # pragma: no cover - dependent on ffmpeg backend
-		logger.debug('audioread não conseguiu ler %s: %s', audio_path, exc)
-		if primary_exc is None:
-			primary_exc = exc
+	client = get_model_client()
+	if client is not None:
+		return client.predict(features[0])
+	model = model or active_model()
+	if getattr(settings, 'EMOTION_BATCHING_ENABLED', False):
+		# Batched with other requests for the same snapshot only, even across a hot swap.
+		return get_batcher().predict(features[0], model=model)
+	return model.backend.predict(features)[0]
 
-	try:
-		ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-		command = [
-			ffmpeg_exe,
-			'-hide_banner',
-			'-loglevel', 'error',
-			'-i', audio_path.as_posix(),
-			'-ac', '1',
-			'-ar', str(sample_rate),
-			'-f', 'f32le',
-			'pipe:1',
-		]
-		completed = subprocess.run(
-			command,
-			stdout=subprocess.PIPE,
-			stderr=subprocess.PIPE,
-			check=False,
-		)
-		if completed.returncode != 0:
-			stderr = completed.stderr.decode('utf-8', errors='ignore').strip()
-			raise AudioProcessingError(
-				f'FFmpeg não conseguiu converter o áudio ({audio_path.name}): {stderr}'
-			)
-		waveform = np.frombuffer(completed.stdout, dtype=np.float32)
-		return waveform, sample_rate
-	except AudioProcessingError:
-		raise
-	except Exception as exc:  # pragma: no cover - defensive
-		reason = _error_details(primary_exc or exc)
-		raise AudioProcessingError(
-			f'Não foi possível converter o áudio ({audio_path.name}): {reason}'
-		) from exc
 
+def predict_batch(batch: np.ndarray, model: ActiveModel | None = None) -> np.ndarray:
+	"""Return class probabilities for a ``(n,) + input_shape`` batch of feature tensors."""
 
-def _extract_melspectrogram(
-	audio_path: Path,
-	*,
-	sample_rate: int = 22050,
-	n_mels: int = 40,
-	hop_length: int = 512,
-	n_fft: int = 2048,
-	target_frames: int = 174,
-) -> np.ndarray:
-	"""Convert an audio file into the mel-spectrogram tensor expected by the model."""
+	client = get_model_client()
+	if client is not None:
+		return client.predict_batch(batch)
+	model = model or active_model()
+	if getattr(settings, 'EMOTION_BATCHING_ENABLED', False):
+		batcher = get_batcher()
+		futures = [batcher.submit(row, model) for row in batch]
+		return np.stack([future.result() for future in futures])
+	return model.backend.predict(batch)
 
-	waveform, sr = _load_waveform(audio_path, sample_rate)
 
-	if waveform.size == 0:
-		raise AudioProcessingError('O arquivo de áudio está vazio ou corrompido.')
+def _load_shadow_candidate() -> ActiveModel:
+	"""Load the ``EMOTION_SHADOW_MODEL_VERSION`` model (runs in the shadow thread)."""
+
+	from .models import ModelVersion
 
-	melspec = librosa.feature.melspectrogram(
-		y=waveform,
-		sr=sr,
-		n_fft=n_fft,
-		hop_length=hop_length,
-		n_mels=n_mels,
+	version = getattr(settings, 'EMOTION_SHADOW_MODEL_VERSION', '')
+	try:
+		record = ModelVersion.objects.get(version=version)
+	except ModelVersion.DoesNotExist as exc:
+		raise AudioProcessingError(f'Versão sombra {version} não registrada.') from exc
+	finally:
+		_close_db_connection()
+	return _load_active_model(_spec_from_record(record))
+
+
+@lru_cache(maxsize=1)
+def get_shadow_runner() -> ShadowRunner | None:
+	"""Shadow runner for the candidate model, or ``None`` when shadowing is off."""
+
+	if not getattr(settings, 'EMOTION_SHADOW_MODEL_VERSION', ''):
+		return None
+	return ShadowRunner(
+		_load_shadow_candidate,
+		_summarise_prediction,
+		sample_rate=getattr(settings, 'EMOTION_SHADOW_SAMPLE_RATE', 1.0),
+		queue_size=getattr(settings, 'EMOTION_SHADOW_QUEUE_SIZE', 64),
+		log_every=getattr(settings, 'EMOTION_SHADOW_LOG_EVERY', 100),
+		retry_seconds=getattr(settings, 'EMOTION_SHADOW_RETRY_SECONDS', 60),
 	)
-	melspec_db = librosa.power_to_db(melspec, ref=np.max)
 
-	# Pad or trim time dimension so the tensor matches the training shape (40, 174).
-	if melspec_db.shape[1] < target_frames:
-		pad_width = target_frames - melspec_db.shape[1]
-		melspec_db = np.pad(melspec_db, ((0, 0), (0, pad_width)), mode='constant')
+
+def _shadow(features: np.ndarray, probabilities: np.ndarray, model: ActiveModel | None, latency: float) -> None:
+	"""Hand already-extracted features and the active model's output to the shadow runner."""
+
+	runner = get_shadow_runner()
+	if runner is None:
+		return
+	if model is not None:
+		labels, version = model.labels, model.version
 	else:
-		melspec_db = melspec_db[:, :target_frames]
+		labels, version = class_labels(), model_version()
+	runner.submit(features, probabilities, labels, version, latency)
+
+
+@lru_cache(maxsize=1)
+def get_ffmpeg_pool() -> FFmpegDecoderPool | None:
+	"""Shared pool of warm FFmpeg processes, or ``None`` to fork one per file."""
+
+	size = getattr(settings, 'EMOTION_FFMPEG_POOL_SIZE', 0)
+	if not size:
+		return None
+	return FFmpegDecoderPool(
+		size=size,
+		max_concurrency=getattr(settings, 'EMOTION_FFMPEG_MAX_CONCURRENCY', 4),
+		timeout=getattr(settings, 'EMOTION_FFMPEG_TIMEOUT_SECONDS', FFMPEG_TIMEOUT_SECONDS),
+	)
+
+
+def _load_waveform(audio_path: Path, sample_rate: int, max_samples: int | None = None) -> DecodedAudio:
+	"""Load audio and return a mono waveform at the desired sample rate."""
 
-	features = melspec_db.astype(np.float32)
-	features = np.expand_dims(features, axis=-1)  # (40, 174, 1)
-	features = np.expand_dims(features, axis=0)   # (1, 40, 174, 1)
+	started = time.perf_counter()
+	try:
+		with metrics.stage('decode'):
+			decoded = decode_audio(
+				audio_path,
+				sample_rate,
+				ffmpeg_pool=get_ffmpeg_pool(),
+				max_samples=max_samples,
+				ffmpeg_timeout=getattr(settings, 'EMOTION_FFMPEG_TIMEOUT_SECONDS', FFMPEG_TIMEOUT_SECONDS),
+			)
+	except AudioDecodingError as exc:
+		raise AudioProcessingError(str(exc)) from exc
+	metrics.DECODE_SECONDS.observe(time.perf_counter() - started, container=decoded.container, decoder=decoded.decoder)
+	metrics.annotate(
+		container=decoded.container,
+		decoder=decoded.decoder,
+		audio_seconds=decoded.duration,
+		truncated=decoded.truncated,
+	)
+	return decoded
+
+
+@lru_cache(maxsize=1)
+def get_feature_cache() -> FeatureCache | None:
+	"""Shared on-disk feature cache, or ``None`` when disabled in settings."""
+
+	directory = getattr(settings, 'EMOTION_FEATURE_CACHE_DIR', None)
+	if not directory:
+		return None
+	return FeatureCache(Path(directory), getattr(settings, 'EMOTION_FEATURE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+def _extract_features(audio_path: Path, spec: FeatureSpec | None = None) -> np.ndarray:
+	"""Build the ``(1,) + spec.input_shape`` tensor for an audio file.
+
+	``spec`` defaults to the served model's. Results are memoised in the
+	feature cache under the audio's content hash and the spec.
+	"""
+
+	spec = spec or feature_spec()
+	cache = get_feature_cache()
+	if cache is None:
+		return _compute_features(audio_path, spec)
+
+	with metrics.stage('hash'):
+		key = cache.make_key(audio_sha256(audio_path), {'extractor': FEATURE_EXTRACTOR_VERSION, **spec.to_dict()})
+		features = cache.get(key)
+	metrics.FEATURE_CACHE_LOOKUPS.inc(result='miss' if features is None else 'hit')
+	metrics.annotate(feature_cache='miss' if features is None else 'hit')
+	if features is None:
+		features = _compute_features(audio_path, spec)
+		cache.put(key, features)
 	return features
 
 
+def _compute_features(audio_path: Path, spec: FeatureSpec) -> np.ndarray:
+	# The model only sees the first spec.frames hops; skip decoding the rest.
+	max_samples = spec.samples_needed if getattr(settings, 'EMOTION_BOUNDED_DECODE', True) else None
+	decoded = _load_waveform(audio_path, spec.sample_rate, max_samples)
+	waveform = decoded.waveform
+
+	if waveform.size == 0:
+		raise AudioProcessingError('O arquivo de áudio está vazio ou corrompido.')
+
+	with metrics.stage('features'):
+		# Zero-padded to spec.frames like the training tensors.
+		features = spec.extract(waveform)
+	return features[np.newaxis]
+
+
 def _aggregate_probabilities(raw_labels: np.ndarray, probs: np.ndarray) -> Dict[str, float]:
 	"""Remap raw model labels to the canonical ones used in the application."""
 
@@ -264,20 +512,43 @@ def _aggregate_probabilities(raw_labels: np.ndarray, probs: np.ndarray) -> Dict[
 	return aggregated
 
 
-def analyze_audio_file(audio_path: Path) -> Dict[str, object]:
-	"""Run the end-to-end prediction pipeline for the supplied audio file."""
-
-	absolute_path = audio_path if audio_path.is_absolute() else Path(audio_path).resolve()
-	if not absolute_path.exists():
-		raise AudioProcessingError(f"Arquivo de áudio não encontrado: {absolute_path}")
+def compare_backends(
+	reference: InferenceBackend,
+	candidate: InferenceBackend,
+	features: np.ndarray,
+	raw_labels: np.ndarray,
+) -> Dict[str, float]:
+	"""Compare two backends on the canonical probabilities the app stores.
+
+	``raw_labels`` are the output labels of the compared model (its own
+	encoder, not the active version's). Returns the max/mean absolute
+	difference of ``_aggregate_probabilities`` and the dominant-emotion
+	agreement over the ``(n, ...)`` feature batch.
+	"""
+
+	reference_probs = reference.predict(features)
+	candidate_probs = candidate.predict(features)
+
+	diffs = []
+	agreements = []
+	for ref_row, cand_row in zip(reference_probs, candidate_probs):
+		ref = _aggregate_probabilities(raw_labels, ref_row)
+		cand = _aggregate_probabilities(raw_labels, cand_row)
+		diffs.append([abs(ref[emotion] - cand[emotion]) for emotion in CANONICAL_EMOTIONS])
+		agreements.append(max(ref, key=ref.get) == max(cand, key=cand.get))
+
+	diffs_array = np.asarray(diffs)
+	return {
+		'samples': len(diffs),
+		'max_abs_diff': float(diffs_array.max()) if diffs else 0.0,
+		'mean_abs_diff': float(diffs_array.mean()) if diffs else 0.0,
+		'agreement': float(np.mean(agreements)) if agreements else 1.0,
+	}
 
-	model = load_model()
-	encoder = load_label_encoder()
 
-	features = _extract_melspectrogram(absolute_path)
-	predictions = model.predict(features, verbose=0)[0]
+def _summarise_prediction(raw_labels: np.ndarray, predictions: np.ndarray) -> Dict[str, object]:
+	"""Dominant canonical emotion, its confidence and the canonical distribution."""
 
-	raw_labels = encoder.classes_
 	top_raw_label = raw_labels[int(np.argmax(predictions))]
 	aggregated = _aggregate_probabilities(raw_labels, predictions)
 
@@ -294,10 +565,243 @@ def analyze_audio_file(audio_path: Path) -> Dict[str, object]:
 		'dominant_emotion': dominant_emotion,
 		'confidence': confidence,
 		'emotions_data': emotions_data,
-		'raw_prediction': top_raw_label,
+		'raw_prediction': str(top_raw_label),
 	}
 
 
+def _timeline_result(
+	raw_labels: np.ndarray,
+	probabilities: np.ndarray,
+	windows: List[Tuple[float, float]],
+) -> Dict[str, object]:
+	"""Overall result (mean of the windows) plus the per-window timeline."""
+
+	timeline = []
+	for (start, end), row in zip(windows, probabilities):
+		window = _summarise_prediction(raw_labels, row)
+		timeline.append({
+			'start': start,
+			'end': end,
+			'dominant_emotion': window['dominant_emotion'],
+			'confidence': window['confidence'],
+			'emotions_data': window['emotions_data'],
+		})
+
+	result = _summarise_prediction(raw_labels, probabilities.mean(axis=0))
+	result['timeline'] = timeline
+	return result
+
+
+def build_result(
+	probabilities: np.ndarray,
+	windows: List[Tuple[float, float]] | None = None,
+	*,
+	model: ActiveModel | None = None,
+) -> Dict[str, object]:
+	"""Turn model outputs into the payload stored in ``EmotionAnalysis``.
+
+	``probabilities`` holds one row per window when ``windows`` is given and a
+	single row otherwise. Labels and version come from ``model`` when the
+	prediction was pinned to it, else from the model currently served.
+	"""
+
+	if model is not None:
+		raw_labels, version = model.labels, model.version
+	else:
+		raw_labels, version = class_labels(), model_version()
+	if windows is None:
+		result = _summarise_prediction(raw_labels, probabilities[0])
+		result['timeline'] = []
+	else:
+		result = _timeline_result(raw_labels, probabilities, windows)
+	result['model_version'] = version
+	return result
+
+
+def _load_full_waveform(audio_path: Path, sample_rate: int) -> np.ndarray:
+	waveform = _load_waveform(audio_path, sample_rate).waveform
+	if waveform.size == 0:
+		raise AudioProcessingError('O arquivo de áudio está vazio ou corrompido.')
+	return waveform
+
+
+def _iter_timeline_batches(waveform: np.ndarray, spec: FeatureSpec, hop_seconds: float, batch_size: int):
+	"""Yield ``(windows, features)`` batches covering the whole waveform.
+
+	Feature time is recorded as the ``features`` stage.
+	"""
+
+	sample_rate = spec.sample_rate
+	hop_samples = max(1, int(round(hop_seconds * sample_rate)))
+	batches = spec.iter_window_batches(waveform, hop_samples, batch_size)
+	for starts, batch in metrics.timed(batches, 'features'):
+		windows = [
+			(
+				round(start / sample_rate, 3),
+				round(min(start + spec.samples_needed, waveform.size) / sample_rate, 3),
+			)
+			for start in starts
+		]
+		yield windows, batch
+
+
+def analyze_timeline(
+	audio_path: Path,
+	*,
+	hop_seconds: float | None = None,
+	batch_size: int | None = None,
+) -> Dict[str, object]:
+	"""Analyse the whole recording in overlapping windows.
+
+	Each window is the model's full input (~4 s); windows start every
+	``hop_seconds``. Window spectrograms are generated and predicted in batches
+	of ``batch_size``, so only one batch is held in memory at a time. The
+	overall result averages the window probabilities.
+	"""
+
+	hop_seconds = hop_seconds or getattr(settings, 'EMOTION_TIMELINE_HOP_SECONDS', 2.0)
+	batch_size = batch_size or getattr(settings, 'EMOTION_TIMELINE_BATCH_SIZE', 32)
+
+	with metrics.stage('model'):
+		model = model_snapshot()
+		spec = feature_spec(model)
+	waveform = _load_full_waveform(audio_path, spec.sample_rate)
+	windows: List[Tuple[float, float]] = []
+	probabilities = []
+	predict_seconds = 0.0
+	for batch_windows, features in _iter_timeline_batches(waveform, spec, hop_seconds, batch_size):
+		started = time.perf_counter()
+		batch_probabilities = predict_batch(features, model)
+		latency = time.perf_counter() - started
+		predict_seconds += latency
+		# The batch buffer is reused by the generator; the shadow thread needs a copy.
+		_shadow(features.copy(), batch_probabilities, model, latency)
+		probabilities.append(batch_probabilities)
+		windows.extend(batch_windows)
+	metrics.record('predict', predict_seconds)
+	with metrics.stage('aggregate'):
+		return build_result(np.concatenate(probabilities), windows, model=model)
+
+
+def extract_analysis_features(
+	audio_path: Path,
+	*,
+	spec: FeatureSpec | None = None,
+	timeline: bool | None = None,
+) -> Tuple[np.ndarray, List[Tuple[float, float]] | None]:
+	"""Feature tensors for ``audio_path`` without running the model.
+
+	Returns a ``(1,) + spec.input_shape`` tensor and ``None``, or, in
+	timeline mode, one row per window plus the window bounds. Pair the model
+	output with ``build_result``; used where decoding and inference run in
+	different processes (``reanalyze_recordings``), which pass the ``spec``
+	of the model that will score the tensors.
+	"""
+
+	spec = spec or feature_spec()
+	if timeline is None:
+		timeline = getattr(settings, 'EMOTION_TIMELINE_ENABLED', False)
+	if not timeline:
+		return _extract_features(audio_path, spec), None
+
+	windows: List[Tuple[float, float]] = []
+	batches = []
+	hop_seconds = getattr(settings, 'EMOTION_TIMELINE_HOP_SECONDS', 2.0)
+	batch_size = getattr(settings, 'EMOTION_TIMELINE_BATCH_SIZE', 32)
+	waveform = _load_full_waveform(audio_path, spec.sample_rate)
+	for batch_windows, features in _iter_timeline_batches(waveform, spec, hop_seconds, batch_size):
+		# The generator reuses its buffer; keep a copy of every batch.
+		batches.append(features.copy())
+		windows.extend(batch_windows)
+	return np.concatenate(batches), windows
+
+
+def extract_features_task(item_id, audio_path: str, spec_data: Dict[str, object]):
+	"""Process-pool entry point around ``extract_analysis_features``.
+
+	``spec_data`` is the scoring model's ``FeatureSpec.to_dict()``, so
+	workers never load the model. Returns ``(item_id, features, windows,
+	error)``; errors are reported as text so one bad file does not break the
+	pool.
+	"""
+
+	try:
+		features, windows = extract_analysis_features(Path(audio_path), spec=FeatureSpec.from_dict(spec_data))
+	except Exception as exc:
+		return item_id, None, None, f'{exc.__class__.__name__}: {exc}'
+	return item_id, features, windows, ''
+
+
+def analyze_audio_file(audio_path: Path, *, timeline: bool | None = None) -> Dict[str, object]:
+	"""Run the end-to-end prediction pipeline for the supplied audio file.
+
+	With ``timeline`` (default: ``EMOTION_TIMELINE_ENABLED``) the whole
+	recording is scored window by window; otherwise only its first ~4 s.
+	Stage timings are exported by ``metrics``; analyses slower than
+	``EMOTION_SLOW_ANALYSIS_SECONDS`` are logged with their breakdown.
+	"""
+
+	with metrics.trace() as analysis_trace:
+		with metrics.stage('total'):
+			result = _analyze_audio_file(audio_path, timeline)
+	_log_if_slow(audio_path, analysis_trace)
+	return result
+
+
+def _analyze_audio_file(audio_path: Path, timeline: bool | None) -> Dict[str, object]:
+	with metrics.stage('resolve'):
+		absolute_path = audio_path if audio_path.is_absolute() else Path(audio_path).resolve()
+		if not absolute_path.exists():
+			raise AudioProcessingError(f"Arquivo de áudio não encontrado: {absolute_path}")
+
+	if timeline is None:
+		timeline = getattr(settings, 'EMOTION_TIMELINE_ENABLED', False)
+	if timeline:
+		return analyze_timeline(absolute_path)
+
+	with metrics.stage('model'):
+		model = model_snapshot()
+		spec = feature_spec(model)
+	features = _extract_features(absolute_path, spec)
+	started = time.perf_counter()
+	with metrics.stage('predict'):
+		predictions = predict_features(features, model)
+	_shadow(features, predictions[np.newaxis], model, time.perf_counter() - started)
+	with metrics.stage('aggregate'):
+		return build_result(predictions[np.newaxis], model=model)
+
+
+def _log_if_slow(audio_path: Path, analysis_trace: metrics.AnalysisTrace) -> None:
+	threshold = getattr(settings, 'EMOTION_SLOW_ANALYSIS_SECONDS', 5.0)
+	if not threshold or analysis_trace.total < threshold:
+		return
+
+	metrics.SLOW_ANALYSES.inc()
+	info = analysis_trace.info
+	if 'container' not in info:
+		# Features came from the cache: nothing was decoded, but the codec is still useful.
+		try:
+			info['container'] = sniff_container(audio_path)
+		except OSError:
+			info['container'] = '?'
+	stages = ', '.join(
+		f'{name} {1000 * seconds:.0f} ms'
+		for name, seconds in analysis_trace.stages.items()
+		if name != 'total'
+	)
+	audio_seconds = info.get('audio_seconds')
+	slow_logger.warning(
+		'Análise lenta de %s: %.2f s (%s); áudio %s, contêiner %s, decodificador %s, cache %s.',
+		Path(audio_path).name,
+		analysis_trace.total,
+		stages,
+		f'{audio_seconds:.1f} s{"+" if info.get("truncated") else ""}' if audio_seconds is not None else '-',
+		info['container'],
+		info.get('decoder', '-'),
+		info.get('feature_cache', '-'),
+	)
+
+
 def analyze_recording(recording) -> Dict[str, object]:
 	"""Thin wrapper to analyse a Django ``AudioRecording`` instance."""
 
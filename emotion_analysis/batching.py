@@ -0,0 +1,193 @@
+"""Micro-batching front-end for the emotion model.
+
+Concurrent callers submit one feature tensor each; a background thread groups
+them for up to ``max_latency_ms`` or ``max_batch_size`` items and runs a single
+forward pass, handing every row of the output back through a ``Future``.
+
+Every pass is also recorded in the ``/metrics/`` registry
+(``emotion_analysis_batch_size`` and ``emotion_analysis_batch_slots_total``,
+labelled by batcher name), so the fill rate of the in-process batcher and of
+the model server's is visible next to the stage timings.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Request:
+	features: np.ndarray
+	future: Future
+	model: object = None
+	enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class BatchStats:
+	"""Running counters used to judge how well batches are being filled."""
+
+	batches: int = 0
+	items: int = 0
+	max_batch_size: int = 1
+	queue_wait_seconds: float = 0.0
+	inference_seconds: float = 0.0
+	size_histogram: Dict[int, int] = field(default_factory=dict)
+
+	@property
+	def fill_rate(self) -> float:
+		if not self.batches:
+			return 0.0
+		return self.items / (self.batches * self.max_batch_size)
+
+	@property
+	def mean_batch_size(self) -> float:
+		return self.items / self.batches if self.batches else 0.0
+
+	def as_dict(self) -> Dict[str, object]:
+		return {
+			'batches': self.batches,
+			'items': self.items,
+			'max_batch_size': self.max_batch_size,
+			'mean_batch_size': self.mean_batch_size,
+			'fill_rate': self.fill_rate,
+			'mean_queue_wait_ms': 1000 * self.queue_wait_seconds / self.items if self.items else 0.0,
+			'mean_inference_ms': 1000 * self.inference_seconds / self.batches if self.batches else 0.0,
+			'size_histogram': dict(sorted(self.size_histogram.items())),
+		}
+
+
+class MicroBatcher:
+	"""Collect single-sample requests into batched calls to ``predict_fn``.
+
+	``predict_fn`` receives an array shaped ``(n, *sample_shape)`` and the
+	``model`` the samples were submitted with, and must return one row of
+	output per input row. Samples pinned to different models, or with
+	different shapes, never share a forward pass.
+	"""
+
+	def __init__(
+		self,
+		predict_fn: Callable[[np.ndarray, object], np.ndarray],
+		*,
+		max_batch_size: int = 16,
+		max_latency_ms: float = 10.0,
+		name: str = 'emotion-batcher',
+	) -> None:
+		if max_batch_size < 1:
+			raise ValueError('max_batch_size deve ser pelo menos 1.')
+		self._predict_fn = predict_fn
+		self.max_batch_size = max_batch_size
+		self.max_latency = max_latency_ms / 1000.0
+		self.name = name
+		self._queue: queue.Queue[_Request | None] = queue.Queue()
+		self._stats = BatchStats(max_batch_size=max_batch_size)
+		self._stats_lock = threading.Lock()
+		self._closed = False
+		self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+		self._thread.start()
+
+	def submit(self, features: np.ndarray, model: object = None) -> Future:
+		"""Queue one sample (without the batch axis) for ``model`` and return its future."""
+
+		if self._closed:
+			raise RuntimeError('MicroBatcher já foi encerrado.')
+		future: Future = Future()
+		self._queue.put(_Request(np.asarray(features, dtype=np.float32), future, model))
+		return future
+
+	def predict(self, features: np.ndarray, timeout: float | None = None, model: object = None) -> np.ndarray:
+		"""Blocking helper: submit a sample and wait for its output row."""
+
+		return self.submit(features, model).result(timeout=timeout)
+
+	def stats(self) -> Dict[str, object]:
+		with self._stats_lock:
+			return self._stats.as_dict()
+
+	def close(self, timeout: float | None = 5.0) -> None:
+		if self._closed:
+			return
+		self._closed = True
+		self._queue.put(None)
+		self._thread.join(timeout)
+
+	def _collect(self) -> tuple[List[_Request], bool]:
+		"""Block for the first request, then gather more until full or timed out."""
+
+		first = self._queue.get()
+		if first is None:
+			return [], True
+		batch = [first]
+		deadline = time.perf_counter() + self.max_latency
+		while len(batch) < self.max_batch_size:
+			remaining = deadline - time.perf_counter()
+			if remaining <= 0:
+				break
+			try:
+				item = self._queue.get(timeout=remaining)
+			except queue.Empty:
+				break
+			if item is None:
+				return batch, True
+			batch.append(item)
+		return batch, False
+
+	def _run(self) -> None:
+		stopping = False
+		while not stopping:
+			batch, stopping = self._collect()
+			if batch:
+				self._process(batch)
+
+	def _process(self, batch: List[_Request]) -> None:
+		# Futures cancelled while waiting in the queue are simply dropped.
+		batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+		groups: Dict[tuple, List[_Request]] = {}
+		for request in batch:
+			groups.setdefault((id(request.model), request.features.shape), []).append(request)
+		for group in groups.values():
+			self._process_group(group)
+
+	def _process_group(self, batch: List[_Request]) -> None:
+		"""One forward pass over requests for the same model and sample shape."""
+
+		started = time.perf_counter()
+		try:
+			outputs = np.asarray(self._predict_fn(np.stack([request.features for request in batch]), batch[0].model))
+		except Exception as exc:  # pragma: no cover - model dependent
+			logger.exception('Falha na inferência em lote (%d itens).', len(batch))
+			for request in batch:
+				request.future.set_exception(exc)
+			return
+		elapsed = time.perf_counter() - started
+
+		if len(outputs) != len(batch):
+			logger.error('O modelo devolveu %d saídas para um lote de %d itens.', len(outputs), len(batch))
+			exc = RuntimeError(f'O modelo devolveu {len(outputs)} saídas para {len(batch)} entradas.')
+			for request in batch:
+				request.future.set_exception(exc)
+			return
+
+		for request, output in zip(batch, outputs):
+			request.future.set_result(output)
+
+		with self._stats_lock:
+			self._stats.batches += 1
+			self._stats.items += len(batch)
+			self._stats.inference_seconds += elapsed
+			self._stats.queue_wait_seconds += sum(started - request.enqueued_at for request in batch)
+			self._stats.size_histogram[len(batch)] = self._stats.size_histogram.get(len(batch), 0) + 1
+		metrics.record_batch(self.name, len(batch), self.max_batch_size)
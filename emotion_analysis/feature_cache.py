@@ -0,0 +1,118 @@
+"""On-disk cache of extracted feature tensors.
+
+Entries are keyed by the SHA-256 of the audio bytes plus the extraction
+parameters, so re-analysing a recording (or scoring it with another model)
+skips decoding and DSP entirely. Tensors are stored as float16 ``.npy`` files
+(half the size; values in the [-80, 0] dB range keep a resolution of at
+least 0.06 dB) and evicted least-recently-used once the directory grows past
+``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def audio_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+	digest = hashlib.sha256()
+	with open(path, 'rb') as handle:
+		for chunk in iter(lambda: handle.read(chunk_size), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+class FeatureCache:
+	"""Size-bounded LRU directory of float16 ``.npy`` feature tensors."""
+
+	def __init__(self, directory: Path, max_bytes: int) -> None:
+		self.directory = Path(directory)
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self._lock = threading.Lock()
+		self._approx_bytes: int | None = None
+
+	@staticmethod
+	def make_key(audio_digest: str, params: Dict[str, object]) -> str:
+		"""Combine the audio hash with the extraction parameters."""
+
+		encoded = json.dumps(params, sort_keys=True, separators=(',', ':'))
+		return hashlib.sha256(f'{audio_digest}:{encoded}'.encode('utf-8')).hexdigest()
+
+	def _path(self, key: str) -> Path:
+		return self.directory / key[:2] / f'{key}.npy'
+
+	def get(self, key: str) -> np.ndarray | None:
+		path = self._path(key)
+		try:
+			features = np.load(path)
+		except (OSError, ValueError):
+			self.misses += 1
+			return None
+		try:
+			# Bump the mtime: eviction drops the least recently *used* entries.
+			os.utime(path)
+		except OSError:
+			pass
+		self.hits += 1
+		return features.astype(np.float32)
+
+	def put(self, key: str, features: np.ndarray) -> None:
+		path = self._path(key)
+		try:
+			path.parent.mkdir(parents=True, exist_ok=True)
+			tmp_path = path.with_name(f'{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp')
+			with open(tmp_path, 'wb') as handle:
+				np.save(handle, features.astype(np.float16))
+			os.replace(tmp_path, path)
+		except OSError as exc:
+			logger.warning('Não foi possível gravar features no cache %s: %s', self.directory, exc)
+			return
+
+		with self._lock:
+			if self._approx_bytes is None:
+				self._approx_bytes = self._scan_size()
+			else:
+				self._approx_bytes += path.stat().st_size
+			if self._approx_bytes > self.max_bytes:
+				self._approx_bytes = self._evict()
+
+	def _entries(self):
+		for path in self.directory.glob('*/*.npy'):
+			try:
+				stat = path.stat()
+			except OSError:
+				continue
+			yield path, stat
+
+	def _scan_size(self) -> int:
+		return sum(stat.st_size for _, stat in self._entries())
+
+	def _evict(self) -> int:
+		"""Delete oldest-used entries until the cache is at 90% of its budget."""
+
+		entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+		total = sum(stat.st_size for _, stat in entries)
+		target = int(self.max_bytes * 0.9)
+		for path, stat in entries:
+			if total <= target:
+				break
+			try:
+				path.unlink()
+			except OSError:
+				continue
+			total -= stat.st_size
+		return total
+
+	def stats(self) -> Dict[str, int]:
+		return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,163 @@
+"""The model's input features, shared by the training script and serving.
+
+A ``FeatureSpec`` says which tensor a model was trained on: its kind
+(``'mel'`` dB mel-spectrogram or ``'mfcc_stack'`` MFCC + delta + delta-delta),
+sample rate, framing and size. Training writes it next to the model as
+``<model>.features.json``; serving reads it when it loads that model, and
+builds the same tensor from the waveform with the extractor the training
+script used (``emotion_analysis.features``).
+
+Models without a spec file predate it and were trained on ``MEL_SPEC``, the
+``(40, 174, 1)`` mel-spectrogram.
+
+This module only needs NumPy (and SciPy for the deltas), so the training
+script can import it outside Django.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .features import MelSpectrogramExtractor, MfccStackExtractor
+
+SPEC_SUFFIX = '.features.json'
+
+FEATURE_KINDS = ('mel', 'mfcc_stack')
+
+
+class FeatureSpecError(ValueError):
+	pass
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+	"""Parameters of the feature tensor a model consumes."""
+
+	kind: str = 'mel'
+	sample_rate: int = 22050
+	n_fft: int = 2048
+	hop_length: int = 512
+	n_mels: int = 40
+	n_mfcc: int = 0
+	frames: int = 174
+	top_db: float = 80.0
+
+	def __post_init__(self) -> None:
+		if self.kind not in FEATURE_KINDS:
+			raise FeatureSpecError(f'Tipo de feature desconhecido: {self.kind}')
+		if self.kind == 'mfcc_stack' and not 0 < self.n_mfcc <= self.n_mels:
+			raise FeatureSpecError('mfcc_stack exige 0 < n_mfcc <= n_mels.')
+
+	@property
+	def input_shape(self) -> Tuple[int, int, int]:
+		"""Model input shape, without the batch axis."""
+
+		if self.kind == 'mfcc_stack':
+			return (self.n_mfcc, self.frames, 3)
+		return (self.n_mels, self.frames, 1)
+
+	@property
+	def samples_needed(self) -> int:
+		"""Waveform samples that influence the tensor (the rest can be left undecoded)."""
+
+		return self.extractor().samples_needed
+
+	def extractor(self) -> MelSpectrogramExtractor | MfccStackExtractor:
+		return _extractor(self)
+
+	def extract(self, waveform: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+		"""Feature tensor of ``waveform`` (already at ``sample_rate``), shaped ``input_shape``."""
+
+		if out is None:
+			out = np.empty(self.input_shape, dtype=np.float32)
+		# A contiguous (..., 1) buffer reshapes to the extractor's 2-D output as a view.
+		self.extractor()(waveform, out=out.reshape(self.extractor().output_shape))
+		return out
+
+	def iter_window_batches(
+		self,
+		waveform: np.ndarray,
+		hop_samples: int,
+		batch_size: int,
+	) -> Iterator[Tuple[List[int], np.ndarray]]:
+		"""Overlapping windows as ``(starts, batch)``, ``batch`` shaped ``(n,) + input_shape``.
+
+		The batch buffer is reused: it is only valid until the next iteration.
+		"""
+
+		extractor = self.extractor()
+		for starts, batch in extractor.iter_window_batches(waveform, hop_samples, batch_size):
+			yield starts, batch.reshape((len(starts),) + self.input_shape)
+
+	def to_dict(self) -> Dict[str, object]:
+		return asdict(self)
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, object]) -> 'FeatureSpec':
+		known = {field.name for field in fields(cls)}
+		unknown = set(data) - known
+		if unknown:
+			raise FeatureSpecError(f'Campos desconhecidos na especificação de features: {sorted(unknown)}')
+		return cls(**data)
+
+	def save(self, path: Path) -> Path:
+		path = Path(path)
+		path.write_text(json.dumps(self.to_dict(), indent=2) + '\n', encoding='utf-8')
+		return path
+
+	@classmethod
+	def load(cls, path: Path) -> 'FeatureSpec':
+		try:
+			return cls.from_dict(json.loads(Path(path).read_text(encoding='utf-8')))
+		except (OSError, ValueError, TypeError) as exc:
+			raise FeatureSpecError(f'Especificação de features inválida em {path}: {exc}') from exc
+
+
+@lru_cache(maxsize=8)
+def _extractor(spec: FeatureSpec) -> MelSpectrogramExtractor | MfccStackExtractor:
+	# Filterbank, DCT and delta matrices are built once per spec.
+	if spec.kind == 'mfcc_stack':
+		return MfccStackExtractor(
+			sample_rate=spec.sample_rate,
+			n_fft=spec.n_fft,
+			hop_length=spec.hop_length,
+			n_mels=spec.n_mels,
+			n_mfcc=spec.n_mfcc,
+			target_frames=spec.frames,
+			top_db=spec.top_db,
+		)
+	return MelSpectrogramExtractor(
+		sample_rate=spec.sample_rate,
+		n_fft=spec.n_fft,
+		hop_length=spec.hop_length,
+		n_mels=spec.n_mels,
+		target_frames=spec.frames,
+		top_db=spec.top_db,
+	)
+
+
+# The (40, 174, 1) mel-spectrogram served before specs were stored with models.
+MEL_SPEC = FeatureSpec()
+# The training script's (64, 216, 3) MFCC + delta + delta-delta stack.
+MFCC_STACK_SPEC = FeatureSpec(kind='mfcc_stack', n_mels=128, n_mfcc=64, frames=216)
+
+
+def spec_path(model_path: Path) -> Path:
+	"""``static/modelo/modelo_emocoes.keras`` -> ``static/modelo/modelo_emocoes.features.json``."""
+
+	return Path(model_path).with_suffix(SPEC_SUFFIX)
+
+
+def load_for_model(model_path: Path) -> FeatureSpec:
+	"""Spec stored next to ``model_path``; ``MEL_SPEC`` for models saved without one."""
+
+	path = spec_path(model_path)
+	if not path.exists():
+		return MEL_SPEC
+	return FeatureSpec.load(path)
@@ -0,0 +1,317 @@
+"""Vectorised NumPy mel-spectrogram extraction.
+
+``MelSpectrogramExtractor`` reproduces ``librosa.feature.melspectrogram``
+followed by ``librosa.power_to_db(ref=np.max)`` for the model's fixed input
+window (``center=True``, zero padding, periodic Hann window, Slaney mel
+scale). The filterbank and window are built once per extractor; each call
+frames the waveform with strides, runs one real FFT over all frames and
+writes straight into the ``(n_mels, target_frames)`` float32 output. Only the
+frames the model consumes are computed, so the dB reference (the maximum
+power) is taken over that window.
+
+``MfccStackExtractor`` builds the training script's MFCC + delta + delta-delta
+stack on top of the same framing: ``librosa.feature.mfcc`` (128 mel bands,
+``power_to_db(ref=1.0)``, orthonormal DCT-II) as one matrix product, the
+deltas as ``librosa.feature.delta``'s Savitzky-Golay filter, and per-clip
+standardisation.
+
+``iter_window_batches`` walks a whole recording in overlapping windows of that
+size, yielding fixed-size batches so memory stays bounded by the batch rather
+than by the recording's full spectrogram.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+
+def _hz_to_mel(frequencies: np.ndarray) -> np.ndarray:
+	"""Slaney mel scale (librosa's default, ``htk=False``)."""
+
+	frequencies = np.asanyarray(frequencies, dtype=np.float64)
+	f_sp = 200.0 / 3
+	mels = frequencies / f_sp
+	min_log_hz = 1000.0
+	min_log_mel = min_log_hz / f_sp
+	logstep = np.log(6.4) / 27.0
+	log_region = frequencies >= min_log_hz
+	mels[log_region] = min_log_mel + np.log(frequencies[log_region] / min_log_hz) / logstep
+	return mels
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+	mels = np.asanyarray(mels, dtype=np.float64)
+	f_sp = 200.0 / 3
+	freqs = f_sp * mels
+	min_log_hz = 1000.0
+	min_log_mel = min_log_hz / f_sp
+	logstep = np.log(6.4) / 27.0
+	log_region = mels >= min_log_mel
+	freqs[log_region] = min_log_hz * np.exp(logstep * (mels[log_region] - min_log_mel))
+	return freqs
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, fmin: float = 0.0, fmax: float | None = None) -> np.ndarray:
+	"""Slaney-normalised triangular filterbank, shaped ``(n_mels, n_fft // 2 + 1)``."""
+
+	fmax = sample_rate / 2.0 if fmax is None else fmax
+	fft_freqs = np.fft.rfftfreq(n=n_fft, d=1.0 / sample_rate)
+	mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(np.array([fmin]))[0], _hz_to_mel(np.array([fmax]))[0], n_mels + 2))
+
+	fdiff = np.diff(mel_freqs)
+	ramps = np.subtract.outer(mel_freqs, fft_freqs)
+	lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+	upper = ramps[2:] / fdiff[1:, np.newaxis]
+	weights = np.maximum(0.0, np.minimum(lower, upper))
+	weights *= (2.0 / (mel_freqs[2:n_mels + 2] - mel_freqs[:n_mels]))[:, np.newaxis]
+	return weights.astype(np.float32)
+
+
+def _rfft(frames: np.ndarray) -> np.ndarray:
+	try:
+		import scipy.fft
+	except ImportError:  # pragma: no cover - scipy ships with librosa
+		return np.fft.rfft(frames, axis=1)
+	# scipy keeps float32 input in complex64 and may reuse the input buffer.
+	return scipy.fft.rfft(frames, axis=1, overwrite_x=True)
+
+
+def dct_matrix(n_out: int, n_in: int) -> np.ndarray:
+	"""Orthonormal DCT-II basis, shaped ``(n_out, n_in)`` (``scipy.fft.dct(norm='ortho')``)."""
+
+	basis = np.cos(np.pi / n_in * np.outer(np.arange(n_out), np.arange(n_in) + 0.5)) * np.sqrt(2.0 / n_in)
+	basis[0] /= np.sqrt(2.0)
+	return basis.astype(np.float32)
+
+
+def delta_operators(n_frames: int, width: int = 9) -> Tuple[np.ndarray, np.ndarray]:
+	"""``(n_frames, n_frames)`` matrices ``D`` with ``x @ D == librosa.feature.delta(x, order)``.
+
+	The Savitzky-Golay filter (``mode='interp'``) is linear in its input, so it
+	is applied once to the identity and then reused as a matrix product.
+	"""
+
+	from scipy.signal import savgol_filter
+
+	identity = np.eye(n_frames)
+	return tuple(
+		savgol_filter(identity, width, deriv=order, polyorder=order, axis=-1, mode='interp').astype(np.float32)
+		for order in (1, 2)
+	)
+
+
+class _WindowedExtractor:
+	"""Window/batch walking shared by the extractors (``output_shape`` per window)."""
+
+	output_shape: Tuple[int, ...]
+	samples_needed: int
+
+	def __call__(self, waveform: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+		raise NotImplementedError
+
+	def window_starts(self, n_samples: int, hop_samples: int) -> range:
+		"""Start offsets of overlapping windows covering ``n_samples`` samples."""
+
+		window = self.samples_needed
+		count = 1 + max(0, math.ceil((n_samples - window) / hop_samples))
+		return range(0, count * hop_samples, hop_samples)
+
+	def iter_window_batches(
+		self,
+		waveform: np.ndarray,
+		hop_samples: int,
+		batch_size: int,
+	) -> Iterator[Tuple[List[int], np.ndarray]]:
+		"""Yield ``(starts, batch)`` with ``batch`` shaped ``(n,) + output_shape``.
+
+		Each window is analysed as an independent clip. The batch buffer is
+		reused: it is only valid until the next iteration.
+		"""
+
+		starts = self.window_starts(waveform.size, hop_samples)
+		batch = np.empty((min(batch_size, len(starts)),) + self.output_shape, dtype=np.float32)
+		for offset in range(0, len(starts), batch_size):
+			chunk = list(starts[offset:offset + batch_size])
+			for row, start in enumerate(chunk):
+				self(waveform[start:start + self.samples_needed], out=batch[row])
+			yield chunk, batch[:len(chunk)]
+
+
+class MelSpectrogramExtractor(_WindowedExtractor):
+	"""Reusable extractor for fixed-size dB mel-spectrograms."""
+
+	def __init__(
+		self,
+		*,
+		sample_rate: int = 22050,
+		n_fft: int = 2048,
+		hop_length: int = 512,
+		n_mels: int = 40,
+		target_frames: int = 174,
+		top_db: float = 80.0,
+		amin: float = 1e-10,
+	) -> None:
+		self.sample_rate = sample_rate
+		self.n_fft = n_fft
+		self.hop_length = hop_length
+		self.n_mels = n_mels
+		self.target_frames = target_frames
+		self.top_db = top_db
+		self.amin = amin
+		self.window = (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+		self.mel_basis = mel_filterbank(sample_rate, n_fft, n_mels)
+		self._buffers = threading.local()
+
+	@property
+	def samples_needed(self) -> int:
+		"""Waveform samples that influence the ``target_frames`` output frames."""
+
+		return (self.target_frames - 1) * self.hop_length + self.n_fft // 2
+
+	@property
+	def output_shape(self) -> Tuple[int, int]:
+		return (self.n_mels, self.target_frames)
+
+	def _scratch(self) -> tuple[np.ndarray, np.ndarray]:
+		"""Per-thread padded-signal and windowed-frame buffers."""
+
+		buffers = self._buffers
+		if getattr(buffers, 'padded', None) is None:
+			buffers.padded = np.zeros((self.target_frames - 1) * self.hop_length + self.n_fft, dtype=np.float32)
+			buffers.frames = np.empty((self.target_frames, self.n_fft), dtype=np.float32)
+		return buffers.padded, buffers.frames
+
+	def mel_power(self, waveform: np.ndarray, out: np.ndarray) -> int:
+		"""Write the mel power of the first frames into ``out[:, :n]``; return ``n``."""
+
+		n_frames = min(self.target_frames, 1 + waveform.size // self.hop_length)
+		padded, frames = self._scratch()
+		pad = self.n_fft // 2
+		used = min(waveform.size, padded.size - pad)
+		# Centre padding with zeros (librosa's pad_mode='constant').
+		padded[:pad] = 0.0
+		padded[pad:pad + used] = waveform[:used]
+		padded[pad + used:] = 0.0
+
+		strided = np.lib.stride_tricks.as_strided(
+			padded,
+			shape=(n_frames, self.n_fft),
+			strides=(padded.strides[0] * self.hop_length, padded.strides[0]),
+			writeable=False,
+		)
+		windowed = frames[:n_frames]
+		np.multiply(strided, self.window, out=windowed)
+
+		spectrum = _rfft(windowed)
+		power = np.square(spectrum.real, dtype=np.float32)
+		power += np.square(spectrum.imag, dtype=np.float32)
+
+		np.matmul(self.mel_basis, power.T, out=out[:, :n_frames])
+		return n_frames
+
+	def __call__(self, waveform: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+		"""Return the ``(n_mels, target_frames)`` dB mel-spectrogram of ``waveform``."""
+
+		if out is None:
+			out = np.zeros(self.output_shape, dtype=np.float32)
+		else:
+			out.fill(0.0)
+
+		mel = out[:, :self.mel_power(waveform, out)]
+		# power_to_db(ref=np.max, amin, top_db), in place on the computed frames.
+		ref = max(float(mel.max()), self.amin)
+		np.maximum(mel, self.amin, out=mel)
+		np.log10(mel, out=mel)
+		mel *= 10.0
+		mel -= 10.0 * np.log10(ref)
+		if self.top_db is not None:
+			np.maximum(mel, mel.max() - self.top_db, out=mel)
+		return out
+
+
+class MfccStackExtractor(_WindowedExtractor):
+	"""Reusable extractor for ``(n_mfcc, target_frames, 3)`` MFCC + delta stacks."""
+
+	def __init__(
+		self,
+		*,
+		sample_rate: int = 22050,
+		n_fft: int = 2048,
+		hop_length: int = 512,
+		n_mels: int = 128,
+		n_mfcc: int = 64,
+		target_frames: int = 216,
+		top_db: float = 80.0,
+		amin: float = 1e-10,
+		delta_width: int = 9,
+		normalize: bool = True,
+	) -> None:
+		self.mel = MelSpectrogramExtractor(
+			sample_rate=sample_rate,
+			n_fft=n_fft,
+			hop_length=hop_length,
+			n_mels=n_mels,
+			target_frames=target_frames,
+			top_db=top_db,
+			amin=amin,
+		)
+		self.n_mfcc = n_mfcc
+		self.target_frames = target_frames
+		self.top_db = top_db
+		self.amin = amin
+		self.delta_width = delta_width
+		self.normalize = normalize
+		self.dct_basis = dct_matrix(n_mfcc, n_mels)
+		self.delta_operators = delta_operators(target_frames, delta_width)
+		self._buffers = threading.local()
+
+	@property
+	def samples_needed(self) -> int:
+		return self.mel.samples_needed
+
+	@property
+	def output_shape(self) -> Tuple[int, int, int]:
+		return (self.n_mfcc, self.target_frames, 3)
+
+	def _scratch(self) -> tuple[np.ndarray, np.ndarray]:
+		"""Per-thread mel and channel-first ``(3, n_mfcc, target_frames)`` buffers."""
+
+		buffers = self._buffers
+		if getattr(buffers, 'mel', None) is None:
+			buffers.mel = np.empty(self.mel.output_shape, dtype=np.float32)
+			buffers.stack = np.empty((3, self.n_mfcc, self.target_frames), dtype=np.float32)
+		return buffers.mel, buffers.stack
+
+	def __call__(self, waveform: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+		"""Return the standardised MFCC, delta and delta-delta stack of ``waveform``."""
+
+		if out is None:
+			out = np.empty(self.output_shape, dtype=np.float32)
+
+		mel_buffer, stack = self._scratch()
+		mel = mel_buffer[:, :self.mel.mel_power(waveform, mel_buffer)]
+		# power_to_db(ref=1.0, amin, top_db), in place on the computed frames.
+		np.maximum(mel, self.amin, out=mel)
+		np.log10(mel, out=mel)
+		mel *= 10.0
+		if self.top_db is not None:
+			np.maximum(mel, mel.max() - self.top_db, out=mel)
+
+		# MFCCs of the computed frames, zero-padded to target_frames like pad_or_trim.
+		# Channels are built contiguously and interleaved into ``out`` at the end.
+		mfcc = stack[0]
+		mfcc[:, mel.shape[1]:] = 0.0
+		np.matmul(self.dct_basis, mel, out=mfcc[:, :mel.shape[1]])
+		for order, operator in enumerate(self.delta_operators, start=1):
+			np.matmul(mfcc, operator, out=stack[order])
+
+		if self.normalize:
+			# Statistics in float64, like the training script's float64 stack.
+			stack -= stack.mean(axis=(1, 2), keepdims=True, dtype=np.float64).astype(np.float32)
+			stack /= (stack.std(axis=(1, 2), keepdims=True, dtype=np.float64) + 1e-8).astype(np.float32)
+		out[...] = stack.transpose(1, 2, 0)
+		return out
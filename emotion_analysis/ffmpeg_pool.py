@@ -0,0 +1,173 @@
+"""Pool of pre-spawned FFmpeg decoder processes.
+
+An FFmpeg process decodes exactly one input, so it cannot be reused the way a
+thread can. Instead, the pool keeps ``size`` processes already started and
+blocked on ``-i pipe:0``. A decode takes an idle process, streams the file
+into its stdin and reads ``f32le`` PCM from its stdout in fixed-size chunks,
+killing the process early once a bounded read has enough samples.
+A replacement is then spawned in the background, off the request path. At
+most ``max_concurrency`` decodes run at once, and nothing buffers the whole
+input, which bounds memory for long recordings.
+
+Containers that need a seekable input (m4a/mp4 with the ``moov`` atom at the
+end) are decoded from the file path by a fresh process, under the same
+concurrency limit.
+
+Every process's stderr is drained from the moment it is spawned, idle or not,
+keeping only a bounded tail for error messages, and a decode running longer
+than ``timeout`` seconds is killed.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .audio_decoding import (
+	FFMPEG_TIMEOUT_SECONDS,
+	AudioDecodingError,
+	Deadline,
+	StderrTail,
+	estimate_samples,
+	ffmpeg_command,
+	read_f32le_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+STDIN_CONTAINERS = frozenset({'webm', 'ogg', 'mp3', 'wav', 'flac'})
+
+
+@dataclass
+class _Decoder:
+	process: subprocess.Popen
+	stderr: StderrTail
+
+
+class FFmpegDecoderPool:
+	"""Thread-safe pool of warm FFmpeg processes keyed by output sample rate."""
+
+	def __init__(
+		self,
+		size: int = 2,
+		max_concurrency: int = 4,
+		timeout: float | None = FFMPEG_TIMEOUT_SECONDS,
+	) -> None:
+		self.size = max(0, size)
+		self.timeout = timeout
+		self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+		self._idle: Dict[int, List[_Decoder]] = {}
+		self._lock = threading.Lock()
+		self._closed = False
+		self.spawned = 0
+		self.reused = 0
+		atexit.register(self.close)
+
+	def _spawn(self, source: str, sample_rate: int, max_samples: int | None = None) -> _Decoder:
+		self.spawned += 1
+		process = subprocess.Popen(
+			ffmpeg_command(source, sample_rate, max_samples),
+			stdin=subprocess.PIPE if source == 'pipe:0' else subprocess.DEVNULL,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+		)
+		return _Decoder(process, StderrTail(process.stderr))
+
+	def prewarm(self, sample_rate: int) -> None:
+		"""Top the idle list for ``sample_rate`` back up to ``size`` processes."""
+
+		with self._lock:
+			idle = self._idle.setdefault(sample_rate, [])
+			idle[:] = [decoder for decoder in idle if decoder.process.poll() is None]
+			missing = self.size - len(idle) if not self._closed else 0
+		for _ in range(missing):
+			decoder = self._spawn('pipe:0', sample_rate)
+			with self._lock:
+				if self._closed:
+					decoder.process.kill()
+				else:
+					self._idle[sample_rate].append(decoder)
+
+	def _acquire(self, sample_rate: int) -> _Decoder:
+		with self._lock:
+			idle = self._idle.get(sample_rate, [])
+			while idle:
+				decoder = idle.pop()
+				if decoder.process.poll() is None:
+					self.reused += 1
+					return decoder
+		return self._spawn('pipe:0', sample_rate)
+
+	@staticmethod
+	def _feed(process: subprocess.Popen, path: Path) -> None:
+		try:
+			with open(path, 'rb') as source:
+				shutil.copyfileobj(source, process.stdin, length=1 << 16)
+		except (BrokenPipeError, OSError):
+			# FFmpeg stopped reading (bad input); its exit status reports why.
+			pass
+		finally:
+			try:
+				process.stdin.close()
+			except OSError:
+				pass
+
+	def decode(self, path: Path, container: str, sample_rate: int, max_samples: int | None = None) -> np.ndarray:
+		"""Decode ``path`` into mono float32 PCM at ``sample_rate``."""
+
+		path = Path(path)
+		use_stdin = container in STDIN_CONTAINERS
+		with self._slots:
+			if use_stdin:
+				decoder = self._acquire(sample_rate)
+			else:
+				decoder = self._spawn(path.as_posix(), sample_rate, max_samples)
+			process = decoder.process
+			deadline = Deadline(process, self.timeout)
+			feeder = None
+			if use_stdin:
+				feeder = threading.Thread(target=self._feed, args=(process, path), daemon=True)
+				feeder.start()
+			try:
+				waveform = read_f32le_stream(process.stdout, estimate_samples(path, sample_rate), max_samples)
+				truncated = max_samples is not None and waveform.size >= max_samples
+				if truncated:
+					# Enough PCM: stop FFmpeg instead of decoding the rest of the file.
+					process.kill()
+				returncode = 0 if truncated else process.wait()
+				message = decoder.stderr.text()
+			finally:
+				deadline.cancel()
+				if process.poll() is None:
+					process.kill()
+					process.wait()
+				if feeder is not None:
+					feeder.join()
+				process.stdout.close()
+				process.stderr.close()
+
+		if use_stdin and self.size:
+			threading.Thread(target=self.prewarm, args=(sample_rate,), daemon=True).start()
+
+		if deadline.expired:
+			raise AudioDecodingError(f'FFmpeg excedeu {self.timeout:.0f} s ao converter o áudio ({path.name}).')
+		if returncode != 0:
+			raise AudioDecodingError(f'FFmpeg não conseguiu converter o áudio ({path.name}): {message}')
+		return waveform
+
+	def close(self) -> None:
+		with self._lock:
+			self._closed = True
+			processes = [decoder.process for idle in self._idle.values() for decoder in idle]
+			self._idle.clear()
+		for process in processes:
+			process.kill()
+			process.wait()
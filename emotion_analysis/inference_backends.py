@@ -0,0 +1,181 @@
+"""Pluggable inference backends for the emotion model.
+
+A backend wraps one runtime (full tf.keras, a TFLite interpreter, ...) behind
+``predict(batch) -> probabilities``. Backends register themselves by name and
+``EMOTION_INFERENCE_BACKEND`` picks one at load time. Each backend reads an
+artifact next to ``modelo_emocoes.keras`` that differs only in its suffix.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Type
+
+import numpy as np
+
+from . import model_artifacts
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+	import tensorflow as tf
+
+logger = logging.getLogger(__name__)
+
+_REGISTRY: Dict[str, Type['InferenceBackend']] = {}
+
+
+def register_backend(name: str) -> Callable[[Type['InferenceBackend']], Type['InferenceBackend']]:
+	"""Class decorator adding a backend to the registry under ``name``."""
+
+	def decorator(cls: Type[InferenceBackend]) -> Type[InferenceBackend]:
+		cls.name = name
+		_REGISTRY[name] = cls
+		return cls
+
+	return decorator
+
+
+def available_backends() -> list[str]:
+	return sorted(_REGISTRY)
+
+
+def get_backend_class(name: str) -> Type['InferenceBackend']:
+	try:
+		return _REGISTRY[name]
+	except KeyError:
+		raise ValueError(
+			f'Backend de inferência desconhecido: {name!r}. Disponíveis: {", ".join(available_backends())}'
+		) from None
+
+
+class InferenceBackend:
+	"""Base class: load an artifact once, then run batched forward passes."""
+
+	name = ''
+	artifact_suffix = ''
+
+	def __init__(self, model_path: Path, **options: object) -> None:
+		self.model_path = Path(model_path)
+		self.options = options
+
+	@classmethod
+	def artifact_path(cls, keras_path: Path, variant: str = '') -> Path:
+		"""Where this backend expects its artifact, given the ``.keras`` path.
+
+		Quantized variants add an infix: ``modelo_emocoes.int8.tflite``.
+		"""
+
+		suffix = f'.{variant}{cls.artifact_suffix}' if variant else cls.artifact_suffix
+		return Path(keras_path).with_suffix(suffix)
+
+	def predict(self, batch: np.ndarray) -> np.ndarray:
+		"""Return an ``(n, classes)`` probability array for an ``(n, ...)`` batch."""
+
+		raise NotImplementedError
+
+
+@register_backend('keras')
+class KerasBackend(InferenceBackend):
+	"""Full tf.keras model rebuilt through the precompiled artifact cache."""
+
+	artifact_suffix = '.keras'
+
+	def __init__(self, model_path: Path, **options: object) -> None:
+		super().__init__(model_path, **options)
+		cache_dir = options.get('cache_dir')
+		seq_config, layer_weights = model_artifacts.load_weights_and_config(
+			self.model_path,
+			Path(cache_dir) if cache_dir else None,
+		)
+		self.model: tf.keras.Model = model_artifacts.build_model(seq_config, layer_weights)
+
+	def predict(self, batch: np.ndarray) -> np.ndarray:
+		return self.model(batch, training=False).numpy()
+
+
+def _tflite_interpreter_class():
+	"""Prefer the small ``tflite_runtime`` wheel; fall back to full TensorFlow."""
+
+	try:
+		from tflite_runtime.interpreter import Interpreter
+	except ImportError:
+		import tensorflow as tf
+
+		Interpreter = tf.lite.Interpreter
+	return Interpreter
+
+
+@register_backend('tflite')
+class TFLiteBackend(InferenceBackend):
+	"""TFLite interpreter; much lighter than eager TensorFlow on CPU-only hosts."""
+
+	artifact_suffix = '.tflite'
+
+	def __init__(self, model_path: Path, **options: object) -> None:
+		super().__init__(model_path, **options)
+		Interpreter = _tflite_interpreter_class()
+		num_threads = options.get('num_threads')
+		self._interpreter = Interpreter(
+			model_path=self.model_path.as_posix(),
+			num_threads=int(num_threads) if num_threads else None,
+		)
+		self._interpreter.allocate_tensors()
+		self._input = self._interpreter.get_input_details()[0]
+		self._output = self._interpreter.get_output_details()[0]
+		self._batch_size = int(self._input['shape'][0])
+		# An interpreter instance is not thread-safe; the micro-batcher already
+		# serialises calls, this only guards direct concurrent use.
+		self._lock = threading.Lock()
+
+	def predict(self, batch: np.ndarray) -> np.ndarray:
+		batch = np.ascontiguousarray(batch, dtype=self._input['dtype'])
+		with self._lock:
+			if batch.shape[0] != self._batch_size:
+				self._interpreter.resize_tensor_input(self._input['index'], list(batch.shape))
+				self._interpreter.allocate_tensors()
+				self._batch_size = batch.shape[0]
+			self._interpreter.set_tensor(self._input['index'], batch)
+			self._interpreter.invoke()
+			return np.array(self._interpreter.get_tensor(self._output['index']), dtype=np.float32)
+
+
+QUANTIZATION_MODES = ('float16', 'int8')
+
+
+def convert_to_tflite(model: tf.keras.Model, output_path: Path, quantization: str | None = None) -> Path:
+	"""Convert a tf.keras model into a ``.tflite`` flatbuffer at ``output_path``.
+
+	``quantization`` may be ``'float16'`` (half-precision weights) or
+	``'int8'`` (dynamic-range: int8 weights, float activations).
+	"""
+
+	import tensorflow as tf
+
+	if quantization not in (None, *QUANTIZATION_MODES):
+		raise ValueError(f'Quantização desconhecida: {quantization!r}')
+
+	def _converter(select_tf_ops: bool = False) -> tf.lite.TFLiteConverter:
+		converter = tf.lite.TFLiteConverter.from_keras_model(model)
+		if quantization:
+			converter.optimizations = [tf.lite.Optimize.DEFAULT]
+		if quantization == 'float16':
+			converter.target_spec.supported_types = [tf.float16]
+		if select_tf_ops:
+			converter.target_spec.supported_ops = [
+				tf.lite.OpsSet.TFLITE_BUILTINS,
+				tf.lite.OpsSet.SELECT_TF_OPS,
+			]
+		return converter
+
+	try:
+		flatbuffer = _converter().convert()
+	except Exception as exc:  # pragma: no cover - depends on model layers
+		# Some recurrent layers still need TF kernels (Flex delegate).
+		logger.warning('Conversão só com operações TFLite falhou (%s); habilitando SELECT_TF_OPS.', exc)
+		flatbuffer = _converter(select_tf_ops=True).convert()
+
+	output_path = Path(output_path)
+	output_path.parent.mkdir(parents=True, exist_ok=True)
+	output_path.write_bytes(flatbuffer)
+	return output_path
@@ -0,0 +1,125 @@
+"""Fila de análises de emoção persistida no banco de dados.
+
+As views apenas enfileiram um ``AnalysisJob``; o processamento pesado
+(decodificação, extração de features e inferência) acontece no comando
+``process_analysis_jobs``, que pode rodar em quantos processos forem necessários.
+"""
+
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnalysisJob, AudioRecording, EmotionAnalysis
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_analysis(recording):
+    """Cria uma tarefa para o desabafo, reaproveitando uma tarefa ainda ativa."""
+    try:
+        with transaction.atomic():
+            job = (
+                AnalysisJob.objects.select_for_update()
+                .filter(recording=recording, status__in=ACTIVE_STATUSES)
+                .first()
+            )
+            if job is None:
+                job = AnalysisJob.objects.create(recording=recording)
+    except IntegrityError:
+        # Outro processo criou a tarefa entre a consulta e o INSERT.
+        job = AnalysisJob.objects.get(recording=recording, status__in=ACTIVE_STATUSES)
+    return job
+
+
+def enqueue_unanalysed_recordings(limit=100):
+    """Enfileira desabafos novos que ainda não têm análise nem tarefa.
+
+    Workers que varrem ao mesmo tempo podem escolher os mesmos desabafos; a
+    restrição ``unique_active_analysis_job`` descarta as tarefas repetidas.
+    """
+    recordings = AudioRecording.objects.filter(
+        emotion_analysis__isnull=True,
+        analysis_jobs__isnull=True,
+    ).order_by('created_at')[:limit]
+    jobs = [AnalysisJob(recording=recording) for recording in recordings]
+    return AnalysisJob.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+def requeue_stale_jobs(stale_after=None):
+    """Devolve para a fila tarefas presas em ``running`` (worker morto)."""
+    if stale_after is None:
+        stale_after = getattr(settings, 'EMOTION_JOB_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = AnalysisJob.objects.filter(status='running', started_at__lt=cutoff)
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(status='pending', worker='')
+    stale.update(status='failed', finished_at=timezone.now(), error='Tempo limite de processamento excedido.')
+    return requeued
+
+
+def claim_next_job(worker_name=None):
+    """Reserva a próxima tarefa pendente para este worker.
+
+    A reserva é um UPDATE condicional no status, então dois workers nunca
+    recebem a mesma tarefa, inclusive no SQLite (sem ``SKIP LOCKED``).
+    """
+    worker_name = worker_name or default_worker_name()
+    candidates = AnalysisJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        claimed = AnalysisJob.objects.filter(pk=pk, status='pending').update(
+            status='running',
+            worker=worker_name,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return AnalysisJob.objects.select_related('recording').get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """Executa a análise de uma tarefa já reservada e grava o resultado."""
+    from .audio_processing import AudioProcessingError, analyze_recording
+
+    try:
+        result = analyze_recording(job.recording)
+    except AudioProcessingError as exc:
+        # Erros de conteúdo (arquivo corrompido, vazio...) não melhoram com nova tentativa.
+        _finish(job, 'failed', str(exc))
+        return job
+    except Exception as exc:
+        logger.exception('Falha ao processar a tarefa de análise #%s', job.pk)
+        status = 'pending' if job.attempts < job.max_attempts else 'failed'
+        _finish(job, status, f'{exc.__class__.__name__}: {exc}')
+        return job
+
+    EmotionAnalysis.objects.update_or_create(
+        recording=job.recording,
+        defaults={
+            'dominant_emotion': result['dominant_emotion'],
+            'confidence': result['confidence'],
+            'emotions_data': result['emotions_data'],
+            'timeline': result.get('timeline', []),
+            'model_version': result.get('model_version', ''),
+        },
+    )
+    _finish(job, 'done')
+    return job
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now() if status in ('done', 'failed') else None
+    job.save(update_fields=['status', 'error', 'finished_at'])
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis.models import ModelVersion
+
+
+class Command(BaseCommand):
+    help = 'Ativa uma versão registrada do modelo; os processos em execução trocam de modelo sem reiniciar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', nargs='?', help='Versão a ativar.')
+        parser.add_argument('--list', action='store_true', help='Lista as versões registradas.')
+
+    def handle(self, *args, **options):
+        if options['list'] or not options['version']:
+            for record in ModelVersion.objects.all():
+                marker = '*' if record.is_active else ' '
+                self.stdout.write(f'{marker} {record.version}  {record.sha256[:12]}  {record.created_at:%d/%m/%Y %H:%M}  {record.model_path}')
+            return
+
+        try:
+            record = ModelVersion.objects.get(version=options['version'])
+        except ModelVersion.DoesNotExist as exc:
+            raise CommandError(f"Versão {options['version']} não registrada.") from exc
+        record.activate()
+        interval = getattr(settings, 'EMOTION_MODEL_REFRESH_SECONDS', 30)
+        self.stdout.write(self.style.SUCCESS(
+            f'Versão {record.version} ativada; workers e servidor de modelo a carregam em até {interval}s.'
+        ))
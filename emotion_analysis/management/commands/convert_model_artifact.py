@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis import audio_processing, model_artifacts
+
+
+class Command(BaseCommand):
+    help = 'Gera o artefato pré-compilado do modelo (.npy mapeável + manifesto) a partir do arquivo .keras.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', default=str(audio_processing.MODEL_RELATIVE_PATH),
+            help='Arquivo .keras de origem (relativo a BASE_DIR ou absoluto).',
+        )
+        parser.add_argument(
+            '--cache-dir', default=str(getattr(settings, 'EMOTION_MODEL_CACHE_DIR', '') or ''),
+            help='Diretório do cache (padrão: EMOTION_MODEL_CACHE_DIR).',
+        )
+
+    def handle(self, *args, **options):
+        if not options['cache_dir']:
+            raise CommandError('Informe --cache-dir ou defina EMOTION_MODEL_CACHE_DIR.')
+        try:
+            model_path = audio_processing._resolve_artifact(Path(options['model']))
+        except audio_processing.AudioProcessingError as exc:
+            raise CommandError(str(exc)) from exc
+        cache_dir = Path(options['cache_dir'])
+
+        started = time.perf_counter()
+        manifest = model_artifacts.convert_archive(model_path, cache_dir)
+        converted_in = time.perf_counter() - started
+
+        started = time.perf_counter()
+        model_artifacts.load_cached(model_path, cache_dir)
+        loaded_in = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Artefato gravado em {cache_dir}'))
+        self.stdout.write(f'  origem: {model_path.name} (sha256 {manifest["source_sha256"][:16]}...)')
+        self.stdout.write(f'  conversão: {converted_in:.2f}s | leitura pelo cache: {1000 * loaded_in:.1f}ms')
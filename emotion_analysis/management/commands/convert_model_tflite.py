@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis import audio_processing
+from emotion_analysis.feature_spec import FeatureSpecError, load_for_model
+from emotion_analysis.inference_backends import KerasBackend, TFLiteBackend, convert_to_tflite
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.webm', '.m4a')
+
+
+def load_parity_features(samples_dir, count, spec, seed=0):
+    """Features reais (se houver áudios em samples_dir) ou sintéticas no formato de spec."""
+    if samples_dir:
+        paths = sorted(p for p in Path(samples_dir).rglob('*') if p.suffix.lower() in AUDIO_EXTENSIONS)[:count]
+        if paths:
+            return np.concatenate([audio_processing._extract_features(path, spec) for path in paths])
+    rng = np.random.default_rng(seed)
+    shape = (count,) + spec.input_shape
+    if spec.kind == 'mfcc_stack':
+        # Pilhas MFCC são padronizadas: média 0, desvio 1.
+        return rng.standard_normal(shape).astype(np.float32)
+    # Faixa típica de power_to_db(ref=np.max): [-80, 0] dB.
+    return rng.uniform(-80.0, 0.0, size=shape).astype(np.float32)
+
+
+class Command(BaseCommand):
+    help = 'Converte modelo_emocoes.keras para TFLite e verifica a paridade com o backend Keras.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=str(audio_processing.MODEL_RELATIVE_PATH))
+        parser.add_argument('--output', default='', help='Destino do .tflite (padrão: ao lado do .keras).')
+        parser.add_argument('--samples', default='', help='Diretório com áudios usados na verificação de paridade.')
+        parser.add_argument('--count', type=int, default=16, help='Quantidade de amostras na verificação.')
+        parser.add_argument(
+            '--tolerance', type=float, default=getattr(settings, 'EMOTION_BACKEND_PARITY_TOLERANCE', 1e-3),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model_path = audio_processing._resolve_artifact(Path(options['model']))
+            spec = load_for_model(model_path)
+            raw_labels = audio_processing.label_encoder_for(model_path).classes_
+        except (audio_processing.AudioProcessingError, FeatureSpecError) as exc:
+            raise CommandError(str(exc)) from exc
+        output_path = Path(options['output']) if options['output'] else TFLiteBackend.artifact_path(model_path)
+
+        reference = KerasBackend(model_path, cache_dir=getattr(settings, 'EMOTION_MODEL_CACHE_DIR', None))
+        convert_to_tflite(reference.model, output_path)
+        candidate = TFLiteBackend(output_path)
+
+        features = load_parity_features(options['samples'], options['count'], spec)
+        report = audio_processing.compare_backends(reference, candidate, features, raw_labels)
+        self.stdout.write(
+            f"Paridade em {report['samples']} amostras: diferença máx {report['max_abs_diff']:.2e}, "
+            f"média {report['mean_abs_diff']:.2e}, concordância {100 * report['agreement']:.1f}%"
+        )
+        if report['max_abs_diff'] > options['tolerance']:
+            output_path.unlink(missing_ok=True)
+            raise CommandError(
+                f"Modelo TFLite descartado: diferença {report['max_abs_diff']:.2e} acima da tolerância {options['tolerance']:.0e}."
+            )
+        size_kb = output_path.stat().st_size / 1024
+        self.stdout.write(self.style.SUCCESS(f'Modelo TFLite gravado em {output_path} ({size_kb:.0f} KB)'))
@@ -0,0 +1,76 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from emotion_analysis import jobs
+
+
+class Command(BaseCommand):
+    help = 'Worker que processa a fila de análises de emoção (AnalysisJob).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Processa as tarefas pendentes e encerra.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos de espera quando a fila está vazia.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Encerra após processar N tarefas (0 = sem limite).')
+        parser.add_argument('--no-scan', action='store_true', help='Não enfileira automaticamente desabafos novos sem análise.')
+        parser.add_argument('--worker-name', default='', help='Identificador gravado nas tarefas processadas.')
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Tarefas processadas em paralelo neste processo (combine com EMOTION_BATCHING_ENABLED).',
+        )
+
+    def handle(self, *args, **options):
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._processed = 0
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        worker_name = options['worker_name'] or jobs.default_worker_name()
+        self.stdout.write(f'Worker {worker_name} aguardando tarefas...')
+
+        threads = [
+            threading.Thread(target=self._loop, args=(f'{worker_name}/{index}', options), daemon=True)
+            for index in range(max(1, options['threads']))
+        ]
+        for thread in threads:
+            thread.start()
+        # Join with a timeout so the main thread keeps receiving signals.
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        self.stdout.write(self.style.SUCCESS(f'Worker encerrado. {self._processed} tarefa(s) processada(s).'))
+
+    def _loop(self, worker_name, options):
+        max_jobs = options['max_jobs']
+        try:
+            while not self._stop.is_set():
+                jobs.requeue_stale_jobs()
+                if not options['no_scan']:
+                    jobs.enqueue_unanalysed_recordings()
+
+                job = jobs.claim_next_job(worker_name)
+                if job is None:
+                    if options['once']:
+                        break
+                    self._stop.wait(options['poll_interval'])
+                    continue
+
+                started = time.monotonic()
+                jobs.run_job(job)
+                self.stdout.write(
+                    f'Tarefa #{job.pk} ({job.recording_id}) -> {job.status} em {time.monotonic() - started:.2f}s'
+                )
+                with self._lock:
+                    self._processed += 1
+                    if max_jobs and self._processed >= max_jobs:
+                        self._stop.set()
+        finally:
+            connection.close()
+
+    def _request_stop(self, signum, frame):
+        self._stop.set()
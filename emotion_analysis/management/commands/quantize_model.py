@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from emotion_analysis import audio_processing, quantization
+from emotion_analysis.feature_spec import FeatureSpecError, load_for_model
+from emotion_analysis.inference_backends import (
+    QUANTIZATION_MODES, KerasBackend, TFLiteBackend, convert_to_tflite,
+)
+from emotion_analysis.model_artifacts import file_sha256
+
+
+class Command(BaseCommand):
+    help = 'Gera variantes quantizadas (float16/int8) do modelo e as aprova ou reprova contra o float32.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=str(audio_processing.MODEL_RELATIVE_PATH))
+        parser.add_argument(
+            '--holdout', required=True,
+            help='Áudios rotulados: <dir>/<rótulo>/arquivo ou nomes no padrão RAVDESS.',
+        )
+        parser.add_argument('--variants', nargs='+', choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+        parser.add_argument(
+            '--max-drop', type=float,
+            default=getattr(settings, 'EMOTION_QUANTIZATION_MAX_ACCURACY_DROP', 0.01),
+            help='Queda máxima de acurácia geral aceita.',
+        )
+        parser.add_argument(
+            '--max-class-drop', type=float,
+            default=getattr(settings, 'EMOTION_QUANTIZATION_MAX_CLASS_DROP', 0.05),
+            help='Queda máxima de acurácia aceita em qualquer classe.',
+        )
+        parser.add_argument('--keep-rejected', action='store_true', help='Mantém no disco as variantes reprovadas.')
+
+    def handle(self, *args, **options):
+        try:
+            model_path = audio_processing._resolve_artifact(Path(options['model']))
+            spec = load_for_model(model_path)
+            # O LabelEncoder do próprio --model, não o de static/modelo.
+            encoder = audio_processing.label_encoder_for(model_path)
+        except (audio_processing.AudioProcessingError, FeatureSpecError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        class_labels = [str(label) for label in encoder.classes_]
+        paths, labels = quantization.list_holdout(Path(options['holdout']), class_labels)
+        if not paths:
+            raise CommandError('Nenhum áudio rotulado encontrado no conjunto de validação.')
+        self.stdout.write(f'Extraindo features de {len(paths)} áudios de validação...')
+        features = np.concatenate([audio_processing._extract_features(path, spec) for path in paths])
+
+        reference = KerasBackend(model_path, cache_dir=getattr(settings, 'EMOTION_MODEL_CACHE_DIR', None))
+        reference_eval = quantization.evaluate_backend(reference, features, labels, class_labels)
+        self._print_row('float32', reference_eval)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'source': model_path.name,
+            'source_sha256': file_sha256(model_path),
+            'holdout_samples': len(paths),
+            'max_drop': options['max_drop'],
+            'max_class_drop': options['max_class_drop'],
+            'reference': reference_eval,
+            'variants': {},
+        }
+        for variant in options['variants']:
+            variant_path = TFLiteBackend.artifact_path(model_path, variant)
+            convert_to_tflite(reference.model, variant_path, quantization=variant)
+            evaluation = quantization.evaluate_backend(TFLiteBackend(variant_path), features, labels, class_labels)
+            accepted, reason, class_drops = quantization.gate_variant(
+                reference_eval, evaluation, options['max_drop'], options['max_class_drop'],
+            )
+            report['variants'][variant] = {
+                **evaluation,
+                'file': variant_path.name,
+                'sha256': file_sha256(variant_path),
+                'accuracy_drop': reference_eval['accuracy'] - evaluation['accuracy'],
+                'per_class_drop': class_drops,
+                'accepted': accepted,
+                'reason': reason,
+            }
+            self._print_row(variant, evaluation, accepted, reason)
+            if not accepted and not options['keep_rejected']:
+                variant_path.unlink(missing_ok=True)
+
+        path = quantization.write_report(model_path, report)
+        self.stdout.write(self.style.SUCCESS(f'Relatório gravado em {path}'))
+
+    def _print_row(self, name, evaluation, accepted=None, reason=''):
+        status = '' if accepted is None else (' APROVADA' if accepted else f' REPROVADA ({reason})')
+        self.stdout.write(
+            f"{name:>8}: acurácia {100 * evaluation['accuracy']:.2f}% | "
+            f"{evaluation['size_bytes'] / 1024:.0f} KB | "
+            f"p50 {evaluation['latency_ms_p50']:.2f} ms p95 {evaluation['latency_ms_p95']:.2f} ms{status}"
+        )
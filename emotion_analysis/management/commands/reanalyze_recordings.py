@@ -0,0 +1,195 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as dt_time
+from pathlib import Path
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from emotion_analysis import audio_processing
+from emotion_analysis.models import AudioRecording, EmotionAnalysis
+
+
+def _parse_date(value, end_of_day=False):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as exc:
+        raise CommandError(f'Data inválida: {value} (use AAAA-MM-DD).') from exc
+    return timezone.make_aware(datetime.combine(day, dt_time.max if end_of_day else dt_time.min))
+
+
+class Command(BaseCommand):
+    help = (
+        'Reanalisa desabafos já gravados com o modelo atual: decodifica em um pool de '
+        'processos, agrupa as features em lotes grandes de predict e grava com bulk_update.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help='Username (pode repetir).')
+        parser.add_argument('--since', help='Desabafos criados a partir de AAAA-MM-DD.')
+        parser.add_argument('--until', help='Desabafos criados até AAAA-MM-DD (inclusive).')
+        parser.add_argument(
+            '--model-version', action='append', default=[],
+            help='Só desabafos cuja análise foi gerada por esta versão do modelo (pode repetir).',
+        )
+        parser.add_argument(
+            '--only-stale', action='store_true',
+            help='Só desabafos sem análise ou analisados por outra versão do modelo.',
+        )
+        parser.add_argument('--limit', type=int, default=0, help='Máximo de desabafos (0 = todos).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos de decodificação.')
+        parser.add_argument('--batch-size', type=int, default=64, help='Tensores por chamada de predict.')
+        parser.add_argument(
+            '--checkpoint', default=str(Path(settings.BASE_DIR) / 'var' / 'reanalyze_checkpoint.json'),
+            help='Arquivo de progresso gravado após cada lote.',
+        )
+        parser.add_argument('--resume', action='store_true', help='Continua a partir do checkpoint.')
+
+    def handle(self, *args, **options):
+        # Pin one model version for the whole run, even if another is activated meanwhile.
+        self.model = audio_processing.model_snapshot()
+        version = self.model.version if self.model else audio_processing.model_version()
+        # Workers build the features this model was trained on without loading it.
+        spec_data = audio_processing.feature_spec(self.model).to_dict()
+        queryset = self._queryset(options, version)
+        checkpoint_path = Path(options['checkpoint'])
+        signature = self._signature(options, version)
+
+        self.totals = {'processed': 0, 'failed': 0, 'tensors': 0, 'predict_seconds': 0.0}
+        if options['resume'] and checkpoint_path.exists():
+            checkpoint = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+            if checkpoint.get('signature') != signature:
+                raise CommandError('O checkpoint foi gravado com outros filtros ou outro modelo; remova-o ou ajuste as opções.')
+            queryset = queryset.filter(pk__gt=checkpoint['last_id'])
+            self.totals.update(checkpoint['totals'])
+            self.stdout.write(f"Retomando após o desabafo #{checkpoint['last_id']}.")
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        self.stdout.write(f'Modelo {version}: {queryset.count()} desabafo(s) para reanalisar.')
+        started = time.monotonic()
+        processed_before = self.totals['processed']
+
+        pending = []
+        pending_rows = 0
+        in_flight = deque()
+        max_in_flight = max(1, options['workers']) * 4
+        # Spawned (not forked) workers: the parent loads TensorFlow for predict.
+        context = multiprocessing.get_context('spawn')
+        rows = queryset.values_list('pk', 'audio_file').iterator(chunk_size=500)
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), mp_context=context, initializer=django.setup) as pool:
+            exhausted = False
+            while not exhausted or in_flight:
+                # Keep a bounded window of decodes in flight, consumed in pk order so the
+                # checkpoint can always record the last flushed id.
+                while not exhausted and len(in_flight) < max_in_flight:
+                    row = next(rows, None)
+                    if row is None:
+                        exhausted = True
+                        break
+                    recording_id, audio_file = row
+                    audio_path = os.path.join(settings.MEDIA_ROOT, audio_file)
+                    in_flight.append(pool.submit(audio_processing.extract_features_task, recording_id, audio_path, spec_data))
+                if not in_flight:
+                    break
+
+                recording_id, features, windows, error = in_flight.popleft().result()
+                if error:
+                    self.totals['failed'] += 1
+                    self.stderr.write(f'Desabafo #{recording_id}: {error}')
+                else:
+                    pending.append((recording_id, features, windows))
+                    pending_rows += features.shape[0]
+                if pending_rows >= options['batch_size'] or (exhausted and not in_flight):
+                    self._flush(pending)
+                    pending, pending_rows = [], 0
+                    self._save_checkpoint(checkpoint_path, signature, recording_id)
+                    self._report(started, processed_before)
+
+        self._report(started, processed_before, final=True)
+
+    def _queryset(self, options, version):
+        queryset = AudioRecording.objects.order_by('pk')
+        if options['user']:
+            queryset = queryset.filter(user__username__in=options['user'])
+        if options['since']:
+            queryset = queryset.filter(created_at__gte=_parse_date(options['since']))
+        if options['until']:
+            queryset = queryset.filter(created_at__lte=_parse_date(options['until'], end_of_day=True))
+        if options['model_version']:
+            queryset = queryset.filter(emotion_analysis__model_version__in=options['model_version'])
+        if options['only_stale']:
+            queryset = queryset.filter(
+                Q(emotion_analysis__isnull=True) | ~Q(emotion_analysis__model_version=version)
+            )
+        return queryset
+
+    @staticmethod
+    def _signature(options, version):
+        keys = ('user', 'since', 'until', 'model_version', 'only_stale')
+        return {'model': version, **{key: options[key] for key in keys}}
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        batch = np.concatenate([features for _, features, _ in pending])
+        started = time.monotonic()
+        probabilities = audio_processing.predict_batch(batch, self.model)
+        self.totals['predict_seconds'] += time.monotonic() - started
+        self.totals['tensors'] += batch.shape[0]
+
+        results = {}
+        offset = 0
+        for recording_id, features, windows in pending:
+            rows = probabilities[offset:offset + features.shape[0]]
+            offset += features.shape[0]
+            results[recording_id] = audio_processing.build_result(rows, windows, model=self.model)
+
+        fields = ['dominant_emotion', 'confidence', 'emotions_data', 'timeline', 'model_version']
+        with transaction.atomic():
+            existing = {
+                analysis.recording_id: analysis
+                for analysis in EmotionAnalysis.objects.filter(recording_id__in=results)
+            }
+            to_create = []
+            for recording_id, result in results.items():
+                analysis = existing.get(recording_id) or EmotionAnalysis(recording_id=recording_id)
+                for field in fields:
+                    setattr(analysis, field, result[field])
+                if analysis.pk is None:
+                    to_create.append(analysis)
+            EmotionAnalysis.objects.bulk_update(list(existing.values()), fields)
+            EmotionAnalysis.objects.bulk_create(to_create)
+        self.totals['processed'] += len(results)
+
+    def _save_checkpoint(self, path, signature, last_id):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(
+            json.dumps({'signature': signature, 'last_id': last_id, 'totals': self.totals}),
+            encoding='utf-8',
+        )
+        os.replace(tmp_path, path)
+
+    def _report(self, started, processed_before, final=False):
+        elapsed = time.monotonic() - started
+        processed = self.totals['processed'] - processed_before
+        rate = processed / elapsed if elapsed else 0.0
+        message = (
+            f"{self.totals['processed']} reanalisado(s), {self.totals['failed']} falha(s), "
+            f"{rate:.1f} desabafos/s, {self.totals['tensors']} tensores em "
+            f"{self.totals['predict_seconds']:.1f}s de predict"
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(f'Concluído em {elapsed:.1f}s: {message}.'))
+        else:
+            self.stdout.write(message)
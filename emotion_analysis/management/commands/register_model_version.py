@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis import audio_processing
+from emotion_analysis.model_artifacts import file_sha256
+from emotion_analysis.model_registry import ModelSpec
+from emotion_analysis.models import ModelVersion
+
+
+def _stored_path(path):
+    """Caminho relativo a BASE_DIR quando o arquivo está dentro do projeto."""
+    try:
+        return str(path.relative_to(Path(settings.BASE_DIR)))
+    except ValueError:
+        return str(path)
+
+
+class Command(BaseCommand):
+    help = 'Registra uma versão do modelo de emoções (hash, rótulos e caminhos) e, opcionalmente, ativa-a.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('version', help='Nome da versão (ex.: 2024-06-ravdess-v2).')
+        parser.add_argument(
+            '--model', default=str(audio_processing.MODEL_RELATIVE_PATH),
+            help='Arquivo .keras (relativo a BASE_DIR ou absoluto).',
+        )
+        parser.add_argument(
+            '--encoder', default=str(audio_processing.ENCODER_RELATIVE_PATH),
+            help='LabelEncoder .joblib (relativo a BASE_DIR ou absoluto).',
+        )
+        parser.add_argument('--notes', default='', help='Observações gravadas com a versão.')
+        parser.add_argument('--activate', action='store_true', help='Ativa a versão logo após registrá-la.')
+
+    def handle(self, *args, **options):
+        if ModelVersion.objects.filter(version=options['version']).exists():
+            raise CommandError(f"A versão {options['version']} já está registrada.")
+        try:
+            model_path = audio_processing._resolve_artifact(Path(options['model']))
+            encoder_path = audio_processing._resolve_artifact(Path(options['encoder']))
+        except audio_processing.AudioProcessingError as exc:
+            raise CommandError(str(exc)) from exc
+
+        labels = [str(label) for label in audio_processing._read_label_encoder(encoder_path).classes_]
+        sha256 = file_sha256(model_path)
+        spec = ModelSpec(options['version'], model_path, encoder_path, sha256, tuple(labels))
+
+        # Load it exactly as the workers will, and check the output matches the label set.
+        self.stdout.write('Validando o modelo...')
+        try:
+            active = audio_processing._load_active_model(spec)
+        except audio_processing.AudioProcessingError as exc:
+            raise CommandError(str(exc)) from exc
+        outputs = active.backend.predict(np.zeros((1,) + active.features.input_shape, dtype=np.float32)).shape[-1]
+        if outputs != len(labels):
+            raise CommandError(f'O modelo tem {outputs} saídas, mas o codificador tem {len(labels)} rótulos.')
+        self.stdout.write(f'Features: {active.features.kind} {active.features.input_shape}')
+
+        record = ModelVersion.objects.create(
+            version=options['version'],
+            model_path=_stored_path(model_path),
+            encoder_path=_stored_path(encoder_path),
+            sha256=sha256,
+            labels=labels,
+            notes=options['notes'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Versão {record.version} registrada (sha256 {sha256[:16]}...).'))
+        if options['activate']:
+            record.activate()
+            self.stdout.write(self.style.SUCCESS(f'Versão {record.version} ativada.'))
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis import audio_processing
+from emotion_analysis.model_server import ModelServer, ModelServerError, socket_in_use
+
+
+class Command(BaseCommand):
+    help = 'Inicia o servidor de modelo compartilhado (socket Unix) usado pelos workers de análise.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=getattr(settings, 'EMOTION_MODEL_SERVER_SOCKET', ''),
+            help='Caminho do socket Unix (padrão: EMOTION_MODEL_SERVER_SOCKET).',
+        )
+        parser.add_argument('--max-batch-size', type=int, default=getattr(settings, 'EMOTION_BATCH_MAX_SIZE', 16))
+        parser.add_argument('--max-latency-ms', type=float, default=getattr(settings, 'EMOTION_BATCH_MAX_LATENCY_MS', 10.0))
+
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError('Informe --socket ou defina EMOTION_MODEL_SERVER_SOCKET.')
+        # Checked before loading the model, which is the slow part.
+        if socket_in_use(socket_path):
+            raise CommandError(f'Já existe um servidor de modelo ouvindo em {socket_path}.')
+
+        self.stdout.write('Carregando o modelo de emoções...')
+        try:
+            active = audio_processing.active_model()
+        except audio_processing.AudioProcessingError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f'Versão ativa: {active.version}')
+
+        # Each request pins the registry's current version, so activating a new one hot-swaps the server.
+        try:
+            server = ModelServer(
+                socket_path,
+                audio_processing._predict_batch,
+                audio_processing.model_info,
+                snapshot=audio_processing.active_model,
+                max_batch_size=options['max_batch_size'],
+                max_latency_ms=options['max_latency_ms'],
+            )
+        except ModelServerError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f'Servidor de modelo ouvindo em {socket_path}'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('Servidor de modelo encerrado.')
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emotion_analysis import audio_processing
+from emotion_analysis.training.config import TrainingConfig
+
+# Opção da linha de comando -> campo de TrainingConfig.
+OVERRIDES = {
+    'dataset': 'dataset_path',
+    'output_dir': 'output_dir',
+    'feature_store_dir': 'feature_store_dir',
+    'epochs': 'epochs',
+    'batch_size': 'batch_size',
+    'learning_rate': 'base_learning_rate',
+    'input_mode': 'input_mode',
+    'workers': 'num_workers',
+    'threads': 'intra_op_threads',
+    'inter_op_threads': 'inter_op_threads',
+    'architecture': 'architecture',
+    'teacher_model': 'teacher_model',
+    'temperature': 'distill_temperature',
+    'alpha': 'distill_alpha',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Treina o modelo de emoções localmente, retomando do último checkpoint após uma interrupção, '
+        'e exporta modelo, LabelEncoder e especificação das features para static/modelo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help='JSON com campos de TrainingConfig (as opções abaixo têm precedência).')
+        parser.add_argument('--dataset', help='Pasta do dataset (RAVDESS e/ou gravações em pastas por emoção).')
+        parser.add_argument('--output-dir', help='Checkpoints, histórico e artefatos do treino (padrão: var/training).')
+        parser.add_argument('--feature-store-dir', help='Índice e features gravadas (padrão: <output-dir>/feature_store).')
+        parser.add_argument('--epochs', type=int)
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--learning-rate', type=float)
+        parser.add_argument('--input-mode', choices=['store', 'streaming'])
+        parser.add_argument('--workers', type=int, help='Processos na extração de features (0 = todos os núcleos).')
+        parser.add_argument('--threads', type=int, help='Threads do TensorFlow por operação no treino em CPU.')
+        parser.add_argument('--inter-op-threads', type=int, help='Operações do TensorFlow executadas em paralelo.')
+        parser.add_argument(
+            '--architecture', choices=['teacher', 'student'],
+            help='student: modelo pequeno para CPU, destilado de --teacher-model.',
+        )
+        parser.add_argument('--teacher-model', help='.keras do professor (ex.: static/modelo/modelo_emocoes.keras).')
+        parser.add_argument('--temperature', type=float, help='Temperatura das probabilidades do professor.')
+        parser.add_argument('--alpha', type=float, help='Peso dos rótulos reais na perda do aluno (0 a 1).')
+        parser.add_argument('--fresh', action='store_true', help='Ignora o checkpoint existente e treina do zero.')
+        parser.add_argument(
+            '--export-dir', default=str(audio_processing.MODEL_RELATIVE_PATH.parent),
+            help='Para onde copiar os artefatos ao final (relativo a BASE_DIR ou absoluto).',
+        )
+        parser.add_argument('--no-export', action='store_true', help='Mantém os artefatos só em --output-dir.')
+
+    def handle(self, *args, **options):
+        cfg = self._config(options)
+        self.stdout.write(f'Dataset: {cfg.dataset_path}')
+        self.stdout.write(f'Saída: {cfg.output_dir} (features em {cfg.feature_store_dir})')
+
+        # TensorFlow só é importado aqui, para que as threads sejam definidas antes de ele iniciar.
+        from emotion_analysis.training import trainer
+
+        trainer.configure_threads(cfg)
+        try:
+            run = trainer.train(cfg, resume=not options['fresh'])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f'Treino concluído: acurácia de teste {run.accuracy * 100:.2f}%.'))
+
+        if options['no_export']:
+            return
+        destination = Path(options['export_dir'])
+        if not destination.is_absolute():
+            destination = Path(settings.BASE_DIR) / destination
+        for path in trainer.export_artifacts(run.paths, destination):
+            self.stdout.write(f'  exportado: {path}')
+        self.stdout.write(self.style.SUCCESS(f'Artefatos exportados para {destination}.'))
+
+    @staticmethod
+    def _config(options):
+        data = {}
+        if options['config']:
+            try:
+                data = json.loads(Path(options['config']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Configuração inválida em {options['config']}: {exc}") from exc
+        for option, field in OVERRIDES.items():
+            if options[option] is not None:
+                data[field] = options[option]
+
+        # Os padrões de TrainingConfig apontam para o Google Drive do Colab.
+        if 'dataset_path' not in data:
+            raise CommandError('Informe o dataset com --dataset ou no arquivo de --config.')
+        data.setdefault('output_dir', str(Path(settings.BASE_DIR) / 'var' / 'training'))
+        data.setdefault('feature_store_dir', str(Path(data['output_dir']) / 'feature_store'))
+        if data.get('teacher_model') and not Path(data['teacher_model']).is_absolute():
+            data['teacher_model'] = str(Path(settings.BASE_DIR) / data['teacher_model'])
+        try:
+            return TrainingConfig.from_dict(data)
+        except (TypeError, ValueError) as exc:
+            raise CommandError(f'Configuração de treino inválida: {exc}') from exc
@@ -0,0 +1,439 @@
+"""Per-stage latency histograms for the analysis pipeline, in Prometheus text format.
+
+``stage('decode')`` times a block and records it in a histogram labelled by
+stage. Inside ``trace()``, the same timings (plus details such as the codec
+and decoder) are also collected for the current analysis, which the slow-
+analysis log uses. No client library is needed: the few metric types used
+here render the text exposition format directly.
+
+Analyses run in job workers, not in the web process that serves
+``/metrics/``. Each process therefore writes a snapshot of its metrics to
+``<EMOTION_METRICS_DIR>/<host>-<pid>-<start time>.json`` (throttled, and at
+exit), and the endpoint sums every snapshot. Snapshots of processes that
+exited (the pid is gone, or was reused by a newer process) are folded into
+``retired-<host>.json`` and deleted, so the totals never go backwards and the
+directory does not grow with every restart.
+
+Pids only mean something inside one PID namespace, so ``<host>`` (a hash of
+the hostname and kernel boot id) tags every snapshot and a process only ever
+folds snapshots of its own host. The directory can therefore be shared by
+containers or machines: each one's workers fold their own dead peers when
+they flush, and the web process folds its own when it renders.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - Windows
+	fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_BOOT_ID_PATH = Path('/proc/sys/kernel/random/boot_id')
+
+LabelValues = Tuple[str, ...]
+T = TypeVar('T')
+
+
+class Counter:
+	"""Monotonic counter with a fixed set of label names."""
+
+	kind = 'counter'
+
+	def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+		self.name = name
+		self.documentation = documentation
+		self.label_names = tuple(label_names)
+		self._values: Dict[LabelValues, float] = {}
+		self._lock = threading.Lock()
+
+	def inc(self, amount: float = 1.0, **labels: str) -> None:
+		key = tuple(str(labels.get(name, '')) for name in self.label_names)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def snapshot(self) -> List[list]:
+		with self._lock:
+			return [[list(key), value] for key, value in self._values.items()]
+
+	@staticmethod
+	def merge(total: Dict[LabelValues, object], series: List[list]) -> None:
+		for key, value in series:
+			total[tuple(key)] = total.get(tuple(key), 0.0) + value
+
+	def render(self, merged: Dict[LabelValues, object]) -> Iterator[str]:
+		for key, value in sorted(merged.items()):
+			yield f'{self.name}{_labels(self.label_names, key)} {value}'
+
+
+class Histogram(Counter):
+	"""Cumulative-bucket histogram, as in the Prometheus exposition format."""
+
+	kind = 'histogram'
+
+	def __init__(
+		self,
+		name: str,
+		documentation: str,
+		label_names: Sequence[str] = (),
+		buckets: Sequence[float] = LATENCY_BUCKETS,
+	) -> None:
+		super().__init__(name, documentation, label_names)
+		self.buckets = tuple(buckets)
+
+	def observe(self, value: float, **labels: str) -> None:
+		key = tuple(str(labels.get(name, '')) for name in self.label_names)
+		with self._lock:
+			# [per-bucket counts..., +Inf count, sum]
+			state = self._values.get(key)
+			if state is None:
+				state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+			for index, bound in enumerate(self.buckets):
+				if value <= bound:
+					state[index] += 1
+			state[len(self.buckets)] += 1
+			state[-1] += value
+
+	def snapshot(self) -> List[list]:
+		with self._lock:
+			return [[list(key), list(state)] for key, state in self._values.items()]
+
+	@staticmethod
+	def merge(total: Dict[LabelValues, object], series: List[list]) -> None:
+		for key, state in series:
+			current = total.get(tuple(key))
+			total[tuple(key)] = list(state) if current is None else [a + b for a, b in zip(current, state)]
+
+	def render(self, merged: Dict[LabelValues, object]) -> Iterator[str]:
+		for key, state in sorted(merged.items()):
+			for bound, count in zip(self.buckets, state):
+				yield f'{self.name}_bucket{_labels(self.label_names + ("le",), key + (repr(bound),))} {count}'
+			count = state[len(self.buckets)]
+			yield f'{self.name}_bucket{_labels(self.label_names + ("le",), key + ("+Inf",))} {count}'
+			yield f'{self.name}_sum{_labels(self.label_names, key)} {state[-1]}'
+			yield f'{self.name}_count{_labels(self.label_names, key)} {count}'
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+	if not names:
+		return ''
+	escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+	return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+STAGE_SECONDS = Histogram(
+	'emotion_analysis_stage_seconds',
+	'Tempo gasto em cada etapa da análise de emoções.',
+	('stage',),
+)
+DECODE_SECONDS = Histogram(
+	'emotion_analysis_decode_seconds',
+	'Tempo de decodificação do áudio por contêiner e decodificador usado.',
+	('container', 'decoder'),
+)
+FEATURE_CACHE_LOOKUPS = Counter(
+	'emotion_analysis_feature_cache_lookups_total',
+	'Consultas ao cache de features.',
+	('result',),
+)
+SLOW_ANALYSES = Counter(
+	'emotion_analysis_slow_total',
+	'Análises acima de EMOTION_SLOW_ANALYSIS_SECONDS.',
+)
+BATCH_SIZE = Histogram(
+	'emotion_analysis_batch_size',
+	'Amostras por passada do modelo no micro-batching, por batcher.',
+	('batcher',),
+	buckets=(1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0),
+)
+BATCH_SLOTS = Counter(
+	'emotion_analysis_batch_slots_total',
+	'Capacidade (max_batch_size) somada das passadas em lote; '
+	'taxa de preenchimento = emotion_analysis_batch_size_sum / este total.',
+	('batcher',),
+)
+
+METRICS = (STAGE_SECONDS, DECODE_SECONDS, FEATURE_CACHE_LOOKUPS, SLOW_ANALYSES, BATCH_SIZE, BATCH_SLOTS)
+
+
+@dataclass
+class AnalysisTrace:
+	"""Stage timings and details collected for one analysis."""
+
+	stages: Dict[str, float] = field(default_factory=dict)
+	info: Dict[str, object] = field(default_factory=dict)
+
+	@property
+	def total(self) -> float:
+		return self.stages.get('total', sum(self.stages.values()))
+
+
+_current_trace: ContextVar[AnalysisTrace | None] = ContextVar('emotion_analysis_trace', default=None)
+
+
+@contextmanager
+def trace() -> Iterator[AnalysisTrace]:
+	"""Collect the stage timings recorded in this context into an ``AnalysisTrace``."""
+
+	current = AnalysisTrace()
+	token = _current_trace.set(current)
+	try:
+		yield current
+	finally:
+		_current_trace.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+	"""Observe ``seconds`` for stage ``name`` and add it to the current trace."""
+
+	STAGE_SECONDS.observe(seconds, stage=name)
+	current = _current_trace.get()
+	if current is not None:
+		current.stages[name] = current.stages.get(name, 0.0) + seconds
+	_snapshots.maybe_write()
+
+
+def record_batch(batcher: str, size: int, capacity: int) -> None:
+	"""Observe one micro-batched forward pass of ``size`` samples out of ``capacity``."""
+
+	BATCH_SIZE.observe(size, batcher=batcher)
+	BATCH_SLOTS.inc(capacity, batcher=batcher)
+	_snapshots.maybe_write()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+	"""Time the enclosed block as stage ``name``."""
+
+	started = time.perf_counter()
+	try:
+		yield
+	finally:
+		record(name, time.perf_counter() - started)
+
+
+def timed(iterable: Iterable[T], name: str) -> Iterator[T]:
+	"""Iterate ``iterable``, recording the time spent producing items as one ``name`` stage.
+
+	For generators that interleave with other stages (e.g. spectrogram batches
+	fed to the model), so each analysis contributes a single observation.
+	"""
+
+	iterator = iter(iterable)
+	elapsed = 0.0
+	try:
+		while True:
+			started = time.perf_counter()
+			try:
+				item = next(iterator)
+			except StopIteration:
+				return
+			finally:
+				elapsed += time.perf_counter() - started
+			yield item
+	finally:
+		record(name, elapsed)
+
+
+def annotate(**info: object) -> None:
+	"""Attach details (codec, decoder, duration...) to the current analysis trace."""
+
+	current = _current_trace.get()
+	if current is not None:
+		current.info.update(info)
+
+
+@lru_cache(maxsize=1)
+def host_id() -> str:
+	"""Identifies this PID namespace: containers differ by hostname, reboots by boot id."""
+
+	try:
+		boot_id = _BOOT_ID_PATH.read_text(encoding='utf-8').strip()
+	except OSError:
+		boot_id = ''
+	return hashlib.sha256(f'{socket.gethostname()}/{boot_id}'.encode('utf-8')).hexdigest()[:12]
+
+
+def retired_snapshot_name(host: str) -> str:
+	return f'retired-{host}.json'
+
+
+class _SnapshotWriter:
+	"""Throttled dump of this process's metrics for the cross-process endpoint."""
+
+	def __init__(self) -> None:
+		self.directory: Path | None = None
+		self.interval = 5.0
+		self._last_write = 0.0
+		self._lock = threading.Lock()
+		self._pid = 0
+		self._file_name = ''
+		atexit.register(self.write)
+
+	def configure(self, directory: Path | None, interval: float) -> None:
+		self.directory = Path(directory) if directory else None
+		self.interval = interval
+
+	def file_name(self) -> str:
+		"""``<host>-<pid>-<start time>.json``; the start time tells a reused pid from the process that had it."""
+
+		pid = os.getpid()
+		if pid != self._pid:
+			# First write, or a forked child that inherited the parent's name.
+			self._pid = pid
+			self._file_name = f'{host_id()}-{pid}-{time.time_ns()}.json'
+		return self._file_name
+
+	def own_file_name(self) -> str | None:
+		return self._file_name if self._pid == os.getpid() else None
+
+	def maybe_write(self) -> None:
+		if self.directory is not None and time.monotonic() - self._last_write >= self.interval:
+			self.write()
+
+	def write(self) -> None:
+		if self.directory is None or not self._lock.acquire(blocking=False):
+			return
+		try:
+			self._last_write = time.monotonic()
+			snapshot = {metric.name: metric.snapshot() for metric in METRICS}
+			if not any(snapshot.values()):
+				# Nothing observed (e.g. a management command that ran no analysis).
+				return
+			self.directory.mkdir(parents=True, exist_ok=True)
+			path = self.directory / self.file_name()
+			tmp_path = path.with_suffix('.tmp')
+			tmp_path.write_text(json.dumps(snapshot), encoding='utf-8')
+			os.replace(tmp_path, path)
+		except OSError as exc:
+			logger.warning('Não foi possível gravar as métricas em %s: %s', self.directory, exc)
+			return
+		finally:
+			self._lock.release()
+		# Hosts without a web process still fold their own exited workers.
+		_fold_retired(self.directory)
+
+
+_snapshots = _SnapshotWriter()
+configure_snapshots = _snapshots.configure
+
+
+def _merge(snapshots: Iterable[Dict[str, list]]) -> Dict[str, Dict[LabelValues, object]]:
+	merged: Dict[str, Dict[LabelValues, object]] = {metric.name: {} for metric in METRICS}
+	for snapshot in snapshots:
+		for metric in METRICS:
+			metric.merge(merged[metric.name], snapshot.get(metric.name, []))
+	return merged
+
+
+def _read_snapshot(path: Path) -> Dict[str, list] | None:
+	try:
+		return json.loads(path.read_text(encoding='utf-8'))
+	except (OSError, ValueError):
+		return None
+
+
+def _process_alive(pid: int) -> bool:
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except OSError:
+		return True  # e.g. EPERM: the pid exists but belongs to another user
+	return True
+
+
+def _retired_paths(directory: Path, host: str) -> List[Path]:
+	"""Snapshots of ``host`` whose process exited: its pid is gone, or a newer process with the same pid wrote one.
+
+	Snapshots of other hosts are never considered: their pids cannot be checked from here.
+	"""
+
+	owners: Dict[Path, Tuple[int, int]] = {}
+	for path in directory.glob(f'{host}-*.json'):
+		parts = path.stem.split('-')
+		if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+			owners[path] = (int(parts[1]), int(parts[2]))
+	latest: Dict[int, int] = {}
+	for pid, started in owners.values():
+		latest[pid] = max(latest.get(pid, started), started)
+	return [
+		path for path, (pid, started) in owners.items()
+		if started < latest[pid] or not _process_alive(pid)
+	]
+
+
+def _fold_retired(directory: Path) -> None:
+	"""Add this host's snapshots of exited processes to ``retired-<host>.json`` and delete them."""
+
+	if fcntl is None:
+		return
+	host = host_id()
+	try:
+		# One lock and one retired file per host: other hosts never touch them.
+		with open(directory / f'.lock-{host}', 'a') as lock:
+			# Concurrent /metrics/ requests and flushes must not fold the same file twice.
+			fcntl.flock(lock, fcntl.LOCK_EX)
+			paths = _retired_paths(directory, host)
+			if not paths:
+				return
+			retired_path = directory / retired_snapshot_name(host)
+			snapshots = [_read_snapshot(path) for path in [retired_path, *paths]]
+			merged = _merge(snapshot for snapshot in snapshots if snapshot)
+			tmp_path = retired_path.with_suffix('.tmp')
+			tmp_path.write_text(
+				json.dumps({name: [[list(key), value] for key, value in series.items()] for name, series in merged.items()}),
+				encoding='utf-8',
+			)
+			os.replace(tmp_path, retired_path)
+			for path in paths:
+				path.unlink(missing_ok=True)
+	except OSError as exc:
+		logger.warning('Não foi possível consolidar as métricas de processos encerrados em %s: %s', directory, exc)
+
+
+def _snapshot_files(directory: Path | None) -> Iterable[Dict[str, list]]:
+	if directory is None or not Path(directory).is_dir():
+		return
+	directory = Path(directory)
+	_fold_retired(directory)
+	own_file = _snapshots.own_file_name()
+	for path in directory.glob('*.json'):
+		if path.name == own_file:
+			continue
+		snapshot = _read_snapshot(path)
+		if snapshot is not None:
+			yield snapshot
+
+
+def render_prometheus(directory: Path | None = None) -> str:
+	"""Text exposition of this process's metrics plus every snapshot in ``directory``."""
+
+	snapshots = [{metric.name: metric.snapshot() for metric in METRICS}]
+	snapshots.extend(_snapshot_files(directory))
+	merged_by_name = _merge(snapshots)
+	lines: List[str] = []
+	for metric in METRICS:
+		merged = merged_by_name[metric.name]
+		lines.append(f'# HELP {metric.name} {metric.documentation}')
+		lines.append(f'# TYPE {metric.name} {metric.kind}')
+		lines.extend(metric.render(merged))
+	return '\n'.join(lines) + '\n'
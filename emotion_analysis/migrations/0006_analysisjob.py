@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:49
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_analysis', '0005_remove_journalentry_is_private_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='audiorecording',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Desabafo em Áudio', 'verbose_name_plural': 'Desabafos em Áudio'},
+        ),
+        migrations.AlterField(
+            model_name='audiorecording',
+            name='audio_file',
+            field=models.FileField(upload_to='desabafos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp3', 'wav', 'ogg', 'webm', 'm4a'])], verbose_name='Arquivo de Desabafo'),
+        ),
+        migrations.AlterField(
+            model_name='emotionanalysis',
+            name='recording',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='emotion_analysis', to='emotion_analysis.audiorecording', verbose_name='Desabafo'),
+        ),
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em Processamento'), ('done', 'Concluída'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.IntegerField(default=3, verbose_name='Máximo de Tentativas')),
+                ('worker', models.CharField(blank=True, help_text='Identificador do worker que processou a tarefa', max_length=100)),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finalizada em')),
+                ('recording', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='emotion_analysis.audiorecording', verbose_name='Desabafo')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Análise',
+                'verbose_name_plural': 'Tarefas de Análise',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='emotion_ana_status_fc1d99_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_analysis', '0006_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionanalysis',
+            name='timeline',
+            field=models.JSONField(blank=True, default=list, help_text='Emoções por janela de tempo ao longo do desabafo', verbose_name='Linha do Tempo'),
+        ),
+    ]
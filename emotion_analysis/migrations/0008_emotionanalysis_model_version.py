@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_analysis', '0007_emotionanalysis_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emotionanalysis',
+            name='model_version',
+            field=models.CharField(blank=True, db_index=True, help_text='Versão do modelo que gerou a análise', max_length=64, verbose_name='Versão do Modelo'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_analysis', '0008_emotionanalysis_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, unique=True, verbose_name='Versão')),
+                ('model_path', models.CharField(help_text='Arquivo .keras (relativo ao projeto ou absoluto)', max_length=500, verbose_name='Modelo')),
+                ('encoder_path', models.CharField(help_text='LabelEncoder .joblib (relativo ao projeto ou absoluto)', max_length=500, verbose_name='Codificador de Rótulos')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256 do Modelo')),
+                ('labels', models.JSONField(help_text='Rótulos na ordem das saídas do modelo', verbose_name='Rótulos')),
+                ('is_active', models.BooleanField(db_index=True, default=False, verbose_name='Ativa')),
+                ('notes', models.TextField(blank=True, verbose_name='Observações')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Registrada em')),
+                ('activated_at', models.DateTimeField(blank=True, null=True, verbose_name='Ativada em')),
+            ],
+            options={
+                'verbose_name': 'Versão do Modelo',
+                'verbose_name_plural': 'Versões do Modelo',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='modelversion',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='unique_active_model_version'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:59
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Mantém só a tarefa ativa mais antiga de cada desabafo antes de criar a restrição."""
+    AnalysisJob = apps.get_model('emotion_analysis', 'AnalysisJob')
+    seen = set()
+    duplicates = []
+    active = AnalysisJob.objects.filter(status__in=['pending', 'running']).order_by('recording_id', 'created_at', 'pk')
+    for pk, recording_id in active.values_list('pk', 'recording_id'):
+        if recording_id in seen:
+            duplicates.append(pk)
+        seen.add(recording_id)
+    AnalysisJob.objects.filter(pk__in=duplicates).update(
+        status='failed', finished_at=timezone.now(), error='Tarefa duplicada.',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emotion_analysis', '0009_modelversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('recording',), name='unique_active_analysis_job'),
+        ),
+    ]
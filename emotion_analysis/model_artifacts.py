@@ -0,0 +1,297 @@
+"""Keras archive parsing and the precompiled model artifact cache.
+
+Rebuilding the model from ``modelo_emocoes.keras`` means unzipping the archive,
+normalising its Keras 3 config and copying every weight out of an in-memory
+HDF5 file. ``convert_archive`` does that once and writes two files in the
+cache directory:
+
+* ``<stem>-<path hash>.manifest.json``: normalised config, weight layout, the
+  SHA-256 of the source archive and the name of its blob. Keyed by the
+  resolved source path, so versions that all ship a ``modelo_emocoes.keras``
+  keep separate manifests;
+* ``<source sha256>.weights.npy``: every weight array packed into one flat,
+  aligned ``uint8`` blob that is memory-mapped on load. Named after the
+  archive's content, it never changes once written: a reader always opens the
+  blob its manifest names, even while another process rewrites the manifest.
+
+``load_weights_and_config`` uses the cache while the archive is unchanged
+(size/mtime, then content hash) and falls back to the zip otherwise.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+	import h5py
+	import tensorflow as tf
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 3
+_ALIGNMENT = 64
+
+LayerWeights = Dict[str, List[np.ndarray]]
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+	digest = hashlib.sha256()
+	with open(path, 'rb') as handle:
+		for chunk in iter(lambda: handle.read(chunk_size), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+def normalise_layer_config(seq_config: Dict) -> Dict:
+	"""Tweak Keras 3 config so TensorFlow 2.15 (tf.keras) can rebuild it."""
+
+	# Sequential dtype is stored as a dictionary in the Keras 3 archive.
+	dtype = seq_config.get('dtype')
+	if isinstance(dtype, dict):
+		seq_config['dtype'] = dtype.get('config', {}).get('name', 'float32')
+
+	for layer in seq_config.get('layers', []):
+		cfg = layer.get('config', {})
+		# Legacy tf.keras expects batch_input_shape instead of batch_shape.
+		if 'batch_shape' in cfg:
+			cfg['batch_input_shape'] = cfg.pop('batch_shape')
+		dtype = cfg.get('dtype')
+		if isinstance(dtype, dict):
+			cfg['dtype'] = dtype.get('config', {}).get('name', 'float32')
+	return seq_config
+
+
+def _read_archive_weights(weights_bytes: bytes) -> LayerWeights:
+	"""Extract per-layer weight lists from the archive's ``model.weights.h5``."""
+
+	import h5py
+
+	def _read_vars(group: h5py.Group) -> List[np.ndarray]:
+		keys = sorted(group.keys(), key=lambda k: int(k))
+		return [group[key][()] for key in keys]
+
+	def _layer_vars(store: h5py.Group) -> List[np.ndarray]:
+		if 'vars' in store and len(store['vars']) > 0:
+			return _read_vars(store['vars'])
+		if 'cell' in store:
+			return _read_vars(store['cell']['vars'])
+		# Bidirectional: forward weights first, as in ``layer.get_weights()``.
+		if 'forward_layer' in store and 'backward_layer' in store:
+			return _layer_vars(store['forward_layer']) + _layer_vars(store['backward_layer'])
+		return []
+
+	layer_weights: LayerWeights = {}
+	with h5py.File(io.BytesIO(weights_bytes), 'r') as weights_file:
+		layer_store = weights_file['layers']
+		for name in layer_store:
+			weights = _layer_vars(layer_store[name])
+			if weights:
+				layer_weights[name] = weights
+	return layer_weights
+
+
+def read_keras_archive(model_path: Path) -> Tuple[Dict, LayerWeights]:
+	"""Parse a ``.keras`` archive into a normalised config and its weights."""
+
+	with zipfile.ZipFile(model_path) as archive:
+		config = json.loads(archive.read('config.json'))
+		seq_config = normalise_layer_config(config['config'])
+		weights_bytes = archive.read('model.weights.h5')
+	return seq_config, _read_archive_weights(weights_bytes)
+
+
+def archive_key(class_name: str, used: Dict[str, int]) -> str:
+	"""Key of a layer in ``model.weights.h5``: its snake-cased class, numbered in layer order.
+
+	The archive does not use ``layer.name``: the second ``LSTM`` is stored as
+	``lstm_1`` whatever it is called in the config.
+	"""
+
+	name = re.sub(r'(.)([A-Z][a-z0-9]+)', r'\1_\2', class_name)
+	name = re.sub(r'([a-z])([A-Z])', r'\1_\2', name).lower()
+	if name in used:
+		used[name] += 1
+		return f'{name}_{used[name]}'
+	used[name] = 0
+	return name
+
+
+def build_model(seq_config: Dict, layer_weights: LayerWeights) -> tf.keras.Model:
+	"""Build a tf.keras model from a Sequential config and manual weights."""
+
+	import tensorflow as tf
+
+	model = tf.keras.Sequential.from_config(seq_config)
+	build_shape = seq_config.get('build_input_shape')
+	if build_shape:
+		model.build(tuple(build_shape))
+
+	used: Dict[str, int] = {}
+	for layer in model.layers:
+		weights = layer_weights.get(archive_key(type(layer).__name__, used))
+		if weights:
+			layer.set_weights(weights)
+		elif layer.weights:
+			logger.warning('Pesos da camada %s ausentes no arquivo do modelo; mantida a inicialização.', layer.name)
+	return model
+
+
+def manifest_path(model_path: Path, cache_dir: Path) -> Path:
+	model_path = Path(model_path)
+	path_key = hashlib.sha256(str(model_path.resolve()).encode('utf-8')).hexdigest()[:16]
+	return Path(cache_dir) / f'{model_path.stem}-{path_key}.manifest.json'
+
+
+def blob_name(source_sha256: str) -> str:
+	return f'{source_sha256}.weights.npy'
+
+
+def _remove_unreferenced_blob(cache_dir: Path, name: str) -> None:
+	"""Delete a blob no manifest points to any more (readers that mapped it keep their mapping)."""
+
+	for path in cache_dir.glob('*.manifest.json'):
+		try:
+			if json.loads(path.read_text(encoding='utf-8')).get('blob') == name:
+				return
+		except (OSError, ValueError):
+			continue
+	try:
+		(cache_dir / name).unlink()
+	except OSError:
+		pass
+
+
+def convert_archive(model_path: Path, cache_dir: Path) -> Dict[str, object]:
+	"""Write the precompiled artifact for ``model_path`` and return its manifest."""
+
+	model_path = Path(model_path)
+	cache_dir = Path(cache_dir)
+	cache_dir.mkdir(parents=True, exist_ok=True)
+	target = manifest_path(model_path, cache_dir)
+	previous = _read_manifest_file(target)
+
+	stat = model_path.stat()
+	source_sha256 = file_sha256(model_path)
+	blob_path = cache_dir / blob_name(source_sha256)
+	seq_config, layer_weights = read_keras_archive(model_path)
+
+	layout: Dict[str, List[Dict[str, object]]] = {}
+	offset = 0
+	for name, weights in layer_weights.items():
+		entries = []
+		for array in weights:
+			offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+			entries.append({'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)})
+			offset += array.nbytes
+		layout[name] = entries
+
+	# Write to temporary names and rename, so concurrent readers never see a torn
+	# cache. The blob goes first: the manifest only ever names a complete blob.
+	tmp_blob = blob_path.with_name(blob_path.name + f'.{os.getpid()}.tmp')
+	blob = np.lib.format.open_memmap(tmp_blob, mode='w+', dtype=np.uint8, shape=(max(offset, 1),))
+	for name, weights in layer_weights.items():
+		for entry, array in zip(layout[name], weights):
+			start = int(entry['offset'])
+			blob[start:start + array.nbytes] = np.frombuffer(np.ascontiguousarray(array).tobytes(), dtype=np.uint8)
+	blob.flush()
+	del blob
+	os.replace(tmp_blob, blob_path)
+
+	manifest = {
+		'format_version': CACHE_FORMAT_VERSION,
+		'source': model_path.name,
+		'source_sha256': source_sha256,
+		'source_size': stat.st_size,
+		'source_mtime_ns': stat.st_mtime_ns,
+		'blob': blob_path.name,
+		'config': seq_config,
+		'layers': layout,
+	}
+	tmp_manifest = target.with_name(target.name + f'.{os.getpid()}.tmp')
+	tmp_manifest.write_text(json.dumps(manifest), encoding='utf-8')
+	os.replace(tmp_manifest, target)
+
+	if previous and previous.get('blob') and previous['blob'] != blob_path.name:
+		_remove_unreferenced_blob(cache_dir, previous['blob'])
+	return manifest
+
+
+def _read_manifest_file(path: Path) -> Dict[str, object] | None:
+	try:
+		return json.loads(path.read_text(encoding='utf-8'))
+	except (OSError, ValueError):
+		return None
+
+
+def _read_manifest(model_path: Path, cache_dir: Path) -> Dict[str, object] | None:
+	manifest = _read_manifest_file(manifest_path(model_path, cache_dir))
+	if manifest is None or manifest.get('format_version') != CACHE_FORMAT_VERSION:
+		return None
+	if manifest.get('blob') != blob_name(str(manifest.get('source_sha256'))):
+		return None
+
+	stat = model_path.stat()
+	if manifest.get('source_size') == stat.st_size and manifest.get('source_mtime_ns') == stat.st_mtime_ns:
+		return manifest
+	# Touched but possibly identical (e.g. fresh checkout): only the hash decides.
+	if manifest.get('source_sha256') == file_sha256(model_path):
+		return manifest
+	return None
+
+
+def load_cached(model_path: Path, cache_dir: Path) -> Tuple[Dict, LayerWeights] | None:
+	"""Return config and memory-mapped weights, or ``None`` if the cache is stale."""
+
+	manifest = _read_manifest(Path(model_path), Path(cache_dir))
+	if manifest is None:
+		return None
+	try:
+		# The blob the manifest names, not whatever another writer put there since.
+		blob = np.load(Path(cache_dir) / manifest['blob'], mmap_mode='r')
+	except (OSError, ValueError):
+		return None
+	layer_weights: LayerWeights = {}
+	for name, entries in manifest['layers'].items():
+		arrays = []
+		for entry in entries:
+			dtype = np.dtype(entry['dtype'])
+			count = int(np.prod(entry['shape'], dtype=np.int64))
+			start = int(entry['offset'])
+			arrays.append(blob[start:start + count * dtype.itemsize].view(dtype).reshape(entry['shape']))
+		layer_weights[name] = arrays
+	return manifest['config'], layer_weights
+
+
+def load_weights_and_config(model_path: Path, cache_dir: Path | None) -> Tuple[Dict, LayerWeights]:
+	"""Fast path through the artifact cache, falling back to the Keras archive.
+
+	A stale or missing cache is rebuilt after the fallback so the next process
+	starts from the fast path again.
+	"""
+
+	if cache_dir is None:
+		return read_keras_archive(model_path)
+
+	cached = load_cached(model_path, cache_dir)
+	if cached is not None:
+		logger.debug('Modelo carregado do cache pré-compilado em %s', cache_dir)
+		return cached
+
+	logger.info('Cache do modelo ausente ou desatualizado; reconstruindo a partir de %s', model_path.name)
+	try:
+		convert_archive(model_path, cache_dir)
+	except OSError as exc:
+		logger.warning('Não foi possível gravar o cache do modelo em %s: %s', cache_dir, exc)
+		return read_keras_archive(model_path)
+	cached = load_cached(model_path, cache_dir)
+	return cached if cached is not None else read_keras_archive(model_path)
@@ -0,0 +1,120 @@
+"""Active-model holder with background loading and atomic hot swap.
+
+Every process that runs inference keeps the model it is serving in a
+``ModelRegistry``. At most every ``refresh_interval`` seconds, an access
+checks (in a background thread) which version is active in the
+``ModelVersion`` table. When it changed, the new artifacts are loaded and
+warmed up in that thread while requests keep using the old model; the
+reference is then replaced in one assignment. Callers that take a single
+``ActiveModel`` snapshot therefore always see a consistent backend, label set
+version and feature spec, and a deploy never stalls requests on a cold start.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+from .feature_spec import MEL_SPEC, FeatureSpec
+from .inference_backends import InferenceBackend
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+	"""Where a model version's artifacts live and what they should contain."""
+
+	version: str
+	model_path: Path
+	encoder_path: Path
+	sha256: str = ''
+	labels: Sequence[str] | None = None
+
+
+@dataclass(frozen=True)
+class ActiveModel:
+	"""A loaded model version: backend, output labels, version name and input features."""
+
+	version: str
+	backend: InferenceBackend
+	labels: np.ndarray
+	features: FeatureSpec = MEL_SPEC
+
+
+class ModelRegistry:
+	"""Serve one ``ActiveModel`` at a time and swap it when the active version changes."""
+
+	def __init__(
+		self,
+		resolve_active: Callable[[], ModelSpec],
+		load: Callable[[ModelSpec], ActiveModel],
+		*,
+		refresh_interval: float = 30.0,
+		on_refresh_done: Callable[[], None] | None = None,
+	) -> None:
+		self._resolve_active = resolve_active
+		self._load = load
+		self.refresh_interval = refresh_interval
+		self._on_refresh_done = on_refresh_done
+		self._current: ActiveModel | None = None
+		self._load_lock = threading.Lock()
+		self._refreshing = threading.Lock()
+		self._last_check = 0.0
+		self.swaps = 0
+
+	def current(self) -> ActiveModel:
+		"""The model to use now; loads synchronously only on the very first call."""
+
+		active = self._current
+		if active is None:
+			with self._load_lock:
+				if self._current is None:
+					self._current = self._load(self._resolve_active())
+					self._last_check = time.monotonic()
+			return self._current
+		if self.refresh_interval and time.monotonic() - self._last_check >= self.refresh_interval:
+			self._refresh_in_background()
+		return active
+
+	def _refresh_in_background(self) -> None:
+		if not self._refreshing.acquire(blocking=False):
+			return
+		self._last_check = time.monotonic()
+		threading.Thread(target=self._refresh_and_release, name='model-registry-refresh', daemon=True).start()
+
+	def _refresh_and_release(self) -> None:
+		try:
+			self.refresh()
+		except Exception:
+			logger.exception('Falha ao verificar/carregar a versão ativa do modelo; mantendo a atual.')
+		finally:
+			if self._on_refresh_done is not None:
+				self._on_refresh_done()
+			self._refreshing.release()
+
+	def refresh(self) -> bool:
+		"""Load and swap in the active version if it differs; ``True`` when swapped."""
+
+		spec = self._resolve_active()
+		self._last_check = time.monotonic()
+		current = self._current
+		if current is not None and current.version == spec.version:
+			return False
+		# Load outside the lock: requests keep being served by the old model.
+		loaded = self._load(spec)
+		with self._load_lock:
+			previous, self._current = self._current, loaded
+			self.swaps += 1
+		logger.info(
+			'Modelo de emoções trocado: %s -> %s.',
+			previous.version if previous else '-',
+			loaded.version,
+		)
+		return True
@@ -0,0 +1,269 @@
+"""Out-of-process model server reached over a local Unix socket.
+
+A single long-lived process owns TensorFlow and the model; request workers use
+``ModelServerClient`` and only ever touch NumPy. Messages are framed as a
+4-byte big-endian header length, a JSON header and an optional raw payload::
+
+	request:  {"op": "predict", "shape": [40, 174, 1], "dtype": "float32"} + bytes
+	response: {"ok": true, "shape": [8], "dtype": "float32"} + bytes
+
+Concurrent predictions from every connected client go through one
+``MicroBatcher``, so the server also batches across worker processes.
+Each request is pinned to the model snapshot current when it arrives, and its
+response carries the version of that snapshot, so clients notice a hot swap
+and refresh their cached label set.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from .batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+_HEADER_LENGTH = struct.Struct('>I')
+
+
+class ModelServerError(Exception):
+	"""Raised by the client when the server is unreachable or reports an error."""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+	chunks = bytearray()
+	while len(chunks) < size:
+		chunk = sock.recv(size - len(chunks))
+		if not chunk:
+			raise ConnectionError('Conexão encerrada pelo outro lado.')
+		chunks.extend(chunk)
+	return bytes(chunks)
+
+
+def send_message(sock: socket.socket, header: Dict[str, object], payload: bytes = b'') -> None:
+	encoded = json.dumps(header).encode('utf-8')
+	sock.sendall(_HEADER_LENGTH.pack(len(encoded)) + encoded + payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, object], bytes]:
+	(header_length,) = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+	header = json.loads(_recv_exact(sock, header_length))
+	payload = _recv_exact(sock, int(header.get('nbytes', 0)))
+	return header, payload
+
+
+def _array_header(array: np.ndarray, **extra: object) -> Dict[str, object]:
+	return {'shape': list(array.shape), 'dtype': str(array.dtype), 'nbytes': array.nbytes, **extra}
+
+
+def _array_from(header: Dict[str, object], payload: bytes) -> np.ndarray:
+	return np.frombuffer(payload, dtype=np.dtype(str(header['dtype']))).reshape(header['shape'])
+
+
+def socket_in_use(socket_path: str) -> bool:
+	"""Whether a server still answers on ``socket_path`` (a leftover file from a dead one does not)."""
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+		sock.settimeout(1.0)
+		try:
+			sock.connect(socket_path)
+		except (FileNotFoundError, ConnectionRefusedError):
+			return False
+		except OSError:
+			# Not connectable for another reason (e.g. not a socket): do not touch it.
+			return os.path.exists(socket_path)
+	return True
+
+
+class _Handler(socketserver.BaseRequestHandler):
+	"""Serve requests on one persistent client connection until it closes."""
+
+	def handle(self) -> None:
+		server: ModelServer = self.server  # type: ignore[assignment]
+		while True:
+			try:
+				header, payload = recv_message(self.request)
+			except (ConnectionError, OSError):
+				return
+			try:
+				response, body = server.dispatch(header, payload)
+			except Exception as exc:  # pragma: no cover - model dependent
+				logger.exception('Erro no servidor de modelo.')
+				response, body = {'ok': False, 'error': f'{exc.__class__.__name__}: {exc}'}, b''
+			send_message(self.request, response, body)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	"""Threaded Unix-socket server wrapping a batched ``predict_fn``."""
+
+	daemon_threads = True
+
+	def __init__(
+		self,
+		socket_path: str,
+		predict_fn: Callable[[np.ndarray, object], np.ndarray],
+		model_info: Callable[[object], Dict[str, object]],
+		*,
+		snapshot: Callable[[], object] = lambda: None,
+		max_batch_size: int = 16,
+		max_latency_ms: float = 10.0,
+	) -> None:
+		if os.path.exists(socket_path):
+			if socket_in_use(socket_path):
+				raise ModelServerError(f'Já existe um servidor de modelo ouvindo em {socket_path}.')
+			# Left behind by a server that did not shut down cleanly.
+			os.unlink(socket_path)
+		self.socket_path = socket_path
+		# snapshot() pins the model for one request; model_info(snapshot) returns
+		# {'version': ..., 'labels': [...]} for it, and predict_fn runs it.
+		self.snapshot = snapshot
+		self.model_info = model_info
+		self.batcher = MicroBatcher(
+			predict_fn,
+			max_batch_size=max_batch_size,
+			max_latency_ms=max_latency_ms,
+			name='model-server-batcher',
+		)
+		super().__init__(socket_path, _Handler)
+		os.chmod(socket_path, 0o660)
+
+	def dispatch(self, header: Dict[str, object], payload: bytes) -> Tuple[Dict[str, object], bytes]:
+		op = header.get('op')
+		if op == 'predict':
+			model = self.snapshot()
+			features = _array_from(header, payload)
+			output = np.ascontiguousarray(self.batcher.predict(features, model=model), dtype=np.float32)
+			return _array_header(output, ok=True, version=self.model_info(model)['version']), output.tobytes()
+		if op == 'predict_batch':
+			# Rows go through the shared batcher individually, so they can be
+			# fused with concurrent requests from other clients.
+			model = self.snapshot()
+			batch = _array_from(header, payload)
+			futures = [self.batcher.submit(row, model) for row in batch]
+			output = np.ascontiguousarray([future.result() for future in futures], dtype=np.float32)
+			return _array_header(output, ok=True, version=self.model_info(model)['version']), output.tobytes()
+		if op == 'labels':
+			return {'ok': True, **self.model_info(self.snapshot())}, b''
+		if op == 'stats':
+			return {'ok': True, 'stats': self.batcher.stats()}, b''
+		if op == 'ping':
+			return {'ok': True}, b''
+		return {'ok': False, 'error': f'Operação desconhecida: {op}'}, b''
+
+	def server_close(self) -> None:
+		super().server_close()
+		self.batcher.close()
+		if os.path.exists(self.socket_path):
+			os.unlink(self.socket_path)
+
+
+class ModelServerClient:
+	"""Thread-safe client; keeps one persistent connection per thread."""
+
+	def __init__(self, socket_path: str, timeout: float = 30.0) -> None:
+		self.socket_path = socket_path
+		self.timeout = timeout
+		self._local = threading.local()
+		self._labels: List[str] | None = None
+		self._version: str | None = None
+		self._feature_spec: Dict[str, object] | None = None
+
+	def _connection(self) -> socket.socket:
+		sock = getattr(self._local, 'sock', None)
+		if sock is None:
+			sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			sock.settimeout(self.timeout)
+			try:
+				sock.connect(self.socket_path)
+			except OSError as exc:
+				sock.close()
+				raise ModelServerError(
+					f'Servidor de modelo indisponível em {self.socket_path}: {exc}'
+				) from exc
+			self._local.sock = sock
+		return sock
+
+	def _discard_connection(self) -> None:
+		sock = getattr(self._local, 'sock', None)
+		if sock is not None:
+			sock.close()
+			self._local.sock = None
+
+	def _call(self, header: Dict[str, object], payload: bytes = b'') -> Tuple[Dict[str, object], bytes]:
+		# One retry covers a server restart between two requests.
+		for attempt in range(2):
+			sock = self._connection()
+			try:
+				send_message(sock, header, payload)
+				response, body = recv_message(sock)
+				break
+			except (ConnectionError, OSError) as exc:
+				self._discard_connection()
+				if attempt:
+					raise ModelServerError(f'Falha na comunicação com o servidor de modelo: {exc}') from exc
+		if not response.get('ok'):
+			raise ModelServerError(str(response.get('error', 'Erro desconhecido no servidor de modelo.')))
+		return response, body
+
+	def predict(self, features: np.ndarray) -> np.ndarray:
+		"""Return the model output for one sample (no batch axis)."""
+
+		features = np.ascontiguousarray(features, dtype=np.float32)
+		response, body = self._call(_array_header(features, op='predict'), features.tobytes())
+		self._track_version(response)
+		return _array_from(response, body)
+
+	def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+		"""Return the model outputs for a ``(n, ...)`` batch of samples."""
+
+		batch = np.ascontiguousarray(batch, dtype=np.float32)
+		response, body = self._call(_array_header(batch, op='predict_batch'), batch.tobytes())
+		self._track_version(response)
+		return _array_from(response, body)
+
+	def _track_version(self, response: Dict[str, object]) -> None:
+		# A different version means the server swapped models: drop cached labels.
+		if response.get('version') != self._version:
+			self._labels = None
+
+	def _fetch_model_info(self) -> None:
+		response, _ = self._call({'op': 'labels'})
+		self._labels = list(response['labels'])
+		self._version = response.get('version')
+		self._feature_spec = response.get('feature_spec')
+
+	def labels(self) -> List[str]:
+		if self._labels is None:
+			self._fetch_model_info()
+		return self._labels
+
+	def model_version(self) -> str:
+		if self._labels is None:
+			self._fetch_model_info()
+		return str(self._version)
+
+	def feature_spec(self) -> Dict[str, object]:
+		"""``FeatureSpec.to_dict()`` of the served model (empty for older servers)."""
+
+		if self._labels is None:
+			self._fetch_model_info()
+		return dict(self._feature_spec or {})
+
+	def stats(self) -> Dict[str, object]:
+		response, _ = self._call({'op': 'stats'})
+		return dict(response['stats'])
+
+	def ping(self) -> bool:
+		try:
+			self._call({'op': 'ping'})
+		except ModelServerError:
+			return False
+		return True
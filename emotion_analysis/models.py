@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
@@ -37,6 +37,8 @@ class EmotionAnalysis(models.Model):
     dominant_emotion = models.CharField(max_length=20, choices=EMOTION_CHOICES, verbose_name='Emoção Dominante')
     confidence = models.FloatField(help_text='Confiança da análise (0-1)', verbose_name='Confiança')
     emotions_data = models.JSONField(help_text='Dados detalhados de todas as emoções detectadas', verbose_name='Dados das Emoções')
+    timeline = models.JSONField(default=list, blank=True, help_text='Emoções por janela de tempo ao longo do desabafo', verbose_name='Linha do Tempo')
+    model_version = models.CharField(max_length=64, blank=True, db_index=True, help_text='Versão do modelo que gerou a análise', verbose_name='Versão do Modelo')
     notes = models.TextField(blank=True, verbose_name='Observações')
     analyzed_at = models.DateTimeField(auto_now_add=True, verbose_name='Analisado em')
 
@@ -55,6 +57,76 @@ class EmotionAnalysis(models.Model):
         return round(self.confidence * 100, 2)
 
 
+class AnalysisJob(models.Model):
+    """Fila persistente de análises de emoção processadas pelos workers"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'), ('running', 'Em Processamento'),
+        ('done', 'Concluída'), ('failed', 'Falhou'),
+    ]
+    recording = models.ForeignKey(AudioRecording, on_delete=models.CASCADE, related_name='analysis_jobs', verbose_name='Desabafo')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Status')
+    attempts = models.IntegerField(default=0, verbose_name='Tentativas')
+    max_attempts = models.IntegerField(default=3, verbose_name='Máximo de Tentativas')
+    worker = models.CharField(max_length=100, blank=True, help_text='Identificador do worker que processou a tarefa')
+    error = models.TextField(blank=True, verbose_name='Erro')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciada em')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finalizada em')
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        constraints = [
+            # Vários workers varrem desabafos ao mesmo tempo: no máximo uma tarefa ativa por desabafo.
+            models.UniqueConstraint(
+                fields=['recording'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_analysis_job',
+            ),
+        ]
+        verbose_name = 'Tarefa de Análise'
+        verbose_name_plural = 'Tarefas de Análise'
+
+    def __str__(self):
+        return f"Tarefa #{self.pk} - {self.recording.title} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class ModelVersion(models.Model):
+    """Versões registradas do modelo de emoções; apenas uma fica ativa por vez"""
+    version = models.CharField(max_length=64, unique=True, verbose_name='Versão')
+    model_path = models.CharField(max_length=500, help_text='Arquivo .keras (relativo ao projeto ou absoluto)', verbose_name='Modelo')
+    encoder_path = models.CharField(max_length=500, help_text='LabelEncoder .joblib (relativo ao projeto ou absoluto)', verbose_name='Codificador de Rótulos')
+    sha256 = models.CharField(max_length=64, verbose_name='SHA-256 do Modelo')
+    labels = models.JSONField(help_text='Rótulos na ordem das saídas do modelo', verbose_name='Rótulos')
+    is_active = models.BooleanField(default=False, db_index=True, verbose_name='Ativa')
+    notes = models.TextField(blank=True, verbose_name='Observações')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Registrada em')
+    activated_at = models.DateTimeField(null=True, blank=True, verbose_name='Ativada em')
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['is_active'], condition=models.Q(is_active=True), name='unique_active_model_version'),
+        ]
+        verbose_name = 'Versão do Modelo'
+        verbose_name_plural = 'Versões do Modelo'
+
+    def __str__(self):
+        return f"{self.version}{' (ativa)' if self.is_active else ''}"
+
+    def activate(self):
+        """Torna esta a única versão ativa; os processos trocam de modelo na próxima verificação."""
+        with transaction.atomic():
+            ModelVersion.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+            self.is_active = True
+            self.activated_at = timezone.now()
+            self.save(update_fields=['is_active', 'activated_at'])
+
+
 class UserProfile(models.Model):
     """Perfil estendido do usuário"""
     USER_TYPE_CHOICES = [('patient', 'Paciente'), ('professional', 'Profissional')]
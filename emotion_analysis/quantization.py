@@ -0,0 +1,152 @@
+"""Post-training quantized model variants and their accuracy gate.
+
+``quantize_model`` converts ``modelo_emocoes.keras`` into float16 and
+dynamic-range int8 TFLite variants, evaluates each one against the float32
+Keras model on a labelled held-out set and records the outcome in
+``quantization_report.json`` next to the model. A variant is only served
+(``EMOTION_MODEL_VARIANT``) when that report accepted the exact file on disk.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .inference_backends import InferenceBackend, TFLiteBackend
+from .model_artifacts import file_sha256
+
+REPORT_NAME = 'quantization_report.json'
+
+# RAVDESS filename emotion codes (third dash-separated field), as in training.
+RAVDESS_EMOTION_CODES = {
+	'01': 'neutro',
+	'02': 'calmo',
+	'03': 'feliz',
+	'04': 'triste',
+	'05': 'raivoso',
+	'06': 'medroso',
+	'07': 'desgosto',
+	'08': 'surpreso',
+}
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.webm', '.m4a')
+
+
+def report_path(keras_path: Path) -> Path:
+	return Path(keras_path).with_name(REPORT_NAME)
+
+
+def holdout_label(path: Path, known_labels: Iterable[str]) -> str | None:
+	"""Label from ``<holdout>/<raw_label>/file`` or from a RAVDESS filename."""
+
+	known = set(known_labels)
+	if path.parent.name in known:
+		return path.parent.name
+	parts = path.stem.split('-')
+	if len(parts) >= 3:
+		label = RAVDESS_EMOTION_CODES.get(parts[2][:2])
+		if label in known:
+			return label
+	return None
+
+
+def list_holdout(holdout_dir: Path, known_labels: Sequence[str]) -> Tuple[List[Path], List[str]]:
+	paths: List[Path] = []
+	labels: List[str] = []
+	for path in sorted(Path(holdout_dir).rglob('*')):
+		if path.suffix.lower() not in AUDIO_EXTENSIONS:
+			continue
+		label = holdout_label(path, known_labels)
+		if label is not None:
+			paths.append(path)
+			labels.append(label)
+	return paths, labels
+
+
+def evaluate_backend(
+	backend: InferenceBackend,
+	features: np.ndarray,
+	labels: Sequence[str],
+	class_labels: Sequence[str],
+) -> Dict[str, object]:
+	"""Accuracy (overall and per raw class) and single-sample latency of a backend."""
+
+	latencies = []
+	predictions = []
+	for sample in features:
+		started = time.perf_counter()
+		probs = backend.predict(sample[np.newaxis])[0]
+		latencies.append(time.perf_counter() - started)
+		predictions.append(class_labels[int(np.argmax(probs))])
+
+	truth = np.asarray(labels)
+	predicted = np.asarray(predictions)
+	per_class = {}
+	for label in class_labels:
+		mask = truth == label
+		if mask.any():
+			per_class[str(label)] = float(np.mean(predicted[mask] == label))
+
+	latencies_ms = 1000 * np.asarray(latencies)
+	return {
+		'size_bytes': backend.model_path.stat().st_size,
+		'accuracy': float(np.mean(predicted == truth)) if truth.size else 0.0,
+		'per_class_accuracy': per_class,
+		'latency_ms_p50': float(np.percentile(latencies_ms, 50)),
+		'latency_ms_p95': float(np.percentile(latencies_ms, 95)),
+	}
+
+
+def gate_variant(
+	reference: Dict[str, object],
+	candidate: Dict[str, object],
+	max_drop: float,
+	max_class_drop: float,
+) -> Tuple[bool, str, Dict[str, float]]:
+	"""Compare a variant's evaluation with the float32 reference."""
+
+	class_drops = {
+		label: accuracy - candidate['per_class_accuracy'].get(label, 0.0)
+		for label, accuracy in reference['per_class_accuracy'].items()
+	}
+	overall_drop = reference['accuracy'] - candidate['accuracy']
+	worst_label = max(class_drops, key=class_drops.get) if class_drops else None
+
+	if overall_drop > max_drop:
+		return False, f'queda de acurácia {overall_drop:.3f} > {max_drop:.3f}', class_drops
+	if worst_label is not None and class_drops[worst_label] > max_class_drop:
+		return False, (
+			f'queda na classe {worst_label} {class_drops[worst_label]:.3f} > {max_class_drop:.3f}'
+		), class_drops
+	return True, 'aprovado', class_drops
+
+
+def write_report(keras_path: Path, report: Dict[str, object]) -> Path:
+	path = report_path(keras_path)
+	path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+	return path
+
+
+def is_variant_accepted(keras_path: Path, variant: str) -> Tuple[bool, str]:
+	"""Whether ``variant`` passed the accuracy gate for the file currently on disk."""
+
+	path = report_path(keras_path)
+	variant_file = TFLiteBackend.artifact_path(keras_path, variant)
+	if not path.exists():
+		return False, 'relatório de quantização ausente'
+	report = json.loads(path.read_text(encoding='utf-8'))
+	# After a retrain or export the .keras changes under an old report and its variants.
+	if report.get('source_sha256') != file_sha256(keras_path):
+		return False, 'variante gerada a partir de outro arquivo .keras; rode quantize_model de novo'
+	entry = report.get('variants', {}).get(variant)
+	if not entry:
+		return False, f'variante {variant} não avaliada'
+	if not entry.get('accepted'):
+		return False, entry.get('reason', 'reprovada na avaliação')
+	if not variant_file.exists() or entry.get('sha256') != file_sha256(variant_file):
+		return False, 'arquivo da variante difere do avaliado'
+	return True, 'aprovado'
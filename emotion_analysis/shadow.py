@@ -0,0 +1,243 @@
+"""Shadow inference: score live traffic with a candidate model off the request path.
+
+When ``EMOTION_SHADOW_MODEL_VERSION`` names a registered ``ModelVersion``,
+every analysis hands the feature tensor it already extracted, plus the active
+model's output and latency, to a ``ShadowRunner``. A background thread runs the
+candidate's forward pass on those same features (so it must use the active
+model's feature spec) and compares the two canonical distributions. Shadowing therefore costs one extra ``predict`` and never
+delays the response: the queue is bounded and samples are dropped (and
+counted) when the candidate falls behind. If the candidate cannot be loaded,
+the failure is logged once and samples are skipped (counted as
+``unavailable``) until the next attempt, ``retry_seconds`` later. A candidate
+whose feature spec differs from the active model's is reported once (per
+input shape) and skipped the same way.
+
+Agreement on the dominant emotion, per-emotion probability deltas
+(candidate - active) and latency percentiles for both models are logged every
+``log_every`` samples and available from ``ShadowRunner.stats``.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict
+
+import numpy as np
+
+from .model_registry import ActiveModel
+
+logger = logging.getLogger(__name__)
+
+Summarise = Callable[[np.ndarray, np.ndarray], Dict[str, object]]
+
+
+@dataclass
+class _Sample:
+	features: np.ndarray
+	primary: np.ndarray
+	primary_labels: np.ndarray
+	primary_version: str
+	primary_latency: float
+
+
+@dataclass
+class ShadowStats:
+	"""Running comparison between the active model and the shadow candidate."""
+
+	samples: int = 0
+	agreements: int = 0
+	dropped: int = 0
+	errors: int = 0
+	unavailable: int = 0
+	delta_sum: Dict[str, float] = field(default_factory=dict)
+	abs_delta_sum: Dict[str, float] = field(default_factory=dict)
+	primary_latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+	shadow_latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+	@staticmethod
+	def _percentiles(latencies: Deque[float]) -> Dict[str, float]:
+		if not latencies:
+			return {'p50_ms': 0.0, 'p95_ms': 0.0}
+		values = 1000 * np.asarray(latencies)
+		return {'p50_ms': float(np.percentile(values, 50)), 'p95_ms': float(np.percentile(values, 95))}
+
+	def as_dict(self) -> Dict[str, object]:
+		samples = max(self.samples, 1)
+		return {
+			'samples': self.samples,
+			'agreement': self.agreements / samples if self.samples else None,
+			'dropped': self.dropped,
+			'errors': self.errors,
+			'unavailable': self.unavailable,
+			'mean_delta': {emotion: total / samples for emotion, total in self.delta_sum.items()},
+			'mean_abs_delta': {emotion: total / samples for emotion, total in self.abs_delta_sum.items()},
+			'primary_latency': self._percentiles(self.primary_latencies),
+			'shadow_latency': self._percentiles(self.shadow_latencies),
+		}
+
+
+class ShadowRunner:
+	"""Background comparison of a candidate model against the active one."""
+
+	def __init__(
+		self,
+		load_candidate: Callable[[], ActiveModel],
+		summarise: Summarise,
+		*,
+		sample_rate: float = 1.0,
+		queue_size: int = 64,
+		log_every: int = 100,
+		retry_seconds: float = 60.0,
+	) -> None:
+		self._load_candidate = load_candidate
+		self._summarise = summarise
+		self.sample_rate = sample_rate
+		self.log_every = max(1, log_every)
+		self.retry_seconds = retry_seconds
+		self._queue: queue.Queue[_Sample] = queue.Queue(maxsize=queue_size)
+		self._stats = ShadowStats()
+		self._stats_lock = threading.Lock()
+		self._candidate: ActiveModel | None = None
+		self.candidate_version: str | None = None
+		self._retry_at: float | None = None
+		self._incompatible_shapes: set = set()
+		self._thread = threading.Thread(target=self._run, name='emotion-shadow', daemon=True)
+		self._thread.start()
+
+	def submit(
+		self,
+		features: np.ndarray,
+		primary: np.ndarray,
+		primary_labels: np.ndarray,
+		primary_version: str,
+		primary_latency: float,
+	) -> bool:
+		"""Queue a prediction for shadow scoring; never blocks the caller."""
+
+		if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+			return False
+		try:
+			self._queue.put_nowait(_Sample(features, primary, primary_labels, primary_version, primary_latency))
+		except queue.Full:
+			with self._stats_lock:
+				self._stats.dropped += 1
+			return False
+		return True
+
+	def _run(self) -> None:
+		while True:
+			sample = self._queue.get()
+			try:
+				self._score(sample)
+			except Exception:
+				logger.exception('Falha na inferência sombra.')
+				with self._stats_lock:
+					self._stats.errors += 1
+			finally:
+				self._queue.task_done()
+
+	def _ensure_candidate(self) -> bool:
+		"""Load the candidate if needed; after a failure, wait ``retry_seconds`` before trying again."""
+
+		if self._candidate is not None:
+			return True
+		now = time.monotonic()
+		if self._retry_at is not None and now < self._retry_at:
+			return False
+		try:
+			# Loaded lazily, in this thread, so the request path never pays for it.
+			candidate = self._load_candidate()
+		except Exception:
+			if self._retry_at is None:
+				logger.exception('Falha ao carregar o modelo sombra; nova tentativa a cada %.0f s.', self.retry_seconds)
+			else:
+				logger.debug('Modelo sombra ainda indisponível.', exc_info=True)
+			self._retry_at = now + self.retry_seconds
+			return False
+		self._candidate = candidate
+		self.candidate_version = candidate.version
+		self._retry_at = None
+		logger.info('Modelo sombra %s carregado.', candidate.version)
+		return True
+
+	def _accepts(self, shape: tuple) -> bool:
+		"""Whether the candidate can score features of ``shape``; a mismatch is logged once per shape."""
+
+		if shape == self._candidate.features.input_shape:
+			return True
+		if shape not in self._incompatible_shapes:
+			# Only the active model's features are available here.
+			self._incompatible_shapes.add(shape)
+			logger.error(
+				'O modelo sombra %s espera features %s %s e o modelo ativo produz %s; amostras ignoradas.',
+				self._candidate.version, self._candidate.features.kind,
+				self._candidate.features.input_shape, shape,
+			)
+		return False
+
+	def _score(self, sample: _Sample) -> None:
+		if not self._ensure_candidate() or not self._accepts(sample.features.shape[1:]):
+			with self._stats_lock:
+				self._stats.unavailable += 1
+			return
+
+		started = time.perf_counter()
+		shadow = self._candidate.backend.predict(sample.features)
+		shadow_latency = time.perf_counter() - started
+
+		comparisons = [
+			(self._summarise(sample.primary_labels, primary_row), self._summarise(self._candidate.labels, shadow_row))
+			for primary_row, shadow_row in zip(sample.primary, shadow)
+		]
+		with self._stats_lock:
+			stats = self._stats
+			for primary_result, shadow_result in comparisons:
+				stats.samples += 1
+				stats.agreements += primary_result['dominant_emotion'] == shadow_result['dominant_emotion']
+				for emotion, probability in primary_result['emotions_data'].items():
+					delta = shadow_result['emotions_data'].get(emotion, 0.0) - probability
+					stats.delta_sum[emotion] = stats.delta_sum.get(emotion, 0.0) + delta
+					stats.abs_delta_sum[emotion] = stats.abs_delta_sum.get(emotion, 0.0) + abs(delta)
+			stats.primary_latencies.append(sample.primary_latency)
+			stats.shadow_latencies.append(shadow_latency)
+			should_log = stats.samples // self.log_every != (stats.samples - len(comparisons)) // self.log_every
+
+		logger.debug(
+			'Sombra %s vs %s: %s/%s em %.1f/%.1f ms.',
+			self._candidate.version, sample.primary_version,
+			comparisons[0][1]['dominant_emotion'], comparisons[0][0]['dominant_emotion'],
+			1000 * shadow_latency, 1000 * sample.primary_latency,
+		)
+		if should_log:
+			self.log_summary(sample.primary_version)
+
+	def stats(self) -> Dict[str, object]:
+		with self._stats_lock:
+			summary = self._stats.as_dict()
+		summary['candidate_version'] = self.candidate_version
+		return summary
+
+	def log_summary(self, primary_version: str = '') -> None:
+		summary = self.stats()
+		deltas = ', '.join(f'{emotion} {delta:+.3f}' for emotion, delta in summary['mean_delta'].items())
+		logger.info(
+			'Sombra %s vs %s: %d amostras, concordância %.1f%%, latência p50 %.1f ms (ativo %.1f ms), '
+			'descartadas %d; deltas médios: %s',
+			summary['candidate_version'], primary_version or '-', summary['samples'],
+			100 * (summary['agreement'] or 0.0),
+			summary['shadow_latency']['p50_ms'], summary['primary_latency']['p50_ms'],
+			summary['dropped'], deltas,
+		)
+
+	def join(self, timeout: float = 5.0) -> None:
+		"""Wait until every queued sample was scored (used by tools and tests)."""
+
+		deadline = time.monotonic() + timeout
+		while self._queue.unfinished_tasks and time.monotonic() < deadline:
+			time.sleep(0.01)
@@ -0,0 +1,103 @@
+"""FFmpeg decodes must not hang on damaged files that log a lot to stderr."""
+
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from emotion_analysis import audio_decoding, ffmpeg_pool
+from emotion_analysis.audio_decoding import AudioDecodingError, decode_audio
+
+SAMPLE_RATE = 22050
+
+
+def make_noisy_damaged_m4a(directory: Path) -> Path:
+	"""Five minutes of AAC with scrambled frames: FFmpeg logs far more than a pipe buffer (64 KB) to stderr."""
+
+	import imageio_ffmpeg
+
+	clean = directory / 'clean.m4a'
+	subprocess.run(
+		[
+			imageio_ffmpeg.get_ffmpeg_exe(), '-hide_banner', '-loglevel', 'error', '-y',
+			'-f', 'lavfi', '-i', 'sine=frequency=220:duration=300',
+			'-ar', '8000', '-c:a', 'aac', '-b:a', '16k', '-movflags', '+faststart', clean.as_posix(),
+		],
+		check=True,
+	)
+	data = bytearray(clean.read_bytes())
+	rng = np.random.default_rng(0)
+	for offset in range(data.find(b'mdat') + 8, len(data), 32):
+		data[offset:offset + 8] = rng.integers(0, 256, 8, dtype=np.uint8).tobytes()
+	damaged = directory / 'damaged.m4a'
+	damaged.write_bytes(bytes(data))
+	return damaged
+
+
+class DamagedFileTests(SimpleTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls._tmp = tempfile.TemporaryDirectory()
+		cls.damaged = make_noisy_damaged_m4a(Path(cls._tmp.name))
+
+	@classmethod
+	def tearDownClass(cls):
+		cls._tmp.cleanup()
+		super().tearDownClass()
+
+	def test_full_decode_of_noisy_file_finishes(self):
+		# No sample limit, as in timeline mode and reanalyze_recordings. Before
+		# stderr was drained concurrently this hung until the timeout.
+		started = time.monotonic()
+		with self.assertRaises(AudioDecodingError) as raised:
+			decode_audio(self.damaged, SAMPLE_RATE, ffmpeg_timeout=30)
+
+		self.assertLess(time.monotonic() - started, 20)
+		self.assertNotIn('excedeu', str(raised.exception))
+		self.assertIn('Invalid data', str(raised.exception))
+
+	def test_stderr_tail_is_bounded(self):
+		with subprocess.Popen(
+			['python', '-c', 'import sys; sys.stderr.write("x" * 200000 + "fim")'],
+			stderr=subprocess.PIPE,
+		) as process:
+			tail = audio_decoding.StderrTail(process.stderr)
+			process.wait()
+			message = tail.text()
+
+		self.assertLessEqual(len(message), audio_decoding._STDERR_TAIL_BYTES)
+		self.assertTrue(message.endswith('fim'))
+
+	def test_decode_is_killed_after_the_timeout(self):
+		sleeper = ['python', '-c', 'import time; time.sleep(30)']
+		original = audio_decoding.ffmpeg_command
+		audio_decoding.ffmpeg_command = lambda *args: sleeper
+		self.addCleanup(setattr, audio_decoding, 'ffmpeg_command', original)
+
+		with self.assertRaisesMessage(AudioDecodingError, 'excedeu'):
+			audio_decoding._decode_ffmpeg(self.damaged, SAMPLE_RATE, timeout=0.5)
+
+	def test_pool_decode_of_noisy_file_finishes(self):
+		pool = ffmpeg_pool.FFmpegDecoderPool(size=1, timeout=30)
+		self.addCleanup(pool.close)
+
+		# 'webm' streams the file into a warm process's stdin; 'm4a' spawns one on the path.
+		for container in ('webm', 'm4a'):
+			with self.subTest(container=container):
+				started = time.monotonic()
+				with self.assertRaisesMessage(AudioDecodingError, 'Invalid data'):
+					pool.decode(self.damaged, container, SAMPLE_RATE)
+				self.assertLess(time.monotonic() - started, 20)
+
+	def test_pool_decode_is_killed_after_the_timeout(self):
+		pool = ffmpeg_pool.FFmpegDecoderPool(size=0, timeout=0.5)
+		self.addCleanup(pool.close)
+		self.addCleanup(setattr, ffmpeg_pool, 'ffmpeg_command', ffmpeg_pool.ffmpeg_command)
+		ffmpeg_pool.ffmpeg_command = lambda *args: ['python', '-c', 'import time; time.sleep(30)']
+
+		with self.assertRaisesMessage(AudioDecodingError, 'excedeu'):
+			pool.decode(self.damaged, 'm4a', SAMPLE_RATE)
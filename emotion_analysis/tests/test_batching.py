@@ -0,0 +1,40 @@
+"""Every caller of ``MicroBatcher`` gets its own row, or an error."""
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from emotion_analysis import metrics
+from emotion_analysis.batching import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+	def make_batcher(self, predict_fn) -> MicroBatcher:
+		batcher = MicroBatcher(predict_fn, max_batch_size=4, max_latency_ms=50)
+		self.addCleanup(batcher.close)
+		return batcher
+
+	def test_rows_go_back_to_their_callers(self):
+		batcher = self.make_batcher(lambda batch, model: batch * 2)
+		futures = [batcher.submit(np.full(3, index, dtype=np.float32)) for index in range(3)]
+
+		for index, future in enumerate(futures):
+			np.testing.assert_array_equal(future.result(timeout=5), np.full(3, 2 * index))
+
+	def test_short_output_fails_every_request(self):
+		batcher = self.make_batcher(lambda batch, model: batch[:1])
+		with self.assertLogs('emotion_analysis.batching', 'ERROR'):
+			futures = [batcher.submit(np.zeros(3, dtype=np.float32)) for _ in range(3)]
+			for future in futures:
+				with self.assertRaises(RuntimeError):
+					future.result(timeout=5)
+
+	def test_batches_are_exported_to_metrics(self):
+		batcher = MicroBatcher(lambda batch, model: batch, max_batch_size=4, max_latency_ms=50, name='test-batcher')
+		self.addCleanup(batcher.close)
+		futures = [batcher.submit(np.zeros(3, dtype=np.float32)) for _ in range(3)]
+		for future in futures:
+			future.result(timeout=5)
+
+		text = metrics.render_prometheus()
+		self.assertIn('emotion_analysis_batch_size_sum{batcher="test-batcher"} 3.0', text)
+		self.assertIn('emotion_analysis_batch_slots_total{batcher="test-batcher"} 4.0', text)
@@ -0,0 +1,99 @@
+"""The feature extractors must reproduce the librosa features the models were trained on."""
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from emotion_analysis.features import MelSpectrogramExtractor, MfccStackExtractor
+
+SAMPLE_RATE = 22050
+PARAMS = {'n_mels': 40, 'hop_length': 512, 'n_fft': 2048}
+TARGET_FRAMES = 174
+TOLERANCE_DB = 1e-3
+MFCC_PARAMS = {'n_mels': 128, 'n_mfcc': 64, 'target_frames': 216}
+
+
+def voice_like(seconds: float, seed: int = 0) -> np.ndarray:
+	rng = np.random.default_rng(seed)
+	t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+	pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+	tone = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / SAMPLE_RATE) / k for k in range(1, 6))
+	return (0.2 * tone + 0.01 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def librosa_features(waveform: np.ndarray) -> np.ndarray:
+	"""The original training/serving path: melspectrogram, power_to_db(ref=max), pad/crop."""
+
+	import librosa
+
+	melspec_db = librosa.power_to_db(
+		librosa.feature.melspectrogram(y=waveform, sr=SAMPLE_RATE, **PARAMS),
+		ref=np.max,
+	)
+	output = np.zeros((PARAMS['n_mels'], TARGET_FRAMES), dtype=np.float32)
+	frames = min(TARGET_FRAMES, melspec_db.shape[1])
+	output[:, :frames] = melspec_db[:, :frames]
+	return output
+
+
+class MelSpectrogramParityTests(SimpleTestCase):
+	def setUp(self):
+		self.extractor = MelSpectrogramExtractor(sample_rate=SAMPLE_RATE, target_frames=TARGET_FRAMES, **PARAMS)
+
+	def assert_matches_librosa(self, waveform: np.ndarray) -> None:
+		# The extractor only looks at the model's input window; librosa gets the same samples.
+		expected = librosa_features(waveform[:self.extractor.samples_needed])
+		actual = self.extractor(waveform)
+
+		self.assertEqual(actual.shape, expected.shape)
+		np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCE_DB)
+
+	def test_matches_librosa_on_voice(self):
+		for seconds in (1, 4, 30):
+			with self.subTest(seconds=seconds):
+				self.assert_matches_librosa(voice_like(seconds))
+
+	def test_matches_librosa_on_noise(self):
+		waveform = 0.1 * np.random.default_rng(1).standard_normal(4 * SAMPLE_RATE).astype(np.float32)
+		self.assert_matches_librosa(waveform)
+
+	def test_matches_librosa_on_clip_shorter_than_window(self):
+		self.assert_matches_librosa(voice_like(0.5))
+
+
+def librosa_mfcc_stack(waveform: np.ndarray, dtype=np.float32) -> np.ndarray:
+	"""The original training features: mfcc, pad/trim, delta, delta-delta, per-clip standardisation."""
+
+	import librosa
+
+	mfcc = librosa.feature.mfcc(y=waveform, sr=SAMPLE_RATE, n_mfcc=MFCC_PARAMS['n_mfcc']).astype(dtype)
+	frames = MFCC_PARAMS['target_frames']
+	mfcc = np.pad(mfcc, ((0, 0), (0, max(0, frames - mfcc.shape[1]))))[:, :frames]
+	stacked = np.stack([mfcc, librosa.feature.delta(mfcc), librosa.feature.delta(mfcc, order=2)], axis=-1)
+	mean = np.mean(stacked, axis=(0, 1), keepdims=True)
+	std = np.std(stacked, axis=(0, 1), keepdims=True) + 1e-8
+	return (stacked - mean) / std
+
+
+class MfccStackParityTests(SimpleTestCase):
+	def setUp(self):
+		self.extractor = MfccStackExtractor(sample_rate=SAMPLE_RATE, **MFCC_PARAMS)
+
+	def test_matches_librosa_on_short_and_long_clips(self):
+		for seconds in (0.5, 1, 3, 5, 30):
+			with self.subTest(seconds=seconds):
+				waveform = voice_like(seconds)[:self.extractor.samples_needed]
+				actual = self.extractor(waveform)
+
+				self.assertEqual(actual.shape, (64, 216, 3))
+				# The extractor standardises with float64 statistics: against the
+				# same pipeline in float64 only float32 rounding remains.
+				np.testing.assert_allclose(actual, librosa_mfcc_stack(waveform, np.float64), rtol=0, atol=1e-4)
+				# The float32 training script rounds its own mean/std; on short,
+				# mostly zero-padded clips that reaches ~3e-3 (values span about ±35).
+				np.testing.assert_allclose(actual, librosa_mfcc_stack(waveform), rtol=0, atol=5e-3)
+
+	def test_matches_librosa_on_noise(self):
+		waveform = 0.1 * np.random.default_rng(1).standard_normal(5 * SAMPLE_RATE).astype(np.float32)
+		waveform = waveform[:self.extractor.samples_needed]
+
+		np.testing.assert_allclose(self.extractor(waveform), librosa_mfcc_stack(waveform, np.float64), rtol=0, atol=1e-4)
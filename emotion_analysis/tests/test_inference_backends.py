@@ -0,0 +1,85 @@
+"""The TFLite backend must agree with the model as Keras itself loads it."""
+
+import io
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from emotion_analysis.feature_spec import MEL_SPEC
+from emotion_analysis.inference_backends import KerasBackend, TFLiteBackend, convert_to_tflite
+from emotion_analysis.tests.test_model_artifacts import save_recurrent_model
+
+TOLERANCE = 1e-3
+
+
+def save_conv_model(directory: Path) -> Path:
+	"""Small model with the production layers, on the default mel-spectrogram input."""
+
+	import tensorflow as tf
+
+	tf.keras.utils.set_random_seed(0)
+	model = tf.keras.Sequential([
+		tf.keras.layers.Input(shape=MEL_SPEC.input_shape),
+		tf.keras.layers.Conv2D(8, (3, 3), activation='relu'),
+		tf.keras.layers.BatchNormalization(),
+		tf.keras.layers.MaxPooling2D((2, 2)),
+		tf.keras.layers.Conv2D(8, (3, 3), activation='relu'),
+		tf.keras.layers.MaxPooling2D((2, 2)),
+		tf.keras.layers.Flatten(),
+		tf.keras.layers.Dropout(0.3),
+		tf.keras.layers.Dense(8, activation='softmax'),
+	])
+	path = directory / 'modelo_emocoes.keras'
+	model.save(path)
+	return path
+
+
+def load_model_output(model_path: Path, batch: np.ndarray) -> np.ndarray:
+	import tensorflow as tf
+
+	return tf.keras.models.load_model(model_path)(batch, training=False).numpy()
+
+
+class TFLiteParityTests(SimpleTestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.directory = Path(tmp.name)
+
+	def test_converted_conv_model_matches_load_model(self):
+		model_path = save_conv_model(self.directory)
+		# Converted from the serving loader's model, as ``convert_model_tflite`` does.
+		output_path = convert_to_tflite(KerasBackend(model_path).model, self.directory / 'modelo_emocoes.tflite')
+
+		batch = np.random.default_rng(0).uniform(-80.0, 0.0, size=(4,) + MEL_SPEC.input_shape).astype(np.float32)
+		np.testing.assert_allclose(
+			TFLiteBackend(output_path).predict(batch), load_model_output(model_path, batch), atol=TOLERANCE,
+		)
+
+	def test_converted_recurrent_model_matches_load_model(self):
+		model_path = save_recurrent_model(self.directory)
+		output_path = convert_to_tflite(KerasBackend(model_path).model, self.directory / 'modelo_emocoes.tflite')
+
+		batch = np.random.default_rng(0).normal(size=(3, 6, 4)).astype(np.float32)
+		np.testing.assert_allclose(
+			TFLiteBackend(output_path).predict(batch), load_model_output(model_path, batch), atol=TOLERANCE,
+		)
+
+	def test_command_compares_with_the_converted_models_own_labels(self):
+		# Runs without a database or an active model: the labels come from the encoder next to --model.
+		import joblib
+		from sklearn.preprocessing import LabelEncoder
+
+		model_path = save_conv_model(self.directory)
+		encoder = LabelEncoder().fit(['neutro', 'calmo', 'feliz', 'triste', 'raivoso', 'medroso', 'desgosto', 'surpreso'])
+		joblib.dump(encoder, self.directory / 'label_encoder.joblib')
+		output_path = self.directory / 'modelo_emocoes.tflite'
+		stdout = io.StringIO()
+
+		call_command('convert_model_tflite', model=str(model_path), output=str(output_path), stdout=stdout)
+
+		self.assertTrue(output_path.exists())
+		self.assertIn('concordância 100.0%', stdout.getvalue())
@@ -0,0 +1,69 @@
+"""Snapshots of exited processes are folded into ``retired-<host>.json`` without changing the totals."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from emotion_analysis import metrics
+
+
+def slow_total(directory: Path | None) -> float:
+	for line in metrics.render_prometheus(directory).splitlines():
+		if line.startswith(f'{metrics.SLOW_ANALYSES.name} '):
+			return float(line.split()[-1])
+	return 0.0
+
+
+def write_snapshot(directory: Path, name: str, slow: float) -> Path:
+	path = directory / name
+	path.write_text(json.dumps({metrics.SLOW_ANALYSES.name: [[[], slow]]}), encoding='utf-8')
+	return path
+
+
+def exited_pid() -> int:
+	process = subprocess.Popen([sys.executable, '-c', ''])
+	process.wait()
+	return process.pid
+
+
+class RetiredSnapshotTests(SimpleTestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.directory = Path(tmp.name)
+		self.baseline = slow_total(None)
+
+	def test_exited_and_reused_pids_are_folded(self):
+		host = metrics.host_id()
+		retired = metrics.retired_snapshot_name(host)
+		dead = write_snapshot(self.directory, f'{host}-{exited_pid()}-1.json', 2)
+		# This pid is alive, but the older snapshot belongs to a process that had it before.
+		reused = write_snapshot(self.directory, f'{host}-{os.getpid()}-1.json', 3)
+		alive = write_snapshot(self.directory, f'{host}-{os.getpid()}-2.json', 5)
+
+		self.assertEqual(slow_total(self.directory), self.baseline + 10)
+		self.assertFalse(dead.exists())
+		self.assertFalse(reused.exists())
+		self.assertTrue(alive.exists())
+		self.assertTrue((self.directory / retired).exists())
+
+		write_snapshot(self.directory, f'{host}-{exited_pid()}-1.json', 1)
+		self.assertEqual(slow_total(self.directory), self.baseline + 11)
+		self.assertEqual(
+			sorted(path.name for path in self.directory.glob('*.json')),
+			sorted([alive.name, retired]),
+		)
+
+	def test_other_hosts_are_never_folded(self):
+		# Another container's pid means nothing here, even if no local process has it.
+		other = write_snapshot(self.directory, f'0123456789ab-{exited_pid()}-1.json', 4)
+
+		self.assertEqual(slow_total(self.directory), self.baseline + 4)
+		self.assertEqual(slow_total(self.directory), self.baseline + 4)
+		self.assertTrue(other.exists())
+		self.assertFalse((self.directory / metrics.retired_snapshot_name(metrics.host_id())).exists())
@@ -0,0 +1,111 @@
+"""The serving loader must rebuild exactly the model Keras itself would load."""
+
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from emotion_analysis import model_artifacts
+
+
+def save_recurrent_model(directory: Path, seed: int = 0) -> Path:
+	"""Small model with the teacher's recurrent layers: ``Bidirectional(LSTM)`` and a plain ``LSTM``."""
+
+	import tensorflow as tf
+
+	tf.keras.utils.set_random_seed(seed)
+	model = tf.keras.Sequential([
+		tf.keras.layers.Input(shape=(6, 4)),
+		tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(5, return_sequences=True)),
+		tf.keras.layers.LSTM(3),
+		tf.keras.layers.Dense(4, activation='softmax'),
+	])
+	path = directory / 'modelo_emocoes.keras'
+	model.save(path)
+	return path
+
+
+class RecurrentArchiveTests(SimpleTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		import tensorflow as tf
+
+		cls._tmp = tempfile.TemporaryDirectory()
+		cls.directory = Path(cls._tmp.name)
+		cls.model_path = save_recurrent_model(cls.directory)
+		cls.batch = np.random.default_rng(0).normal(size=(3, 6, 4)).astype(np.float32)
+		cls.expected = tf.keras.models.load_model(cls.model_path)(cls.batch, training=False).numpy()
+
+	@classmethod
+	def tearDownClass(cls):
+		cls._tmp.cleanup()
+		super().tearDownClass()
+
+	def test_archive_reads_every_recurrent_layer(self):
+		_, layer_weights = model_artifacts.read_keras_archive(self.model_path)
+
+		self.assertEqual(sorted(layer_weights), ['bidirectional', 'dense', 'lstm'])
+		self.assertEqual(len(layer_weights['bidirectional']), 6)  # forward + backward kernel, recurrent, bias
+		self.assertEqual(len(layer_weights['lstm']), 3)
+
+	def test_rebuilt_model_matches_load_model(self):
+		cache_dir = self.directory / 'cache'
+		# Archive, cache being written, cache hit.
+		for cache in (None, cache_dir, cache_dir):
+			with self.subTest(cache=cache):
+				model = model_artifacts.build_model(*model_artifacts.load_weights_and_config(self.model_path, cache))
+				np.testing.assert_allclose(model(self.batch, training=False).numpy(), self.expected, atol=1e-6)
+
+	def test_missing_weights_are_logged(self):
+		seq_config, _ = model_artifacts.read_keras_archive(self.model_path)
+
+		with self.assertLogs('emotion_analysis.model_artifacts', 'WARNING') as logs:
+			model_artifacts.build_model(seq_config, {})
+
+		self.assertEqual(len(logs.records), 3)
+
+
+class SharedCacheTests(SimpleTestCase):
+	"""Several registered versions, all named ``modelo_emocoes.keras``, share one cache directory."""
+
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.root = Path(tmp.name)
+		self.cache_dir = self.root / 'cache'
+		self.batch = np.random.default_rng(0).normal(size=(3, 6, 4)).astype(np.float32)
+
+	def save_version(self, name: str, seed: int) -> Path:
+		directory = self.root / name
+		directory.mkdir()
+		return save_recurrent_model(directory, seed)
+
+	def output(self, config_and_weights) -> np.ndarray:
+		return model_artifacts.build_model(*config_and_weights)(self.batch, training=False).numpy()
+
+	def test_versions_with_the_same_file_name_keep_their_own_cache(self):
+		first, second = self.save_version('v1', 1), self.save_version('v2', 2)
+		model_artifacts.convert_archive(first, self.cache_dir)
+		model_artifacts.convert_archive(second, self.cache_dir)
+
+		for path in (first, second, first):
+			with self.subTest(path=path):
+				cached = model_artifacts.load_cached(path, self.cache_dir)
+				self.assertIsNotNone(cached)
+				np.testing.assert_allclose(self.output(cached), self.output(model_artifacts.read_keras_archive(path)), atol=1e-6)
+
+	def test_rewritten_archive_reads_the_blob_its_manifest_names(self):
+		path = self.save_version('v1', 1)
+		old = model_artifacts.convert_archive(path, self.cache_dir)
+		save_recurrent_model(path.parent, 2)
+		new = model_artifacts.convert_archive(path, self.cache_dir)
+
+		self.assertNotEqual(old['blob'], new['blob'])
+		self.assertFalse((self.cache_dir / old['blob']).exists())
+		np.testing.assert_allclose(
+			self.output(model_artifacts.load_cached(path, self.cache_dir)),
+			self.output(model_artifacts.read_keras_archive(path)),
+			atol=1e-6,
+		)
@@ -0,0 +1,51 @@
+"""A second model server must not take over the socket of one that is still running."""
+
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from emotion_analysis.model_server import ModelServer, ModelServerClient, ModelServerError
+
+
+def start_server(socket_path: str) -> ModelServer:
+	server = ModelServer(socket_path, lambda batch, model: batch, lambda model: {'version': 'v1', 'labels': []})
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+class SocketOwnershipTests(SimpleTestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.socket_path = str(Path(tmp.name) / 'modelo.sock')
+
+	def stop(self, server: ModelServer) -> None:
+		server.shutdown()
+		server.server_close()
+
+	def test_second_server_is_refused_while_the_first_answers(self):
+		first = start_server(self.socket_path)
+		self.addCleanup(self.stop, first)
+
+		with self.assertRaises(ModelServerError):
+			ModelServer(self.socket_path, lambda batch, model: batch, lambda model: {})
+		with self.assertRaisesMessage(CommandError, 'Já existe um servidor'):
+			call_command('run_model_server', socket=self.socket_path)
+
+		# The first server still owns the socket.
+		client = ModelServerClient(self.socket_path)
+		np.testing.assert_array_equal(client.predict(np.ones(3, dtype=np.float32)), np.ones(3))
+
+	def test_stale_socket_file_is_replaced(self):
+		stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		stale.bind(self.socket_path)
+		stale.close()  # the file stays, nobody listens
+
+		server = start_server(self.socket_path)
+		self.addCleanup(self.stop, server)
+		self.assertTrue(ModelServerClient(self.socket_path).ping())
@@ -0,0 +1,58 @@
+"""A shadow candidate that cannot score the live features must be skipped quietly, not per sample."""
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from emotion_analysis.feature_spec import MEL_SPEC
+from emotion_analysis.model_registry import ActiveModel
+from emotion_analysis.shadow import ShadowRunner
+
+
+class BrokenCandidateTests(SimpleTestCase):
+	def setUp(self):
+		self.attempts = 0
+
+	def load_candidate(self):
+		self.attempts += 1
+		raise FileNotFoundError('modelo sombra ausente')
+
+	def run_samples(self, runner: ShadowRunner, count: int) -> None:
+		for _ in range(count):
+			runner.submit(np.zeros((1, 4)), np.zeros((1, 2)), np.array(['a', 'b']), 'v1', 0.01)
+			runner.join()
+
+	def test_failure_is_cached_and_logged_once(self):
+		runner = ShadowRunner(self.load_candidate, lambda labels, row: {}, retry_seconds=3600)
+
+		with self.assertLogs('emotion_analysis.shadow', 'ERROR') as logs:
+			self.run_samples(runner, 5)
+
+		self.assertEqual(self.attempts, 1)
+		self.assertEqual(len(logs.records), 1)
+		stats = runner.stats()
+		self.assertEqual((stats['unavailable'], stats['errors'], stats['candidate_version']), (5, 0, None))
+
+	def test_load_is_retried_after_the_interval(self):
+		runner = ShadowRunner(self.load_candidate, lambda labels, row: {}, retry_seconds=0)
+
+		with self.assertLogs('emotion_analysis.shadow', 'DEBUG') as logs:
+			self.run_samples(runner, 3)
+
+		self.assertEqual(self.attempts, 3)
+		self.assertEqual([record.levelname for record in logs.records], ['ERROR', 'DEBUG', 'DEBUG'])
+
+
+class IncompatibleCandidateTests(SimpleTestCase):
+	def test_feature_mismatch_is_logged_once_and_skipped(self):
+		candidate = ActiveModel('v2', backend=None, labels=np.array(['a', 'b']), features=MEL_SPEC)
+		runner = ShadowRunner(lambda: candidate, lambda labels, row: {})
+
+		with self.assertLogs('emotion_analysis.shadow', 'ERROR') as logs:
+			for _ in range(4):
+				runner.submit(np.zeros((1, 64, 216, 3)), np.zeros((1, 2)), np.array(['a', 'b']), 'v1', 0.01)
+				runner.join()
+
+		self.assertEqual(len(logs.records), 1)
+		self.assertIsNone(logs.records[0].exc_info)
+		stats = runner.stats()
+		self.assertEqual((stats['unavailable'], stats['errors'], stats['candidate_version']), (4, 0, 'v2'))
@@ -0,0 +1,84 @@
+"""Carregamento, features e aumento de dados dos áudios de treino."""
+
+from typing import Tuple
+
+import numpy as np
+
+from emotion_analysis.training.config import TrainingConfig
+
+
+def load_audio(path: str, sr: int) -> Tuple[np.ndarray, int]:
+    if not path.lower().endswith(".wav"):
+        # Gravações da plataforma (webm, ogg, mp3, m4a): mesmos decodificadores da análise.
+        from emotion_analysis.audio_decoding import decode_audio
+
+        decoded = decode_audio(path, sr)
+        return decoded.waveform, decoded.sample_rate
+
+    import librosa
+
+    audio, sample_rate = librosa.load(path, sr=sr)
+    return audio, sample_rate
+
+
+def compute_mfcc_stack(audio: np.ndarray, sr: int, cfg: TrainingConfig) -> np.ndarray:
+    """MFCC + delta + delta-delta padronizados, (n_mfcc, max_pad_len, 3).
+
+    Mesmo extrator da análise em produção (emotion_analysis.features), que
+    reproduz librosa.feature.mfcc + librosa.feature.delta.
+    """
+    spec = cfg.feature_spec()
+    if sr != spec.sample_rate:
+        raise ValueError(f"Áudio a {sr} Hz, mas as features esperam {spec.sample_rate} Hz.")
+    return spec.extract(np.asarray(audio, dtype=np.float32))
+
+
+def add_noise(audio: np.ndarray, factor: float, rng: np.random.Generator) -> np.ndarray:
+    noise = rng.standard_normal(len(audio))
+    augmented = audio + factor * noise
+    return augmented.astype(np.float32)
+
+
+def stretch_audio(audio: np.ndarray, rate: float) -> np.ndarray:
+    import librosa
+
+    stretched = librosa.effects.time_stretch(audio, rate=rate)
+    return stretched.astype(np.float32)
+
+
+def shift_pitch(audio: np.ndarray, sr: int, steps: int) -> np.ndarray:
+    import librosa
+
+    shifted = librosa.effects.pitch_shift(audio, sr=sr, n_steps=steps)
+    return shifted.astype(np.float32)
+
+
+def random_augmentation(
+    audio: np.ndarray,
+    sr: int,
+    cfg: TrainingConfig,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Ruído, time-stretch e pitch-shift sorteados com ``rng`` (reprodutível pela semente)."""
+    augmented = audio.copy()
+    applied = False
+
+    if cfg.noise_factor > 0 and rng.random() < 0.7:
+        augmented = add_noise(augmented, cfg.noise_factor, rng)
+        applied = True
+
+    if rng.random() < 0.7:
+        rate = rng.uniform(*cfg.stretch_range)
+        augmented = stretch_audio(augmented, rate)
+        applied = True
+
+    if rng.random() < 0.7:
+        steps = int(rng.integers(cfg.pitch_steps[0], cfg.pitch_steps[1] + 1))
+        if steps != 0:
+            augmented = shift_pitch(augmented, sr, steps)
+            applied = True
+
+    if not applied and cfg.noise_factor > 0:
+        augmented = add_noise(augmented, cfg.noise_factor, rng)
+
+    return augmented
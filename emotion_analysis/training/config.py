@@ -0,0 +1,93 @@
+"""Configuração do treinamento e rótulos do RAVDESS."""
+
+import json
+import os
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, Tuple
+
+from emotion_analysis.feature_spec import FeatureSpec
+
+
+@dataclass
+class TrainingConfig:
+    dataset_path: str = "/content/drive/MyDrive/RAVDESS"
+    output_dir: str = "/content/drive/MyDrive/plataforma/static/modelo"
+    sample_rate: int = 22050
+    n_mels: int = 128
+    n_mfcc: int = 64
+    max_pad_len: int = 216  # divisível por 8 após as camadas de pooling
+    augmentations_per_file: int = 2
+    noise_factor: float = 0.006
+    stretch_range: Tuple[float, float] = (0.88, 1.12)
+    pitch_steps: Tuple[int, int] = (-2, 2)
+    test_size: float = 0.2
+    random_seed: int = 42
+    batch_size: int = 32
+    epochs: int = 120
+    base_learning_rate: float = 3e-4
+    num_workers: int = 0  # processos na extração de features (0 = todos os núcleos)
+    chunk_size: int = 8  # arquivos por tarefa enviada a cada processo
+    # features gravadas entre execuções; no Drive, ao lado do modelo (o /content do Colab é apagado)
+    feature_store_dir: str = "/content/drive/MyDrive/plataforma/static/modelo/feature_store"
+    # "store": variações fixas gravadas em feature_store_dir; "streaming": sorteadas a cada época
+    input_mode: str = "store"
+    intra_op_threads: int = 0  # threads do TensorFlow por operação (0 = padrão do TensorFlow)
+    inter_op_threads: int = 0  # operações do TensorFlow em paralelo (0 = padrão do TensorFlow)
+    # "teacher": CNN + BiLSTM; "student": modelo pequeno destilado de teacher_model (ver distillation.py)
+    architecture: str = "teacher"
+    teacher_model: str = ""  # .keras do professor, com a especificação das features ao lado
+    distill_temperature: float = 4.0
+    distill_alpha: float = 0.3  # peso dos rótulos reais na perda do aluno (o resto vai para o professor)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "TrainingConfig":
+        known = {field.name: field for field in fields(cls)}
+        unknown = set(data) - set(known)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos na configuração de treino: {sorted(unknown)}")
+        values = {key: tuple(value) if isinstance(value, list) else value for key, value in data.items()}
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path: Path) -> "TrainingConfig":
+        """Configuração de um JSON com qualquer subconjunto dos campos (os demais ficam no padrão)."""
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+        return path
+
+    def feature_spec(self) -> FeatureSpec:
+        """Features do modelo; gravadas ao lado dele e reproduzidas na análise."""
+        return FeatureSpec(
+            kind="mfcc_stack",
+            sample_rate=self.sample_rate,
+            n_mels=self.n_mels,
+            n_mfcc=self.n_mfcc,
+            frames=self.max_pad_len,
+        )
+
+    def worker_count(self) -> int:
+        if self.num_workers > 0:
+            return self.num_workers
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+
+# Dicionário oficial do RAVDESS
+EMOTION_MAP = {
+    "01": "neutro",
+    "02": "calmo",
+    "03": "feliz",
+    "04": "triste",
+    "05": "raivoso",
+    "06": "medroso",
+    "07": "desgosto",
+    "08": "surpreso",
+}
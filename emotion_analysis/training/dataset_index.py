@@ -0,0 +1,150 @@
+"""Índice persistente dos áudios de treino.
+
+Guarda, para cada arquivo rotulado do dataset, caminho relativo, tamanho,
+mtime, rótulo e SHA-256 do conteúdo. A cada execução o dataset é percorrido
+de novo, mas só os arquivos novos ou com tamanho/mtime diferentes são lidos
+para calcular o hash. As features gravadas (``feature_store``, ``streaming``)
+são identificadas pelo caminho e pelo hash, então só esses arquivos são
+extraídos de novo.
+
+Rótulos:
+
+* RAVDESS: o terceiro campo do nome, se ele tiver os sete campos do padrão
+  (``03-01-05-01-02-01-12.wav`` -> ``raivoso``);
+* demais áudios (ex.: gravações da plataforma rotuladas à mão): o nome da
+  pasta, se for uma emoção de ``EMOTION_MAP`` (``gravacoes/feliz/123.webm``).
+"""
+
+import json
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from emotion_analysis.model_artifacts import file_sha256
+from emotion_analysis.training.config import EMOTION_MAP, TrainingConfig
+
+INDEX_VERSION = 1
+INDEX_NAME = "dataset_index.json"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".webm", ".m4a")
+LABELS = frozenset(EMOTION_MAP.values())
+# modalidade-canal-emoção-intensidade-frase-repetição-ator.wav
+RAVDESS_NAME = re.compile(r"^\d{2}(-\d{2}){6}\.wav$", re.IGNORECASE)
+
+
+def label_for(relative: str) -> Optional[str]:
+    """Rótulo de um arquivo pelo caminho relativo ao dataset (``None`` se não houver)."""
+    name = posixpath.basename(relative)
+    # Só nomes no padrão completo do RAVDESS: "2024-03-05.wav" numa pasta de emoção usa a pasta.
+    if RAVDESS_NAME.match(name):
+        label = EMOTION_MAP.get(name.split("-")[2])
+        if label:
+            return label
+    folder = posixpath.basename(posixpath.dirname(relative))
+    return folder if folder in LABELS else None
+
+
+def _scan(root: str, prefix: str = "") -> Iterator[Tuple[str, os.DirEntry]]:
+    """``(caminho relativo, entrada)`` dos áudios sob ``root``, em ordem alfabética."""
+    with os.scandir(root) as iterator:
+        entries = sorted(iterator, key=lambda entry: entry.name)
+    for entry in entries:
+        relative = prefix + entry.name
+        if entry.is_dir():
+            yield from _scan(entry.path, relative + "/")
+        elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+            yield relative, entry
+
+
+@dataclass
+class IndexUpdate:
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} novo(s), {self.changed} alterado(s), "
+            f"{self.removed} removido(s), {self.unchanged} sem alteração"
+        )
+
+
+class DatasetIndex:
+    """Arquivos rotulados de ``dataset_path``, gravados em ``index_path`` entre execuções."""
+
+    def __init__(self, dataset_path: str, index_path: Path) -> None:
+        self.dataset_path = dataset_path
+        self.index_path = Path(index_path)
+        self.entries: Dict[str, Dict[str, object]] = {}
+
+    @classmethod
+    def load(cls, dataset_path: str, index_path: Path) -> "DatasetIndex":
+        index = cls(dataset_path, index_path)
+        try:
+            data = json.loads(index.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return index
+        if data.get("version") == INDEX_VERSION:
+            index.entries = data["files"]
+        return index
+
+    def refresh(self) -> IndexUpdate:
+        """Atualiza o índice com o dataset; só arquivos novos ou modificados são lidos."""
+        update = IndexUpdate()
+        entries: Dict[str, Dict[str, object]] = {}
+        for relative, dir_entry in _scan(self.dataset_path):
+            label = label_for(relative)
+            if label is None:
+                continue
+            stat = dir_entry.stat()
+            previous = self.entries.get(relative)
+            if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                entries[relative] = {**previous, "label": label}
+                update.unchanged += 1
+                continue
+            entries[relative] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "label": label,
+                "sha256": file_sha256(dir_entry.path),
+            }
+            if previous is None:
+                update.added += 1
+            else:
+                update.changed += 1
+        update.removed = len(set(self.entries) - set(entries))
+        self.entries = entries
+        return update
+
+    def save(self) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        data = {"version": INDEX_VERSION, "dataset_path": self.dataset_path, "files": self.entries}
+        tmp_path.write_text(json.dumps(data, indent=1) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.index_path)
+
+    def relative(self, path: str) -> str:
+        return os.path.relpath(path, self.dataset_path).replace(os.sep, "/")
+
+    def sha256(self, path: str) -> str:
+        return self.entries[self.relative(path)]["sha256"]
+
+    def paths(self) -> List[str]:
+        return [os.path.join(self.dataset_path, *relative.split("/")) for relative in self.entries]
+
+    def labels(self) -> List[str]:
+        return [entry["label"] for entry in self.entries.values()]
+
+
+def update_index(cfg: TrainingConfig) -> DatasetIndex:
+    """Índice de ``cfg.dataset_path`` atualizado e gravado em ``feature_store_dir``."""
+    index = DatasetIndex.load(cfg.dataset_path, Path(cfg.feature_store_dir) / INDEX_NAME)
+    update = index.refresh()
+    index.save()
+    print(f"  Índice do dataset: {update}")
+    if not index.entries:
+        raise ValueError("Nenhum áudio rotulado encontrado. Verifique o caminho do dataset.")
+    return index
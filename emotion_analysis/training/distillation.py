@@ -0,0 +1,247 @@
+"""Destilação do modelo de emoções num aluno pequeno para servir em CPU.
+
+O modelo de ``trainer.build_model`` (três blocos convolucionais e duas
+BiLSTMs) é o professor. ``build_student_model`` tem convoluções separáveis em
+profundidade e pooling global, com uma fração dos parâmetros e das operações.
+O aluno é treinado pelo ``Distiller`` contra os rótulos reais e contra as
+probabilidades do professor suavizadas pela temperatura; o professor roda em
+cada lote, então as variações sorteadas no modo ``"streaming"`` também são
+rotuladas por ele.
+
+O aluno é um ``.keras`` comum, com a mesma entrada e saída do professor:
+exportado para ``static/modelo`` ou registrado como versão, é servido por
+``audio_processing`` sem mudanças. ``compare_models`` mede acurácia, tamanho e
+latência dos dois pelo backend Keras da análise e grava o relatório.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+from joblib import load
+from tensorflow.keras import callbacks, layers, models
+
+from emotion_analysis.feature_spec import load_for_model
+from emotion_analysis.inference_backends import KerasBackend
+from emotion_analysis.training.config import TrainingConfig
+from emotion_analysis.training.feature_store import StoredFeatures
+
+REPORT_NAME = "distillation_report.json"
+LATENCY_BATCH_SIZES = (1, 32)
+LATENCY_RUNS = 30
+
+
+def build_student_model(input_shape: Tuple[int, int, int], num_classes: int) -> models.Model:
+    inputs = layers.Input(shape=input_shape)
+
+    x = layers.Conv2D(32, (3, 3), padding="same", use_bias=False)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.MaxPooling2D((2, 2))(x)
+
+    for filters, dropout in ((64, 0.1), (96, 0.15), (128, 0.2)):
+        x = layers.SeparableConv2D(filters, (3, 3), padding="same", use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.Activation("relu")(x)
+        x = layers.MaxPooling2D((2, 2))(x)
+        x = layers.SpatialDropout2D(dropout)(x)
+
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.3)(x)
+
+    outputs = layers.Dense(num_classes, activation="softmax")(x)
+    model = models.Model(inputs=inputs, outputs=outputs)
+    return model
+
+
+def soften(probabilities: tf.Tensor, temperature: float) -> tf.Tensor:
+    """Probabilidades de uma saída softmax reescaladas pela temperatura."""
+    logits = tf.math.log(tf.clip_by_value(probabilities, 1e-7, 1.0))
+    return tf.nn.softmax(logits / temperature)
+
+
+class Distiller(models.Model):
+    """Treina ``student`` com a perda dos rótulos e a das probabilidades de ``teacher``.
+
+    Perda = ``alpha`` × entropia cruzada com os rótulos (com os class weights)
+    + (1 − ``alpha``) × T² × KL entre as saídas suavizadas do professor e do
+    aluno. ``loss`` no histórico é só a primeira parcela, a mesma do treino do
+    professor, e ``distillation_loss`` a segunda; a validação usa só o aluno.
+    """
+
+    def __init__(self, student: models.Model, teacher: models.Model, temperature: float, alpha: float) -> None:
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.teacher.trainable = False
+        self.temperature = temperature
+        self.alpha = alpha
+        self.kl_divergence = tf.keras.losses.KLDivergence()
+        self.distillation_tracker = tf.keras.metrics.Mean(name="distillation_loss")
+
+    def call(self, inputs, training=False):
+        return self.student(inputs, training=training)
+
+    def train_step(self, data):
+        x, y, sample_weight = tf.keras.utils.unpack_x_y_sample_weight(data)
+        teacher_probs = self.teacher(x, training=False)
+        with tf.GradientTape() as tape:
+            y_pred = self(x, training=True)
+            student_loss = self.compiled_loss(y, y_pred, sample_weight, regularization_losses=self.losses)
+            distillation_loss = self.temperature ** 2 * self.kl_divergence(
+                soften(teacher_probs, self.temperature),
+                soften(y_pred, self.temperature),
+            )
+            loss = self.alpha * student_loss + (1 - self.alpha) * distillation_loss
+        self.optimizer.minimize(loss, self.student.trainable_variables, tape=tape)
+        self.distillation_tracker.update_state(distillation_loss)
+        return self.compute_metrics(x, y, y_pred, sample_weight)
+
+    def test_step(self, data):
+        logs = super().test_step(data)
+        logs.pop("distillation_loss", None)  # o professor não roda na validação
+        return logs
+
+
+class StudentCheckpoint(callbacks.Callback):
+    """``ModelCheckpoint(save_best_only=True)`` que grava só o aluno do ``Distiller``."""
+
+    def __init__(self, filepath: str, monitor: str = "val_accuracy", initial_value_threshold=None) -> None:
+        super().__init__()
+        self.filepath = filepath
+        self.monitor = monitor
+        self.best = -np.inf if initial_value_threshold is None else initial_value_threshold
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None or current <= self.best:
+            return
+        print(f"\nEpoch {epoch + 1}: {self.monitor} melhorou de {self.best:.5f} para {current:.5f}, "
+              f"salvando o aluno em {self.filepath}")
+        self.best = current
+        self.model.student.save(self.filepath)
+
+
+def load_teacher(cfg: TrainingConfig, output_model: Path) -> models.Model:
+    """Professor de ``cfg.teacher_model``, conferido contra as features deste treino."""
+    if not cfg.teacher_model:
+        raise ValueError('architecture="student" exige teacher_model (o .keras do professor).')
+    teacher_path = Path(cfg.teacher_model)
+    if not teacher_path.is_file():
+        raise ValueError(f"Modelo professor não encontrado: {teacher_path}")
+    if teacher_path.resolve() == Path(output_model).resolve():
+        raise ValueError(
+            f"O professor ({teacher_path}) seria sobrescrito pelo aluno; use outro output_dir."
+        )
+    if load_for_model(teacher_path) != cfg.feature_spec():
+        raise ValueError(
+            f"O professor {teacher_path} foi treinado com outras features; "
+            "use a mesma configuração de features no aluno."
+        )
+    return KerasBackend(teacher_path).model
+
+
+def check_teacher_classes(cfg: TrainingConfig, teacher: models.Model, classes: Sequence[str]) -> None:
+    """As probabilidades do professor precisam estar na ordem das classes do ``LabelEncoder`` do aluno."""
+    if teacher.output_shape[-1] != len(classes):
+        raise ValueError(
+            f"O professor tem {teacher.output_shape[-1]} classes e o dataset {len(classes)}."
+        )
+    encoder_path = Path(cfg.teacher_model).with_name("label_encoder.joblib")
+    if not encoder_path.exists():
+        return
+    teacher_classes = list(load(encoder_path).classes_)
+    if teacher_classes != list(classes):
+        raise ValueError(
+            f"As classes do professor ({encoder_path}) diferem das do dataset: {teacher_classes} != {list(classes)}"
+        )
+
+
+# -------------------- Comparação professor x aluno -------------------- #
+
+def _latency(backend: KerasBackend, batch: np.ndarray, runs: int) -> Dict[str, float]:
+    backend.predict(batch)  # aquecimento: traçado e alocação dos buffers
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(batch)
+        samples.append(time.perf_counter() - start)
+    values = 1000 * np.asarray(samples)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p90_ms": round(float(np.percentile(values, 90)), 3),
+    }
+
+
+def _evaluate(model_path: Path, test_set: StoredFeatures, y_true: np.ndarray, batch_size: int):
+    """Probabilidades e métricas de ``model_path`` carregado como na análise (``KerasBackend``).
+
+    Só as linhas válidas (``test_set.rows``) entram: ``y_true`` tem uma entrada por linha.
+    """
+    backend = KerasBackend(model_path)
+    features, rows = test_set.features, test_set.rows
+    probs = np.concatenate([
+        backend.predict(features[rows[start:start + batch_size]])
+        for start in range(0, len(rows), batch_size)
+    ])
+    latency = {}
+    for size in LATENCY_BATCH_SIZES:
+        batch = np.resize(features[rows[:size]], (size,) + test_set.input_shape)
+        latency[f"batch_{size}"] = _latency(backend, batch, LATENCY_RUNS)
+    return probs, {
+        "path": str(model_path),
+        "parameters": int(backend.model.count_params()),
+        "file_bytes": os.path.getsize(model_path),
+        "accuracy": round(float(np.mean(np.argmax(probs, axis=1) == y_true)), 4),
+        "latency": latency,
+    }
+
+
+def compare_models(
+    cfg: TrainingConfig,
+    teacher_path: Path,
+    student_path: Path,
+    test_set: StoredFeatures,
+    y_true: np.ndarray,
+) -> Dict[str, object]:
+    """Acurácia de teste, tamanho e latência de professor e aluno; grava ``distillation_report.json``."""
+    if len(y_true) != len(test_set):
+        raise ValueError(f"{len(y_true)} rótulos para {len(test_set)} exemplos de teste.")
+    teacher_probs, teacher = _evaluate(Path(teacher_path), test_set, y_true, cfg.batch_size)
+    student_probs, student = _evaluate(Path(student_path), test_set, y_true, cfg.batch_size)
+    report = {
+        "temperature": cfg.distill_temperature,
+        "alpha": cfg.distill_alpha,
+        "test_examples": int(len(y_true)),
+        "intra_op_threads": cfg.intra_op_threads,
+        "teacher": teacher,
+        "student": student,
+        # Fração do teste em que o aluno escolhe a mesma emoção que o professor.
+        "agreement": round(float(np.mean(np.argmax(teacher_probs, axis=1) == np.argmax(student_probs, axis=1))), 4),
+        "speedup": {
+            size: round(teacher["latency"][size]["p50_ms"] / student["latency"][size]["p50_ms"], 2)
+            for size in teacher["latency"]
+        },
+    }
+    report_path = Path(cfg.output_dir) / REPORT_NAME
+    report_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return report
+
+
+def format_report(report: Dict[str, object]) -> str:
+    lines = [f"{'':10}{'acurácia':>10}{'parâmetros':>12}{'arquivo':>10}"
+             + "".join(f"{'p50 lote ' + size.split('_')[1]:>16}" for size in report["speedup"])]
+    for name in ("teacher", "student"):
+        entry = report[name]
+        lines.append(
+            f"{'professor' if name == 'teacher' else 'aluno':10}"
+            f"{entry['accuracy'] * 100:>9.2f}%{entry['parameters']:>12,}{entry['file_bytes'] / 1e6:>8.2f}MB"
+            + "".join(f"{entry['latency'][size]['p50_ms']:>14.2f}ms" for size in report["speedup"])
+        )
+    speedups = ", ".join(f"{value}x no lote {size.split('_')[1]}" for size, value in report["speedup"].items())
+    lines.append(f"Concordância aluno/professor: {report['agreement'] * 100:.1f}%; aceleração: {speedups}")
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+"""Extração paralela das features de treino.
+
+Os arquivos são divididos em blocos de ``chunk_size`` e processados por um
+pool de processos (``num_workers``). Cada arquivo gera a pilha MFCC do áudio
+original e, no conjunto de treino, ``augmentations_per_file`` variações.
+
+As variações sorteiam ruído, time-stretch e pitch-shift com um gerador próprio
+do arquivo, semeado por ``random_seed`` e pelo caminho relativo ao dataset. O
+resultado não depende do número de processos, do tamanho dos blocos nem da
+ordem em que terminam, e os tensores voltam na ordem dos arquivos.
+"""
+
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from emotion_analysis.training.audio import compute_mfcc_stack, load_audio, random_augmentation
+from emotion_analysis.training.config import TrainingConfig
+
+# (índice, caminho, semente) de cada arquivo enviado a um processo.
+WorkItem = Tuple[int, str, np.random.SeedSequence]
+# (índice, resultado do arquivo ou None, erro)
+WorkResult = Tuple[int, Optional[np.ndarray], Optional[str]]
+
+PROGRESS_INTERVAL = 10.0
+
+
+def file_seed(path: str, cfg: TrainingConfig) -> np.random.SeedSequence:
+    """Semente das variações de ``path``, estável entre máquinas e execuções."""
+    relative = os.path.relpath(path, cfg.dataset_path).replace(os.sep, "/")
+    return np.random.SeedSequence([cfg.random_seed, zlib.crc32(relative.encode("utf-8"))])
+
+
+def rows_per_file(cfg: TrainingConfig, augment: bool) -> int:
+    return 1 + (cfg.augmentations_per_file if augment else 0)
+
+
+def extract_file(path: str, seed: np.random.SeedSequence, cfg: TrainingConfig, augment: bool) -> np.ndarray:
+    """Tensores do áudio original seguido das variações, ``(1 + n, n_mfcc, frames, 3)``."""
+    audio, sr = load_audio(path, cfg.sample_rate)
+    count = rows_per_file(cfg, augment)
+    out = np.empty((count,) + cfg.feature_spec().input_shape, dtype=np.float32)
+    out[0] = compute_mfcc_stack(audio, sr, cfg)
+    rng = np.random.default_rng(seed)
+    for index in range(1, count):
+        out[index] = compute_mfcc_stack(random_augmentation(audio, sr, cfg, rng), sr, cfg)
+    return out
+
+
+def decode_file(path: str, seed: np.random.SeedSequence, cfg: TrainingConfig, max_samples: int) -> np.ndarray:
+    """Forma de onda de ``path`` em ``cfg.sample_rate``, limitada a ``max_samples``."""
+    audio, _ = load_audio(path, cfg.sample_rate)
+    return np.ascontiguousarray(audio[:max_samples], dtype=np.float32)
+
+
+# Tarefa executada por arquivo nos processos: (caminho, semente) -> array.
+FileTask = Callable[[str, np.random.SeedSequence], np.ndarray]
+
+
+def _run_chunk(items: Sequence[WorkItem], task: FileTask) -> List[WorkResult]:
+    results: List[WorkResult] = []
+    for index, path, seed in items:
+        try:
+            results.append((index, task(path, seed), None))
+        except Exception as exc:
+            results.append((index, None, str(exc) or type(exc).__name__))
+    return results
+
+
+def _init_worker() -> None:
+    # Um processo por núcleo: o BLAS/OpenMP de cada um fica com uma thread.
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(1)
+
+
+class _Progress:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def update(self, done: int, failed: int) -> None:
+        self.done += done
+        self.failed += failed
+        now = time.monotonic()
+        if self.done < self.total and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        print(
+            f"  {self.done}/{self.total} arquivos ({100 * self.done / self.total:.0f}%), "
+            f"{rate:.1f} arquivos/s, {self.failed} falha(s), "
+            f"{elapsed:.0f}s decorridos, ~{eta:.0f}s restantes",
+            flush=True,
+        )
+
+
+def map_files(paths: Sequence[str], cfg: TrainingConfig, task: FileTask) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+    """``(índice, task(caminho, semente))`` de cada arquivo, na ordem em que ficam prontos.
+
+    ``task`` roda no pool de processos e precisa ser serializável (função do
+    módulo ou ``functools.partial``). Arquivos que falharem vêm com ``None``
+    (o erro é impresso).
+    """
+    items = [(index, path, file_seed(path, cfg)) for index, path in enumerate(paths)]
+    chunk_size = max(1, cfg.chunk_size)
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    workers = min(cfg.worker_count(), len(chunks)) if chunks else 1
+    progress = _Progress(len(items))
+
+    def collect(results: List[WorkResult]) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+        failed = 0
+        for index, array, error in results:
+            if error is not None:
+                failed += 1
+                print(f"Falha ao processar {paths[index]}: {error}")
+            yield index, array
+        progress.update(len(results), failed)
+
+    print(f"  {len(items)} arquivos em {len(chunks)} blocos, {workers} processo(s)")
+    if workers <= 1:
+        for chunk in chunks:
+            yield from collect(_run_chunk(chunk, task))
+        return
+    # Processos iniciados com spawn, não fork: o script de treino já carregou o TensorFlow.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = [pool.submit(_run_chunk, chunk, task) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from collect(future.result())
+
+
+def extract_features(
+    paths: Sequence[str],
+    cfg: TrainingConfig,
+    augment: bool = False,
+) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+    """``(índice, tensores)`` de cada arquivo; ``rows_per_file(cfg, augment)`` tensores por arquivo."""
+    return map_files(paths, cfg, partial(extract_file, cfg=cfg, augment=augment))
+
+
+def build_feature_set(
+    paths: Sequence[str],
+    labels: Sequence[str],
+    cfg: TrainingConfig,
+    augment: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Features e rótulos em memória; para datasets maiores, use ``feature_store``."""
+    rows = rows_per_file(cfg, augment)
+    X = np.empty((len(paths) * rows,) + cfg.feature_spec().input_shape, dtype=np.float32)
+    ok = np.zeros(len(paths), dtype=bool)
+    for index, tensors in extract_features(paths, cfg, augment):
+        if tensors is not None:
+            X[index * rows:(index + 1) * rows] = tensors
+            ok[index] = True
+    if not ok.any():
+        raise ValueError("Nenhum áudio pôde ser processado.")
+
+    # Remove as posições dos arquivos que falharam sem copiar o conjunto inteiro.
+    kept = 0
+    for index in np.flatnonzero(ok):
+        if index != kept:
+            X[kept * rows:(kept + 1) * rows] = X[index * rows:(index + 1) * rows]
+        kept += 1
+    y_array = np.repeat(np.asarray(labels)[ok], rows)
+    return X[:kept * rows], y_array
@@ -0,0 +1,233 @@
+"""Features de treino gravadas em disco e lidas por ``tf.data``.
+
+Cada conjunto (treino, teste) fica num diretório com:
+
+* ``features-<hash>.npy``: todos os tensores ``(linhas, n_mfcc, frames, 3)``,
+  escritos por memory map à medida que a extração termina, sem manter o
+  conjunto em RAM;
+* ``manifest.json``: especificação das features, parâmetros do aumento de
+  dados e, para cada arquivo, caminho, rótulo, SHA-256 e as linhas que ocupa.
+
+Numa nova execução com os mesmos arquivos e parâmetros o manifesto confere e
+a extração é pulada; se só parte dos arquivos mudou (ver ``dataset_index``),
+só ela é extraída. O treino lê as linhas por índice, em lotes embaralhados a
+cada época e com prefetch, então o tamanho do dataset não depende da memória.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from emotion_analysis.model_artifacts import file_sha256
+from emotion_analysis.training.config import TrainingConfig
+from emotion_analysis.training.dataset_index import DatasetIndex
+from emotion_analysis.training.feature_builder import extract_features, rows_per_file
+
+MANIFEST_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class StoredFeatures:
+    """Um conjunto gravado: tensores em memory map e os rótulos das linhas válidas."""
+
+    directory: Path
+    features: np.ndarray  # memory map somente leitura
+    rows: np.ndarray  # linhas de ``features`` com tensores (arquivos que não falharam)
+    labels: np.ndarray  # rótulo de cada linha em ``rows``
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def input_shape(self):
+        return self.features.shape[1:]
+
+    def dataset(self, targets: np.ndarray, batch_size: int, shuffle: bool = False, seed: Optional[int] = None):
+        """``tf.data.Dataset`` de lotes ``(tensores, targets)`` lidos do disco.
+
+        ``targets`` tem uma entrada por linha em ``rows`` (ex.: one-hot dos
+        rótulos). Com ``shuffle``, a ordem muda a cada época.
+        """
+        import tensorflow as tf
+
+        targets = np.asarray(targets, dtype=np.float32)
+        features, rows = self.features, self.rows
+
+        def gather(positions: np.ndarray):
+            # Em ordem crescente, a leitura do memory map é sequencial dentro do lote.
+            positions = np.sort(positions)
+            return features[rows[positions]], targets[positions]
+
+        def load(positions):
+            x, y = tf.numpy_function(gather, [positions], (tf.float32, tf.float32))
+            x.set_shape((None,) + tuple(features.shape[1:]))
+            y.set_shape((None,) + targets.shape[1:])
+            return x, y
+
+        dataset = tf.data.Dataset.range(len(rows))
+        if shuffle:
+            dataset = dataset.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def file_entries(
+    paths: Sequence[str],
+    labels: Sequence[str],
+    cfg: TrainingConfig,
+    index: Optional[DatasetIndex] = None,
+) -> List[Dict[str, object]]:
+    """Caminho relativo, rótulo e hash de cada arquivo (hash do índice, se houver)."""
+    entries = []
+    for path, label in zip(paths, labels):
+        entries.append({
+            "path": os.path.relpath(path, cfg.dataset_path).replace(os.sep, "/"),
+            "label": label,
+            "sha256": index.sha256(path) if index is not None else file_sha256(path),
+        })
+    return entries
+
+
+def files_digest(entries: List[Dict[str, object]]) -> str:
+    """Hash da lista de arquivos (caminho, rótulo, conteúdo), na ordem dada."""
+    return hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _params(cfg: TrainingConfig, augment: bool) -> Dict[str, object]:
+    """Parâmetros que mudam os tensores de um arquivo; se diferirem, nada é reaproveitado."""
+    return {
+        "feature_spec": cfg.feature_spec().to_dict(),
+        "augment": augment,
+        "augmentations_per_file": cfg.augmentations_per_file if augment else 0,
+        "noise_factor": cfg.noise_factor,
+        "stretch_range": list(cfg.stretch_range),
+        "pitch_steps": list(cfg.pitch_steps),
+        "random_seed": cfg.random_seed,
+    }
+
+
+def read_manifest(directory: Path, data_key: str) -> Optional[Dict[str, object]]:
+    """Manifesto de ``directory`` se for desta versão e o arquivo de dados em ``data_key`` existir."""
+    try:
+        manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or not (directory / manifest.get(data_key, "")).is_file():
+        return None
+    return manifest
+
+
+def write_manifest(directory: Path, manifest: Dict[str, object], data_key: str, previous: Optional[Dict[str, object]]) -> None:
+    """Troca o manifesto e só então apaga o arquivo de dados que ele deixou de usar.
+
+    Cada gravação usa um arquivo de dados novo, então uma execução
+    interrompida em qualquer ponto deixa o manifesto anterior válido.
+    """
+    tmp_manifest = directory / (MANIFEST_NAME + ".tmp")
+    tmp_manifest.write_text(json.dumps(manifest, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp_manifest, directory / MANIFEST_NAME)
+    if previous is not None and previous[data_key] != manifest[data_key]:
+        (directory / previous[data_key]).unlink(missing_ok=True)
+
+
+def open_store(directory: Path) -> StoredFeatures:
+    """Abre um conjunto já gravado (sem verificar se os arquivos de origem mudaram)."""
+    directory = Path(directory)
+    manifest = read_manifest(directory, "features")
+    if manifest is None:
+        raise FileNotFoundError(f"Nenhum conjunto de features válido em {directory}.")
+    features = np.load(directory / manifest["features"], mmap_mode="r")
+    rows: List[int] = []
+    labels: List[str] = []
+    for entry in manifest["files"]:
+        if entry["row"] is None:
+            continue
+        rows.extend(range(entry["row"], entry["row"] + entry["rows"]))
+        labels.extend([entry["label"]] * entry["rows"])
+    return StoredFeatures(directory, features, np.asarray(rows, dtype=np.int64), np.asarray(labels))
+
+
+def load_or_build(
+    directory: Path,
+    paths: Sequence[str],
+    labels: Sequence[str],
+    cfg: TrainingConfig,
+    augment: bool = False,
+    index: Optional[DatasetIndex] = None,
+) -> StoredFeatures:
+    """Conjunto gravado em ``directory``; só arquivos novos ou alterados são extraídos.
+
+    Com os mesmos parâmetros, os tensores de um arquivo (mesmo caminho e hash)
+    são copiados do conjunto anterior em vez de extraídos de novo.
+    """
+    directory = Path(directory)
+    entries = file_entries(paths, labels, cfg, index)
+    params = _params(cfg, augment)
+    digest = files_digest(entries)
+    manifest = read_manifest(directory, "features")
+    if manifest is not None and manifest["params"] == params and manifest["files_sha256"] == digest:
+        print(f"  Features reaproveitadas de {directory}")
+        return open_store(directory)
+
+    previous, previous_rows = None, {}
+    if manifest is not None and manifest["params"] == params:
+        previous_rows = {
+            (entry["path"], entry["sha256"]): entry["row"]
+            for entry in manifest["files"]
+            if entry["row"] is not None
+        }
+        previous = np.load(directory / manifest["features"], mmap_mode="r")
+
+    rows = rows_per_file(cfg, augment)
+    shape = (len(paths) * rows,) + cfg.feature_spec().input_shape
+    token = hashlib.sha256(json.dumps([params, digest], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    features_name = f"features-{token}.npy"
+    directory.mkdir(parents=True, exist_ok=True)
+    features = np.lib.format.open_memmap(directory / features_name, mode="w+", dtype=np.float32, shape=shape)
+
+    pending: List[int] = []
+    reused = 0
+    for position, entry in enumerate(entries):
+        entry["row"], entry["rows"] = None, 0
+        row = previous_rows.get((entry["path"], entry["sha256"]))
+        if row is None:
+            pending.append(position)
+            continue
+        features[position * rows:(position + 1) * rows] = previous[row:row + rows]
+        entry["row"], entry["rows"] = position * rows, rows
+        reused += 1
+    previous = None
+
+    written = reused
+    if pending:
+        for position, tensors in extract_features([paths[i] for i in pending], cfg, augment):
+            if tensors is None:
+                # Arquivos que falharam não ocupam linhas (a posição reservada fica zerada).
+                continue
+            position = pending[position]
+            features[position * rows:(position + 1) * rows] = tensors
+            entries[position]["row"], entries[position]["rows"] = position * rows, rows
+            written += 1
+    features.flush()
+    del features
+    if not written:
+        (directory / features_name).unlink()
+        raise ValueError("Nenhum áudio pôde ser processado.")
+
+    write_manifest(directory, {
+        "version": MANIFEST_VERSION,
+        "params": params,
+        "files_sha256": digest,
+        "features": features_name,
+        "shape": list(shape),
+        "files": entries,
+    }, "features", manifest)
+    print(f"  Features gravadas em {directory} ({written}/{len(paths)} arquivos, {reused} reaproveitados)")
+    return open_store(directory)
@@ -0,0 +1,189 @@
+"""Treino com aumento de dados sorteado a cada época (``input_mode="streaming"``).
+
+No modo ``"store"`` cada arquivo tem ``augmentations_per_file`` variações
+fixas, extraídas uma vez. Aqui só as formas de onda são decodificadas (em
+paralelo, uma vez, e gravadas num memory map com manifesto, como em
+``feature_store``; arquivos novos ou alterados são decodificados nas execuções
+seguintes). A cada época o ``tf.data`` sorteia ruído, time-stretch e
+pitch-shift de novo em chamadas paralelas do ``map`` e calcula as features
+enquanto o modelo treina, com memória constante.
+
+Cada exemplo usa um gerador semeado por ``random_seed`` e pela posição do
+exemplo no fluxo, então uma execução repete a anterior.
+"""
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from emotion_analysis.training.audio import compute_mfcc_stack, random_augmentation
+from emotion_analysis.training.config import TrainingConfig
+from emotion_analysis.training.dataset_index import DatasetIndex
+from emotion_analysis.training.feature_builder import decode_file, map_files
+from emotion_analysis.training.feature_store import (
+    MANIFEST_VERSION,
+    file_entries,
+    files_digest,
+    read_manifest,
+    write_manifest,
+)
+
+
+def max_samples(cfg: TrainingConfig) -> int:
+    """Amostras guardadas por arquivo: as que ainda entram nas features após o time-stretch."""
+    spec = cfg.feature_spec()
+    return int(math.ceil(spec.samples_needed * max(1.0, cfg.stretch_range[1]))) + spec.n_fft
+
+
+@dataclass
+class CachedWaveforms:
+    """Formas de onda decodificadas, concatenadas num memory map ``float32``."""
+
+    directory: Path
+    samples: np.ndarray  # memory map 1-D somente leitura
+    offsets: np.ndarray
+    lengths: np.ndarray
+    labels: np.ndarray
+    sample_rate: int
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def waveform(self, position: int) -> np.ndarray:
+        start = self.offsets[position]
+        return np.asarray(self.samples[start:start + self.lengths[position]])
+
+    def steps_per_epoch(self, batch_size: int) -> int:
+        return math.ceil(len(self) / batch_size)
+
+    def dataset(self, targets: np.ndarray, cfg: TrainingConfig):
+        """``tf.data.Dataset`` infinito de lotes ``(tensores, targets)``; use com ``steps_per_epoch``.
+
+        Com ``augmentations_per_file`` = n, cada exemplo sai sem alteração com
+        probabilidade 1 / (1 + n), a mesma proporção do modo ``"store"``.
+        """
+        import tensorflow as tf
+
+        targets = np.asarray(targets, dtype=np.float32)
+        spec = cfg.feature_spec()
+        keep_original = 1.0 / (1 + cfg.augmentations_per_file)
+
+        def make_example(step: np.int64, position: np.int64):
+            rng = np.random.default_rng([cfg.random_seed, int(step)])
+            audio = self.waveform(int(position))
+            if rng.random() >= keep_original:
+                audio = random_augmentation(audio, self.sample_rate, cfg, rng)
+            return compute_mfcc_stack(audio, self.sample_rate, cfg), targets[position]
+
+        def load(step, position):
+            x, y = tf.numpy_function(make_example, [step, position], (tf.float32, tf.float32))
+            x.set_shape(spec.input_shape)
+            y.set_shape(targets.shape[1:])
+            return x, y
+
+        dataset = tf.data.Dataset.range(len(self))
+        dataset = dataset.shuffle(len(self), seed=cfg.random_seed, reshuffle_each_iteration=True)
+        # Repetido antes do enumerate: a posição no fluxo (e a semente) muda a cada época.
+        dataset = dataset.repeat().enumerate()
+        dataset = dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+        dataset = dataset.batch(cfg.batch_size)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def _params(cfg: TrainingConfig) -> Dict[str, object]:
+    return {"sample_rate": cfg.sample_rate, "max_samples": max_samples(cfg)}
+
+
+def open_waveforms(directory: Path) -> CachedWaveforms:
+    directory = Path(directory)
+    manifest = read_manifest(directory, "samples")
+    if manifest is None:
+        raise FileNotFoundError(f"Nenhum cache de formas de onda válido em {directory}.")
+    entries = [entry for entry in manifest["files"] if entry["offset"] is not None]
+    return CachedWaveforms(
+        directory=directory,
+        samples=np.memmap(directory / manifest["samples"], dtype=np.float32, mode="r"),
+        offsets=np.asarray([entry["offset"] for entry in entries], dtype=np.int64),
+        lengths=np.asarray([entry["length"] for entry in entries], dtype=np.int64),
+        labels=np.asarray([entry["label"] for entry in entries]),
+        sample_rate=manifest["params"]["sample_rate"],
+    )
+
+
+def load_or_build_waveforms(
+    directory: Path,
+    paths: Sequence[str],
+    labels: Sequence[str],
+    cfg: TrainingConfig,
+    index: Optional[DatasetIndex] = None,
+) -> CachedWaveforms:
+    """Formas de onda de ``paths`` em ``directory``; só arquivos novos ou alterados são decodificados."""
+    directory = Path(directory)
+    entries = file_entries(paths, labels, cfg, index)
+    params = _params(cfg)
+    digest = files_digest(entries)
+    manifest = read_manifest(directory, "samples")
+    if manifest is not None and manifest["params"] == params and manifest["files_sha256"] == digest:
+        print(f"  Formas de onda reaproveitadas de {directory}")
+        return open_waveforms(directory)
+
+    previous, previous_spans = None, {}
+    if manifest is not None and manifest["params"] == params:
+        previous_spans = {
+            (entry["path"], entry["sha256"]): (entry["offset"], entry["length"])
+            for entry in manifest["files"]
+            if entry["offset"] is not None
+        }
+        previous = np.memmap(directory / manifest["samples"], dtype=np.float32, mode="r")
+
+    token = hashlib.sha256(json.dumps([params, digest], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    samples_name = f"waveforms-{token}.f32"
+    directory.mkdir(parents=True, exist_ok=True)
+    offset = 0
+    pending: List[int] = []
+    reused = 0
+    with open(directory / samples_name, "wb") as handle:
+        # Gravadas na ordem em que ficam prontas; o manifesto guarda onde cada uma começa.
+        for position, entry in enumerate(entries):
+            entry["offset"], entry["length"] = None, 0
+            span = previous_spans.get((entry["path"], entry["sha256"]))
+            if span is None:
+                pending.append(position)
+                continue
+            handle.write(previous[span[0]:span[0] + span[1]].tobytes())
+            entry["offset"], entry["length"] = offset, span[1]
+            offset += span[1]
+            reused += 1
+        previous = None
+
+        task = partial(decode_file, cfg=cfg, max_samples=max_samples(cfg))
+        decoded = map_files([paths[i] for i in pending], cfg, task) if pending else ()
+        for position, waveform in decoded:
+            if waveform is None:
+                continue
+            handle.write(waveform.tobytes())
+            entry = entries[pending[position]]
+            entry["offset"], entry["length"] = offset, len(waveform)
+            offset += len(waveform)
+    if not offset:
+        (directory / samples_name).unlink()
+        raise ValueError("Nenhum áudio pôde ser processado.")
+
+    write_manifest(directory, {
+        "version": MANIFEST_VERSION,
+        "params": params,
+        "files_sha256": digest,
+        "samples": samples_name,
+        "files": entries,
+    }, "samples", manifest)
+    print(
+        f"  Formas de onda gravadas em {directory} ({offset / cfg.sample_rate:.0f}s de áudio, "
+        f"{reused} arquivos reaproveitados)"
+    )
+    return open_waveforms(directory)
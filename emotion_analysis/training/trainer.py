@@ -0,0 +1,364 @@
+"""Fluxo de treinamento do modelo de emoções.
+
+Índice do dataset, features, modelo, checkpoints e exportação dos artefatos.
+Usado pelo script do Colab (``train_model_colab.py``) e pelo comando
+``python manage.py train_emotion_model``, que treina localmente.
+"""
+
+import csv
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+from joblib import dump
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils.class_weight import compute_class_weight
+from tensorflow.keras import callbacks, layers, models, optimizers, regularizers
+from tensorflow.keras.layers import TimeDistributed
+from tensorflow.keras.utils import to_categorical
+
+from emotion_analysis.feature_spec import spec_path
+from emotion_analysis.training.config import TrainingConfig
+from emotion_analysis.training.dataset_index import update_index
+from emotion_analysis.training.distillation import (
+    REPORT_NAME,
+    Distiller,
+    StudentCheckpoint,
+    build_student_model,
+    check_teacher_classes,
+    compare_models,
+    format_report,
+    load_teacher,
+)
+from emotion_analysis.training.feature_store import load_or_build
+from emotion_analysis.training.streaming import load_or_build_waveforms
+
+MODEL_NAME = "modelo_emocoes.keras"
+ENCODER_NAME = "label_encoder.joblib"
+HISTORY_NAME = "training_history.csv"
+CONFIG_NAME = "training_config.json"
+BACKUP_DIR_NAME = "backup"
+# Campos que podem mudar entre a execução interrompida e a retomada.
+RESUMABLE_CHANGES = frozenset({
+    "dataset_path", "feature_store_dir", "epochs", "num_workers", "chunk_size",
+    "intra_op_threads", "inter_op_threads",
+})
+
+
+@dataclass
+class ArtifactPaths:
+    model: Path
+    encoder: Path
+    feature_spec: Path
+
+
+@dataclass
+class TrainingRun:
+    model: models.Model  # melhor modelo (maior val_accuracy)
+    label_encoder: LabelEncoder
+    history: Dict[str, List[float]]  # todas as épocas, inclusive as anteriores a uma retomada
+    y_true: np.ndarray  # rótulos do conjunto de teste (inteiros do label_encoder)
+    y_pred: np.ndarray
+    accuracy: float
+    paths: ArtifactPaths
+
+
+def artifact_paths(cfg: TrainingConfig) -> ArtifactPaths:
+    model_path = Path(cfg.output_dir) / MODEL_NAME
+    return ArtifactPaths(model_path, Path(cfg.output_dir) / ENCODER_NAME, spec_path(model_path))
+
+
+def configure_threads(cfg: TrainingConfig) -> None:
+    """Threads do TensorFlow no treino em CPU; chame antes de criar qualquer tensor."""
+    if cfg.intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(cfg.intra_op_threads)
+    if cfg.inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(cfg.inter_op_threads)
+
+
+def _check_resumable(cfg: TrainingConfig, saved_path: Path) -> None:
+    try:
+        saved = TrainingConfig.load(saved_path).to_dict()
+    except (OSError, ValueError):
+        return
+    current = cfg.to_dict()
+    changed = sorted(key for key in current if key not in RESUMABLE_CHANGES and current[key] != saved.get(key))
+    if changed:
+        raise ValueError(
+            f"O checkpoint em {saved_path.parent} foi gravado com outra configuração ({', '.join(changed)}); "
+            "treine do zero (--fresh / resume=False) ou use outro output_dir."
+        )
+
+
+def read_history(path: Path) -> Dict[str, List[float]]:
+    """Métricas por época gravadas pelo ``CSVLogger``."""
+    history: Dict[str, List[float]] = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                for key, value in row.items():
+                    if key != "epoch":
+                        history.setdefault(key, []).append(float(value))
+    except FileNotFoundError:
+        pass
+    return history
+
+
+# -------------------- Modelo -------------------- #
+
+def build_model(input_shape: Tuple[int, int, int], num_classes: int) -> models.Model:
+    inputs = layers.Input(shape=input_shape)
+
+    x = layers.Conv2D(64, (3, 3), padding="same", kernel_regularizer=regularizers.l2(1e-4))(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.Conv2D(64, (3, 3), padding="same")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.MaxPooling2D((2, 2))(x)
+    x = layers.SpatialDropout2D(0.2)(x)
+
+    x = layers.Conv2D(128, (3, 3), padding="same", kernel_regularizer=regularizers.l2(1e-4))(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.Conv2D(128, (3, 3), padding="same")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.MaxPooling2D((2, 2))(x)
+    x = layers.SpatialDropout2D(0.3)(x)
+
+    x = layers.Conv2D(256, (3, 3), padding="same")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Activation("relu")(x)
+    x = layers.MaxPooling2D((2, 2))(x)
+    x = layers.SpatialDropout2D(0.35)(x)
+
+    x = layers.Permute((2, 1, 3))(x)
+    x = TimeDistributed(layers.Flatten())(x)
+
+    x = layers.Bidirectional(layers.LSTM(128, return_sequences=True))(x)
+    x = layers.Dropout(0.4)(x)
+    x = layers.Bidirectional(layers.LSTM(64))(x)
+    x = layers.Dropout(0.4)(x)
+
+    x = layers.Dense(128, activation="relu")(x)
+    x = layers.Dropout(0.4)(x)
+
+    outputs = layers.Dense(num_classes, activation="softmax")(x)
+    model = models.Model(inputs=inputs, outputs=outputs)
+    return model
+
+
+def make_callbacks(cfg: TrainingConfig, resuming: bool = False) -> List[callbacks.Callback]:
+    output_dir = Path(cfg.output_dir)
+    monitor_metric = "val_accuracy"
+    # Numa retomada, o checkpoint só é substituído por um modelo melhor que o já salvo.
+    best_so_far = max(read_history(output_dir / HISTORY_NAME).get(monitor_metric, []), default=None)
+    if cfg.architecture == "student":
+        # O Distiller não é salvo inteiro: só o aluno vai para o arquivo do modelo.
+        checkpoint = StudentCheckpoint(
+            str(artifact_paths(cfg).model),
+            monitor=monitor_metric,
+            initial_value_threshold=best_so_far if resuming else None,
+        )
+    else:
+        checkpoint = callbacks.ModelCheckpoint(
+            str(artifact_paths(cfg).model),
+            monitor=monitor_metric,
+            mode="max",
+            save_best_only=True,
+            initial_value_threshold=best_so_far if resuming else None,
+            verbose=1,
+        )
+    return [
+        callbacks.BackupAndRestore(str(output_dir / BACKUP_DIR_NAME)),
+        checkpoint,
+        callbacks.ReduceLROnPlateau(
+            monitor=monitor_metric,
+            mode="max",
+            factor=0.5,
+            patience=6,
+            min_lr=1e-6,
+            verbose=1,
+        ),
+        callbacks.EarlyStopping(
+            monitor=monitor_metric,
+            mode="max",
+            patience=12,
+            restore_best_weights=True,
+            verbose=1,
+        ),
+        callbacks.CSVLogger(str(output_dir / HISTORY_NAME), append=resuming),
+    ]
+
+
+# -------------------- Fluxo de treinamento -------------------- #
+
+def train(cfg: TrainingConfig, resume: bool = True) -> TrainingRun:
+    """Treina com ``cfg`` e grava modelo, codificador e especificação em ``output_dir``.
+
+    Com ``resume``, uma execução interrompida continua da última época
+    concluída (pesos, estado do otimizador e learning rate, via
+    ``BackupAndRestore``). O histórico completo fica em ``training_history.csv``.
+
+    Com ``architecture="student"``, treina o modelo pequeno por destilação de
+    ``teacher_model`` e grava em ``distillation_report.json`` a comparação de
+    acurácia e latência entre os dois.
+    """
+    if cfg.architecture not in ("teacher", "student"):
+        raise ValueError(f"architecture inválida: {cfg.architecture} (use 'teacher' ou 'student').")
+    artifacts = artifact_paths(cfg)
+    # Conferido antes de mexer em output_dir ou extrair features.
+    teacher = load_teacher(cfg, artifacts.model) if cfg.architecture == "student" else None
+    output_dir = Path(cfg.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    backup_dir = output_dir / BACKUP_DIR_NAME
+    # O BackupAndRestore esvazia (sem remover) a pasta quando o treino termina.
+    resuming = resume and backup_dir.is_dir() and any(backup_dir.iterdir())
+    if resuming:
+        _check_resumable(cfg, output_dir / CONFIG_NAME)
+        print(f"Retomando o treino a partir do checkpoint em {backup_dir}")
+    else:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        (output_dir / HISTORY_NAME).unlink(missing_ok=True)
+    cfg.save(output_dir / CONFIG_NAME)
+    tf.keras.utils.set_random_seed(cfg.random_seed)
+
+    print("Atualizando o índice do dataset...")
+    index = update_index(cfg)
+    paths, labels = index.paths(), index.labels()
+    print(f"Total de arquivos válidos: {len(paths)}")
+
+    train_paths, test_paths, train_labels, test_labels = train_test_split(
+        paths,
+        labels,
+        test_size=cfg.test_size,
+        stratify=labels,
+        random_state=cfg.random_seed,
+    )
+
+    store_dir = Path(cfg.feature_store_dir)
+    if cfg.input_mode == "streaming":
+        print("Decodificando o conjunto de treino (aumento de dados a cada época)...")
+        train_set = load_or_build_waveforms(store_dir / "waveforms", train_paths, train_labels, cfg, index=index)
+    elif cfg.input_mode == "store":
+        print("Gerando features para o conjunto de treino (com aumento de dados)...")
+        train_set = load_or_build(store_dir / "train", train_paths, train_labels, cfg, augment=True, index=index)
+    else:
+        raise ValueError(f"input_mode inválido: {cfg.input_mode} (use 'store' ou 'streaming').")
+
+    print("Gerando features para o conjunto de teste...")
+    test_set = load_or_build(store_dir / "test", test_paths, test_labels, cfg, augment=False, index=index)
+
+    input_shape = cfg.feature_spec().input_shape
+    print(f"Exemplos de treino por época: {len(train_set)}, de teste: {len(test_set)}")
+    print(f"Entrada do modelo: {input_shape}")
+
+    label_encoder = LabelEncoder()
+    y_train_int = label_encoder.fit_transform(train_set.labels)
+    y_test_int = label_encoder.transform(test_set.labels)
+
+    y_train_cat = to_categorical(y_train_int)
+    y_test_cat = to_categorical(y_test_int, num_classes=y_train_cat.shape[1])
+
+    # Lotes lidos do disco (memory map) e pré-carregados enquanto o modelo treina.
+    if cfg.input_mode == "streaming":
+        train_data = train_set.dataset(y_train_cat, cfg)
+        steps_per_epoch = train_set.steps_per_epoch(cfg.batch_size)
+    else:
+        train_data = train_set.dataset(y_train_cat, cfg.batch_size, shuffle=True, seed=cfg.random_seed)
+        steps_per_epoch = None
+    test_data = test_set.dataset(y_test_cat, cfg.batch_size)
+
+    class_weights = compute_class_weight(
+        class_weight="balanced",
+        classes=np.unique(y_train_int),
+        y=y_train_int,
+    )
+    class_weights_dict = dict(enumerate(class_weights))
+    print("Class weights:", class_weights_dict)
+
+    if teacher is not None:
+        check_teacher_classes(cfg, teacher, label_encoder.classes_)
+        student = build_student_model(input_shape, y_train_cat.shape[1])
+        student.summary()
+        print(f"Professor: {cfg.teacher_model} ({teacher.count_params():,} parâmetros)")
+        model = Distiller(student, teacher, cfg.distill_temperature, cfg.distill_alpha)
+    else:
+        model = build_model(input_shape, y_train_cat.shape[1])
+        model.summary()
+    model.compile(
+        optimizer=optimizers.Adam(learning_rate=cfg.base_learning_rate),
+        loss="categorical_crossentropy",
+        metrics=["accuracy"],
+    )
+
+    model.fit(
+        train_data,
+        validation_data=test_data,
+        epochs=cfg.epochs,
+        steps_per_epoch=steps_per_epoch,
+        callbacks=make_callbacks(cfg, resuming),
+        class_weight=class_weights_dict,
+        verbose=1,
+    )
+
+    print("Carregando o melhor modelo salvo...")
+    best_model = models.load_model(artifacts.model)
+    if teacher is not None:
+        # O aluno foi salvo sem otimizador nem métricas (quem foi compilado é o Distiller).
+        best_model.compile(loss="categorical_crossentropy", metrics=["accuracy"])
+    dump(label_encoder, artifacts.encoder)
+    cfg.feature_spec().save(artifacts.feature_spec)
+    print(f"Modelo salvo em {artifacts.model}")
+    print(f"LabelEncoder salvo em {artifacts.encoder}")
+    print(f"Especificação das features salva em {artifacts.feature_spec}")
+
+    loss, acc = best_model.evaluate(test_data, verbose=0)
+    print(f"Acurácia no conjunto de teste: {acc * 100:.2f}%")
+
+    y_pred_probs = best_model.predict(test_data, verbose=0)
+    y_pred = np.argmax(y_pred_probs, axis=1)
+    report = classification_report(y_test_int, y_pred, target_names=label_encoder.classes_)
+    print("\nRelatório de Classificação:\n", report)
+
+    if teacher is not None:
+        print("Comparando professor e aluno no conjunto de teste...")
+        comparison = compare_models(cfg, Path(cfg.teacher_model), artifacts.model, test_set, y_test_int)
+        print(format_report(comparison))
+        print(f"Relatório salvo em {output_dir / REPORT_NAME}")
+
+    return TrainingRun(
+        model=best_model,
+        label_encoder=label_encoder,
+        history=read_history(output_dir / HISTORY_NAME),
+        y_true=y_test_int,
+        y_pred=y_pred,
+        accuracy=float(acc),
+        paths=artifacts,
+    )
+
+
+def export_artifacts(paths: ArtifactPaths, destination: Path) -> List[Path]:
+    """Copia modelo, codificador e especificação para ``destination`` (ex.: ``static/modelo``).
+
+    Cada arquivo é copiado para um temporário e renomeado, então quem lê o
+    destino nunca vê um arquivo pela metade. O modelo vai por último: quando a
+    análise percebe a troca, especificação e codificador novos já estão lá.
+    """
+    destination = Path(destination)
+    destination.mkdir(parents=True, exist_ok=True)
+    exported = []
+    for source in (paths.feature_spec, paths.encoder, paths.model):
+        target = destination / source.name
+        tmp_path = target.with_name(target.name + ".tmp")
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+        exported.append(target)
+    return exported
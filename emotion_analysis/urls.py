@@ -15,6 +15,8 @@ urlpatterns = [
     path('record/', views.record_audio, name='record_audio'),
     path('analyze/<int:recording_id>/', views.analyze_audio, name='analyze_audio'),
     path('process-analysis/<int:recording_id>/', views.process_emotion_analysis, name='process_emotion_analysis'),
+    path('analysis-jobs/<int:job_id>/', views.analysis_job_status, name='analysis_job_status'),
+    path('metrics/', views.metrics, name='metrics'),
     path('history/', views.history, name='history'),
     path('delete/<int:recording_id>/', views.delete_recording, name='delete_recording'),
 
@@ -1,21 +1,25 @@
+import hmac
 import json
 import logging
-import random
 
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.db.models import Q, Count
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 from datetime import timedelta, datetime
 
+from . import metrics as analysis_metrics
 from .forms import AudioRecordingForm, RegisterForm
+from .jobs import enqueue_analysis
 from .models import (
-    AudioRecording, EmotionAnalysis, UserProfile, Consultation, Message,
+    AnalysisJob, AudioRecording, EmotionAnalysis, UserProfile, Consultation, Message,
     GameScore, JournalEntry, JournalLike, Achievement, EmotionalProgress,
     Friendship, ChatMessage, Notification, SupportGroup, GroupMessage,
     moderate_content,
@@ -208,6 +212,7 @@ def record_audio(request):
                 entry_type='audio',
                 visibility='private',
             )
+            enqueue_analysis(recording)
             check_achievements(request.user)
             messages.success(request, 'Desabafo enviado e adicionado ao diário/confessionário!')
             return redirect('analyze_audio', recording_id=recording.id)
@@ -224,31 +229,58 @@ def analyze_audio(request, recording_id):
     except EmotionAnalysis.DoesNotExist:
         analysis = None
     action_plan = ACTION_PLANS.get(analysis.dominant_emotion) if analysis else None
+    active_job = None
+    if analysis is None:
+        active_job = recording.analysis_jobs.filter(status__in=('pending', 'running')).first()
     return render(request, 'emotion_analysis/analyze_audio.html', {
-        'recording': recording, 'analysis': analysis, 'action_plan': action_plan
+        'recording': recording, 'analysis': analysis, 'action_plan': action_plan,
+        'active_job': active_job,
     })
 
 
 @login_required
 @require_POST
 def process_emotion_analysis(request, recording_id):
+    """Enfileira a análise e responde imediatamente com o id da tarefa"""
     recording = get_object_or_404(AudioRecording, id=recording_id, user=request.user)
-    emotions = ['alegria', 'tristeza', 'raiva', 'medo', 'surpresa', 'nojo', 'neutro']
-    dominant_emotion = random.choice(emotions)
-    confidence = round(random.uniform(0.6, 0.95), 2)
-    emotions_data = {e: round(random.uniform(0.1, 0.9), 2) for e in emotions}
-
-    analysis, created = EmotionAnalysis.objects.update_or_create(
-        recording=recording,
-        defaults={'dominant_emotion': dominant_emotion, 'confidence': confidence, 'emotions_data': emotions_data}
-    )
-    check_achievements(request.user)
+    job = enqueue_analysis(recording)
     return JsonResponse({
         'success': True,
-        'dominant_emotion': analysis.get_emotion_display_name(),
-        'confidence': analysis.get_confidence_percentage(),
-        'emotions_data': emotions_data
-    })
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('analysis_job_status', args=[job.id]),
+    }, status=202)
+
+
+@login_required
+def analysis_job_status(request, job_id):
+    """API para polling do status de uma tarefa de análise"""
+    job = get_object_or_404(AnalysisJob, id=job_id, recording__user=request.user)
+    data = {'job_id': job.id, 'status': job.status, 'attempts': job.attempts}
+    if job.status == 'done':
+        analysis = EmotionAnalysis.objects.filter(recording_id=job.recording_id).first()
+        if analysis:
+            check_achievements(request.user)
+            data.update({
+                'dominant_emotion': analysis.get_emotion_display_name(),
+                'confidence': analysis.get_confidence_percentage(),
+                'emotions_data': analysis.emotions_data,
+                'timeline': analysis.timeline,
+            })
+    elif job.status == 'failed':
+        data['error'] = job.error or 'Erro ao processar a análise.'
+    return JsonResponse(data)
+
+
+def metrics(request):
+    """Métricas do pipeline de análise no formato texto do Prometheus (somente equipe)"""
+    token = getattr(settings, 'EMOTION_METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    has_token = bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+    if not has_token and not (request.user.is_active and request.user.is_staff):
+        return HttpResponseForbidden('Acesso restrito à equipe.')
+    body = analysis_metrics.render_prometheus(getattr(settings, 'EMOTION_METRICS_DIR', None))
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @login_required